@@ -0,0 +1,862 @@
+# Copyright (c) 2015 ICRL
+# See the file LICENSE for copying permission.
+
+"""Benchmarks of dex internals.
+
+Usage : python benchmark.py memory [entries]
+        python benchmark.py index [files]
+        python benchmark.py replay keys-file [directory]
+        python benchmark.py suite results-file [entries...]
+        python benchmark.py compare before-file after-file [percent]
+        python benchmark.py startup [directory] [runs]
+        python benchmark.py firstframe [directory]
+
+Key files of replay hold a key per line: an action name of KEYS(e.g.
+down), or a single character, optionally followed by *count to repeat it.
+Empty lines and lines starting with # are skipped.
+
+suite times listing, sorting and browsing synthetic trees of each number
+of `entries`(SUITE_SIZES by default, e.g. 1000 10000000 for 1k to 10M) and
+writes results as JSON to `results-file`. compare flags measures of
+`after-file` more than `percent`(10 by default) slower than, or using more
+memory than, those of `before-file`. It exits with status 1 if any did.
+
+startup times dex's start, until its first frame shows contents of
+`directory`(a synthetic one of STARTUP_ENTRIES entries by default): cold,
+without snapshots, and warm, painting the snapshot saved by the previous
+run. Each run is a new process running firstframe, which prints when its
+first frame showed contents. startup exits with status 1 if the median
+warm start is slower than STARTUP_TARGET.
+"""
+
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tracemalloc
+
+from concurrent.futures import ProcessPoolExecutor
+from random import Random
+from shutil import rmtree
+from tempfile import mkdtemp
+from threading import Thread
+from time import perf_counter, strftime
+
+from constants import CONTENT_TYPES, ELEMENT_PREFIX, KEYS, PRINT_ORDER
+from dtypes import Content, ContentStore
+from index import SubtreeIndex
+from screen import Screen
+
+
+class LegacyContent(object):
+
+    """Content as it used to be: a per-instance __dict__ holding name,
+    type and linePrefix."""
+
+    def __init__(self, name, type):
+
+        self.name = name
+
+        self.type = type
+
+        self.linePrefix = ELEMENT_PREFIX[self.type]
+
+
+def syntheticListing(entries, seed=0):
+
+    """Return a dict shaped as tools.lsdir()'s return value, holding
+    `entries` made up names, mostly files."""
+
+    random = Random(seed)
+
+    listing = {'file': [], 'dir': [], 'link': [], 'mountpoint': [],
+               'other': []}
+
+    for index in range(entries):
+
+        # 1 in 10 is a directory, 1 in 50 is a link.
+        roll = random.random()
+        _type = 'dir' if roll < .1 else 'link' if roll < .12 else 'file'
+
+        listing[_type].append("%s-%08x.%s" % (
+            _type, random.getrandbits(32), random.choice(('log', 'txt'))))
+
+    return listing
+
+
+def buildLegacy(listing):
+
+    """Build contents as main.getContents used to: intermediate dirs and
+    files lists, sorted copies of them and a combined list."""
+
+    dirs = [LegacyContent(fname, 'dir') for _type in CONTENT_TYPES['dir']
+            for fname in listing[_type]]
+    files = [LegacyContent(fname, 'file') for _type in CONTENT_TYPES['file']
+             for fname in listing[_type]]
+
+    dirs = sorted(dirs, key=lambda x: x.name)
+    files = sorted(files, key=lambda x: x.name)
+
+    contentsAll = []
+    contentsAll.extend(dirs)
+    contentsAll.extend(files)
+
+    return contentsAll
+
+
+def buildList(listing):
+
+    """Build a sorted list of Content-objects"""
+
+    return [Content(fname, type) for type in PRINT_ORDER
+            for fname in sorted(fname for _type in CONTENT_TYPES[type]
+                                for fname in listing[_type])]
+
+
+def buildStore(listing):
+
+    """Build a ContentStore, as main.listContents does"""
+
+    contentsAll = ContentStore()
+
+    for type in PRINT_ORDER:
+
+        for fname in sorted(fname for _type in CONTENT_TYPES[type]
+                            for fname in listing[_type]):
+            contentsAll.append(fname, type)
+
+    return contentsAll
+
+
+def measure(build, listing):
+
+    """Return (retained, peak) bytes allocated by build(listing)"""
+
+    tracemalloc.start()
+
+    contents = build(listing)
+
+    retained, peak = tracemalloc.get_traced_memory()
+
+    tracemalloc.stop()
+
+    del contents
+
+    return retained, peak
+
+
+def memory(entries=1000000):
+
+    """Print memory used to hold `entries` contents in each
+    representation"""
+
+    listing = syntheticListing(entries)
+
+    print("%d entries" % entries)
+    print("%-16s %14s %14s %10s" % ("representation", "retained", "peak",
+                                    "per entry"))
+
+    for label, build in (("legacy Content", buildLegacy),
+                         ("slotted Content", buildList),
+                         ("ContentStore", buildStore)):
+
+        retained, peak = measure(build, listing)
+
+        print("%-16s %14d %14d %10.1f" % (label, retained, peak,
+                                          float(retained) / entries))
+
+
+def syntheticTree(root, files, filesPerDir=100, dirsPerDir=10, seed=0):
+
+    """Create `files` empty files under directory at `root`, in a tree of
+    directories holding `filesPerDir` files and up to `dirsPerDir`
+    directories each. Return list of directories created."""
+
+    random = Random(seed)
+
+    os.mkdir(root)
+
+    dirs = [root]
+
+    # index in dirs of the directory new directories are created in.
+    parent = 0
+
+    for start in range(0, files, filesPerDir):
+
+        # Parent is full, next directory is.
+        if len(dirs) > (parent + 1) * dirsPerDir:
+            parent += 1
+
+        path = dirs[-1]
+
+        for index in range(start, min(start + filesPerDir, files)):
+
+            name = "file-%08x-%d.%s" % (random.getrandbits(32), index,
+                                        random.choice(('log', 'txt', 'py')))
+
+            open(os.path.join(path, name), "w").close()
+
+        # Next files go in a new directory.
+        path = os.path.join(dirs[parent], "dir-%d" % len(dirs))
+        os.mkdir(path)
+
+        dirs.append(path)
+
+    return dirs
+
+
+def timed(function, *args):
+
+    """Return (result, seconds) of function(*args)"""
+
+    start = perf_counter()
+
+    result = function(*args)
+
+    return result, perf_counter() - start
+
+
+def index(files=100000):
+
+    """Print time taken to build, refresh and query a subtree index of a
+    synthetic tree of `files` files"""
+
+    root = mkdtemp(prefix="dex-benchmark-")
+
+    try:
+        dirs, elapsed = timed(syntheticTree, os.path.join(root, "tree"),
+                              files)
+
+        print("%d files, %d directories created in %.1f s" % (
+            files, len(dirs), elapsed))
+
+        subtreeIndex = SubtreeIndex(os.path.join(root, "index.sqlite"))
+
+        stats, elapsed = timed(subtreeIndex.update, dirs[0])
+        print("build     %8.2f s  %s" % (elapsed, stats))
+
+        stats, elapsed = timed(subtreeIndex.update, dirs[0])
+        print("refresh   %8.2f s  %s" % (elapsed, stats))
+
+        # Change 1% of directories.
+        for path in dirs[::100]:
+            open(os.path.join(path, "new-file"), "w").close()
+
+        stats, elapsed = timed(subtreeIndex.update, dirs[0])
+        print("1%% changed %7.2f s  %s" % (elapsed, stats))
+
+        print("size      %8.1f MB" % (subtreeIndex.size() / 1e6))
+
+        for mode, queries in (('prefix', ("file-0", "file-ab", "file-1234")),
+                              ('substring', ("-12.", "abc", "zzz"))):
+
+            for query in queries:
+
+                found, elapsed = timed(subtreeIndex.find, dirs[0], query,
+                                       mode, 10000)
+
+                print("%-9s %8.1f ms  %r: %d found" % (mode, elapsed * 1000,
+                                                      query, len(found)))
+
+        subtreeIndex.close()
+
+    finally:
+        rmtree(root)
+
+
+def parseKeys(text):
+
+    """Return list of (name, key code) of keys recorded in `text`, see
+    module's docstring"""
+
+    keys = []
+
+    for line in text.splitlines():
+
+        line = line.strip()
+
+        if not line or line.startswith("#"):
+            continue
+
+        name, _, count = line.rpartition("*")
+
+        # No count, or a `*` key.
+        if not name or not count.isdigit():
+            name, count = line, "1"
+
+        if name in KEYS:
+            key = KEYS[name]
+        elif len(name) == 1:
+            key = name
+        else:
+            raise ValueError("unknown key: %r" % name)
+
+        # Characters are read as their code.
+        if isinstance(key, str):
+            key = ord(key)
+
+        keys.extend([(name, key)] * int(count))
+
+    return keys
+
+
+def percentile(values, fraction):
+
+    """Return `fraction` percentile of sorted `values`, nearest rank"""
+
+    return values[max(0, min(len(values) - 1,
+                             int(round(fraction * len(values))) - 1))]
+
+
+def replay(keysFile, directory=".", timeout=1.0):
+
+    """Replay keys recorded in `keysFile` against main.main(), browsing
+    `directory` on a headless Screen. Print frames rendered, lines written
+    and percentiles of the latency from each key to the frame showing it.
+    Keys not showing in a frame within `timeout` seconds are counted as
+    not painted."""
+
+    with open(keysFile) as fileobj:
+        keys = parseKeys(fileobj.read())
+
+    # Needs no terminal.
+    import main as dex
+
+    os.chdir(directory)
+
+    screen = Screen(24, 80)
+
+    browsing = Thread(target=dex.main, args=(screen, screen))
+    browsing.daemon = True
+    browsing.start()
+
+    # First frame, listing first contents.
+    screen.waitPainted(0, timeout)
+
+    # name -> latencies of keys painted, and count of keys not painted.
+    latencies = {}
+    unpainted = 0
+
+    start = perf_counter()
+
+    for count, (name, key) in enumerate(keys, 1):
+
+        # Quit key replayed.
+        if not browsing.is_alive():
+            break
+
+        typed = perf_counter()
+
+        screen.feed([key])
+
+        paintedAt = screen.waitPainted(count, timeout)
+
+        if paintedAt is None:
+            unpainted += 1
+        else:
+            latencies.setdefault(name, []).append(paintedAt - typed)
+
+    elapsed = perf_counter() - start
+
+    # Quit, unless replayed.
+    screen.feed([ord(KEYS['quit'])])
+    browsing.join(timeout + 1)
+
+    print("%d keys in %.2f s: %d frames, %d lines written, %d keys not "
+          "painted" % (len(keys), elapsed, screen.frames, screen.writes,
+                       unpainted))
+
+    print("%-12s %6s %9s %9s %9s %9s" % ("key", "count", "p50 ms", "p90 ms",
+                                         "p99 ms", "max ms"))
+
+    everything = sorted(latency for values in latencies.values()
+                        for latency in values)
+
+    for name, values in sorted(latencies.items()) + [("all", everything)]:
+
+        if not values:
+            continue
+
+        values = sorted(values)
+
+        print("%-12s %6d %9.2f %9.2f %9.2f %9.2f" % (
+            name, len(values), percentile(values, .5) * 1000,
+            percentile(values, .9) * 1000, percentile(values, .99) * 1000,
+            values[-1] * 1000))
+
+
+# Numbers of entries of trees of suite, by default.
+SUITE_SIZES = (1000, 10000, 100000)
+
+# Number of times each measure of suite is taken, the best one is kept.
+SUITE_REPEAT = 3
+
+# Number of moves(jumps, redraws) of Browser timed by suite.
+SUITE_MOVES = 1000
+
+# Number of levels of deep trees of suite.
+SUITE_DEPTH = 256
+
+# Characters long unicode names of suite are made of: accented latin,
+# greek, CJK, emoji, and a letter followed by a combining accent.
+UNICODE_NAME_PARTS = ("\u00e9t\u00e9", "\u03b1\u03b2\u03b3",
+                      "\u6587\u4ef6\u540d", "\U0001f4c1", "e\u0301",
+                      "\uac00\ub098", "\u0436\u0443\u0440")
+
+
+def createFile(path):
+
+    """Create an empty file at `path`"""
+
+    os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o644))
+
+
+def flatTree(root, entries, random):
+
+    """Create `entries` entries in directory at `root`, 1 in 10 is a
+    directory. Return directories to be listed."""
+
+    os.mkdir(root)
+
+    for index in range(entries):
+
+        name = "%08x-%d.%s" % (random.getrandbits(32), index,
+                               random.choice(('log', 'txt', 'py')))
+
+        if index % 10:
+            createFile(os.path.join(root, "file-" + name))
+        else:
+            os.mkdir(os.path.join(root, "dir-" + name))
+
+    return [root]
+
+
+def deepTree(root, entries, random):
+
+    """Create a chain of SUITE_DEPTH directories below directory at
+    `root`, `entries` files spread over them. Return directories to be
+    listed, from top to bottom."""
+
+    dirs = [root]
+
+    for level in range(1, SUITE_DEPTH):
+        dirs.append(os.path.join(dirs[-1], "level-%d" % level))
+
+    os.makedirs(dirs[-1])
+
+    for index in range(entries):
+
+        createFile(os.path.join(dirs[index % len(dirs)], "file-%08x-%d" % (
+            random.getrandbits(32), index)))
+
+    return dirs
+
+
+def unicodeTree(root, entries, random):
+
+    """Create `entries` files with long unicode names in directory at
+    `root`. Return directories to be listed."""
+
+    os.mkdir(root)
+
+    for index in range(entries):
+
+        parts = [random.choice(UNICODE_NAME_PARTS) for _ in range(12)]
+
+        createFile(os.path.join(root, "%s-%d" % ("".join(parts), index)))
+
+    return [root]
+
+
+def linksTree(root, entries, random):
+
+    """Create `entries` entries in directory at `root`, mixing files,
+    directories, links to them, dangling links and FIFOs. Return
+    directories to be listed.
+
+    Mountpoints can't be created without privileges, any mountpoint
+    reached through a link is listed as a link."""
+
+    os.mkdir(root)
+
+    # names of files and directories created so far, to be linked to.
+    files = []
+    dirs = []
+
+    for index in range(entries):
+
+        name = os.path.join(root, "entry-%08x-%d" % (random.getrandbits(32),
+                                                     index))
+
+        roll = random.random()
+
+        if roll < .4 or not files:
+            createFile(name)
+            files.append(name)
+
+        elif roll < .6 or not dirs:
+            os.mkdir(name)
+            dirs.append(name)
+
+        elif roll < .8:
+            os.symlink(random.choice(files), name)
+
+        elif roll < .9:
+            os.symlink(random.choice(dirs), name)
+
+        elif roll < .95:
+            os.symlink(name + "-missing", name)
+
+        else:
+            os.mkfifo(name)
+
+    return [root]
+
+
+# name -> function creating synthetic trees of suite.
+SUITE_TREES = {"flat": flatTree, "deep": deepTree, "unicode": unicodeTree,
+               "links": linksTree}
+
+
+def best(function, *args):
+
+    """Return (result of last call, seconds of the fastest one) of
+    SUITE_REPEAT calls of function(*args)"""
+
+    fastest = None
+
+    for _ in range(SUITE_REPEAT):
+
+        # Result of previous call freed first, not to count in peak RSS.
+        result = None
+
+        result, elapsed = timed(function, *args)
+
+        if fastest is None or elapsed < fastest:
+            fastest = elapsed
+
+    return result, fastest
+
+
+def measureTree(dirs):
+
+    """Return dict of measures(seconds, and peak RSS in KiB) of listing
+    each directory of `dirs` and of browsing contents of the first one.
+    Run in a process of its own, so that peak RSS is its own."""
+
+    # Needs no terminal.
+    import main as dex
+    import tools
+    from browser import Browser
+
+    measures = {}
+
+    for name, function in (
+            ("lsdir", lambda: [tools.lsdir(path, True) for path in dirs]),
+            ("getContents", lambda: [dex.getContents(path)
+                                     for path in dirs]),
+            ("getContents.size", lambda: [dex.getContents(path, None, 'size')
+                                          for path in dirs])):
+
+        listings, measures[name] = best(function)
+
+        listings = None
+
+    contents = dex.getContents(dirs[0])
+
+    screen = Screen(24, 80)
+
+    browser, measures["Browser"] = best(Browser, screen, contents)
+
+    random = Random(0)
+    jumps = [random.randint(1, len(contents)) for _ in range(SUITE_MOVES)]
+
+    def move():
+
+        for _ in range(SUITE_MOVES):
+
+            # Start over from the top, once at the bottom.
+            if not browser.Move(1):
+                browser.Jump(browser.minSelectIndex)
+
+    def bulkMove():
+
+        step = browser.height
+
+        for _ in range(SUITE_MOVES):
+
+            browser.bulkMove(step)
+
+            # Back up, once at an end.
+            if browser.selectIndex in (browser.minSelectIndex,
+                                       browser.maxSelectIndex):
+                step = -step
+
+    def jump():
+
+        for index in jumps:
+            browser.Jump(index)
+
+    def redraw():
+
+        for _ in range(SUITE_MOVES):
+            browser.redraw()
+
+    # seconds per call.
+    for function in (move, bulkMove, jump, redraw):
+
+        result, elapsed = best(function)
+
+        measures[function.__name__] = elapsed / SUITE_MOVES
+
+    peakRss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Reported in bytes rather than KiB there.
+    if sys.platform == "darwin":
+        peakRss //= 1024
+
+    measures["peakRss"] = peakRss
+
+    return measures
+
+
+def suite(output, *sizes):
+
+    """Time listing and browsing synthetic trees of each of `sizes`
+    entries(SUITE_SIZES if none), of each kind of SUITE_TREES. Print
+    results and write them as JSON to file at `output`."""
+
+    sizes = sizes or SUITE_SIZES
+
+    results = {"date": strftime("%Y-%m-%d %H:%M:%S"),
+               "python": platform.python_version(),
+               "platform": platform.platform(),
+               "sizes": list(sizes), "measures": {}}
+
+    root = mkdtemp(prefix="dex-benchmark-")
+
+    try:
+        for size in sizes:
+
+            for kind, create in sorted(SUITE_TREES.items()):
+
+                path = os.path.join(root, "%s-%d" % (kind, size))
+
+                dirs, elapsed = timed(create, path, size, Random(0))
+
+                # A fresh process per tree.
+                with ProcessPoolExecutor(1) as pool:
+                    measures = pool.submit(measureTree, dirs).result()
+
+                results["measures"]["%s/%d" % (kind, size)] = measures
+
+                print("%-14s created in %6.1f s  %s" % (
+                    "%s/%d" % (kind, size), elapsed,
+                    "  ".join("%s %s" % (name, formatMeasure(name, value))
+                              for name, value in sorted(measures.items()))))
+
+                rmtree(path)
+
+    finally:
+        rmtree(root)
+
+    with open(output, "w") as fileobj:
+        json.dump(results, fileobj, indent=2, sort_keys=True)
+
+
+def formatMeasure(name, value):
+
+    """Return measure `name` of `value` in human readable form"""
+
+    if name == "peakRss":
+        return "%.1fM" % (value / 1024.0)
+
+    if value < 1e-3:
+        return "%.1fus" % (value * 1e6)
+
+    return "%.2fms" % (value * 1e3)
+
+
+def compare(before, after, percent=10):
+
+    """Print measures of results files `before` and `after`(see suite())
+    side by side, flagging those more than `percent` per cent higher
+    after. Exit with status 1 if any was."""
+
+    with open(before) as fileobj:
+        before = json.load(fileobj)["measures"]
+
+    with open(after) as fileobj:
+        after = json.load(fileobj)["measures"]
+
+    regressions = 0
+
+    print("%-16s %-18s %12s %12s %8s" % ("tree", "measure", "before",
+                                         "after", "change"))
+
+    for tree in sorted(set(before) & set(after)):
+
+        for name in sorted(set(before[tree]) & set(after[tree])):
+
+            old, new = before[tree][name], after[tree][name]
+
+            change = (new - old) * 100.0 / old if old else 0.0
+
+            flag = ""
+
+            if change > percent:
+                flag = "  REGRESSION"
+                regressions += 1
+
+            elif change < -percent:
+                flag = "  improved"
+
+            print("%-16s %-18s %12s %12s %+7.1f%%%s" % (
+                tree, name, formatMeasure(name, old),
+                formatMeasure(name, new), change, flag))
+
+    print("%d regressions" % regressions)
+
+    if regressions:
+        sys.exit(1)
+
+
+# Entries of directory started in, by default.
+STARTUP_ENTRIES = 10000
+
+# Runs of each start, by default.
+STARTUP_RUNS = 5
+
+# Seconds a warm start may take at most, until its first frame.
+STARTUP_TARGET = 0.25
+
+
+def firstframe(directory=".", timeout=10.0):
+
+    """Start dex browsing `directory` on a headless Screen, and print
+    perf_counter() when its first frame showed contents(an empty line if it
+    did not within `timeout` seconds). Quit afterwards, saving a snapshot
+    as dex does."""
+
+    os.chdir(directory)
+
+    # Timed from here on, as dex's start.
+    import main as dex
+
+    screen = Screen(24, 80)
+
+    browsing = Thread(target=dex.main, args=(screen, screen))
+    browsing.daemon = True
+    browsing.start()
+
+    # Line below '.' and '..' shows the first content.
+    shownAt = screen.waitShown(lambda: screen.lines[2].strip(), timeout)
+
+    print("" if shownAt is None else repr(shownAt))
+    sys.stdout.flush()
+
+    screen.feed([ord(KEYS['quit'])])
+    browsing.join(timeout)
+
+
+def startupTime(directory, cacheDir):
+
+    """Return seconds from launching a dex process browsing `directory`,
+    with snapshots in `cacheDir`, to its first frame showing contents. None
+    if it did not show any."""
+
+    env = dict(os.environ, XDG_CACHE_HOME=cacheDir)
+
+    # Profiling would slow it down.
+    env.pop("DEX_TRACE", None)
+
+    start = perf_counter()
+
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "firstframe",
+         directory], env=env, stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL, universal_newlines=True).stdout
+
+    try:
+        return float(output.split("\n")[0]) - start
+
+    except ValueError:
+        return None
+
+
+def startup(directory=None, runs=STARTUP_RUNS):
+
+    """Print median times of cold and warm starts browsing `directory`, see
+    startupTime(), and exit with status 1 if warm ones miss STARTUP_TARGET.
+    perf_counter() is system wide, as on Linux."""
+
+    root = mkdtemp(prefix="dex-startup-")
+
+    try:
+        if directory is None:
+            directory = os.path.join(root, "tree")
+            flatTree(directory, STARTUP_ENTRIES, Random(0))
+
+        directory = os.path.abspath(directory)
+
+        # start -> times of each run.
+        times = {"cold": [], "warm": []}
+
+        for run in range(runs):
+
+            # No snapshots at all.
+            times["cold"].append(startupTime(
+                directory, os.path.join(root, "cold%d" % run)))
+
+            # Snapshot saved by first run, then by each run.
+            if run == 0:
+                startupTime(directory, os.path.join(root, "warm"))
+
+            times["warm"].append(startupTime(
+                directory, os.path.join(root, "warm")))
+
+    finally:
+        rmtree(root)
+
+    print("%-6s %6s %9s %9s" % ("start", "runs", "p50 ms", "max ms"))
+
+    medians = {}
+
+    for name, values in sorted(times.items()):
+
+        values = sorted(value for value in values if value is not None)
+
+        if not values:
+            print("%-6s %6d  contents never shown" % (name, 0))
+            continue
+
+        medians[name] = percentile(values, .5)
+
+        print("%-6s %6d %9.1f %9.1f" % (name, len(values),
+                                        medians[name] * 1000,
+                                        values[-1] * 1000))
+
+    warm = medians.get("warm")
+
+    if warm is None or warm > STARTUP_TARGET:
+        print("warm start misses target of %.0f ms" % (STARTUP_TARGET * 1000))
+        sys.exit(1)
+
+    print("warm start within target of %.0f ms" % (STARTUP_TARGET * 1000))
+
+
+if __name__ == "__main__":
+
+    commands = {"memory": memory, "index": index, "replay": replay,
+                "suite": suite, "compare": compare, "startup": startup,
+                "firstframe": firstframe}
+
+    if len(sys.argv) < 2 or sys.argv[1] not in commands:
+        sys.exit(__doc__)
+
+    # Numbers of entries(or files), or paths.
+    args = [int(arg) if arg.isdigit() else arg for arg in sys.argv[2:]]
+
+    commands[sys.argv[1]](*args)
@@ -3,9 +3,21 @@
 
 """Contains Browser class"""
 
-from helpers import prepareLine
+from helpers import prepareLine, prepareStatus, formatMetadata, formatSize
+from helpers import LineCache
 
-from itertools import islice
+from constants import METADATA_COLUMNS, METADATA_PENDING, SPECIAL_DIRS
+
+from config import doupdate
+
+from dtypes import Content, ContentStore, mergeContents
+from filtering import globIndexes
+from profiler import PROFILER
+from selection import Selection
+
+from bisect import bisect_left
+from os.path import join
+from time import perf_counter
 
 
 class Browser(object):
@@ -30,12 +42,12 @@ class Browser(object):
             `minSelectIndex` and `maxSelectIndex` respectively.
 
         04) _update_dims_() method gets the most recent screen dimensions(y, x)
-            and updates `dims` member whenever it is called.
+            and updates `dims` member whenever it is called. It also
+            updates `height` member, the number of lines available to
+            contents(the whole screen, less the status line if any).
 
-        05) _print_elements_() method prepares an iterator called
-            `onscreen_contents`(sliced from original `contents` list to contain
-            exactly the number of contents as the screen size) whose contents
-            are to be rendered on screen in the exact same order.
+        05) _print_elements_() method renders the contents which are on
+            screen, in the exact same order.
 
            5.1) `scrollIndex` slices the original member list,
                 `contents` to provide a facility to scroll up & scroll down if
@@ -45,6 +57,21 @@ class Browser(object):
                 and gets it properties(color properties etc.) from prepareLine
                 function(from helpers module).
 
+           5.3) Only damaged lines are rendered again: previously and newly
+                selected lines when selection moves, lines scrolled in when
+                screen scrolls(the terminal scrolls the others), all of them
+                when `damaged` member is set(e.g. contents changed).
+
+           5.4) Lines prepared are kept by `lineCache` member(a
+                helpers.LineCache), until the screen's width changes.
+                Lines of contents of a ContentStore are found there by
+                location of their names, a Content is made only for lines
+                not prepared yet.
+
+           5.5) While profiler.PROFILER is enabled, rendering is profiled:
+                preparing lines(each prepareLine() call is timed) and
+                painting them.
+
         06) setContents() method changes(sets) the contents' list to a new
             list(provided as an argument), redetermines the `maxSelectIndex`
             and sets selectIndex to its default value.
@@ -66,7 +93,57 @@ class Browser(object):
         11) bulkMove() method moves selection `bulkFactor` times at a time,
             upward or downward. This is a rough description. It behaves
             slightly different in some cases. You must read its docstring to
-            know its precise behaviour"""
+            know its precise behaviour
+
+        12) update() method inserts and removes contents in place, keeping
+            `contents` sorted and the selection on the same content.
+
+        13) extend() method merges a sorted batch of contents into
+            `contents`, keeping the selection on the same content. replace()
+            method does so with contents merged already, e.g. by a
+            loader.StreamLoader.
+
+        14) setStatus() method sets(or removes) a status message, rendered
+            on the last line of screen.
+
+        15) While `hold` member is True, rendering is held: methods update
+            selection and scrolling but only mark rendering as `pending`.
+            render() method then renders all changes at once.
+
+        16) setView() method selects a content and scrolls to a position
+            saved earlier, e.g. when browsing a directory again.
+
+        17) While `columns` member is True, metadata columns are rendered,
+            from lstat() results cached in `contents.sortKeys.statResults`.
+            Placeholders are rendered for contents not stat-ed yet, see
+            viewport() and redraw().
+
+        18) While `diskUsage` member is a du.DiskUsage, a disk usage column
+            is rendered for directories, as measured by it.
+
+        19) setWindow() method renders contents in another curses window,
+            e.g. a part of screen when it is shared with a preview pane.
+
+        20) toggleMark() method marks(or unmarks) the selected content, and
+            getMarked() method returns the contents marked, e.g. to be
+            copied. Marks are kept as long as contents of the same
+            directory are browsed.
+
+           20.1) Marks are held by `selection` member, a Selection indexed
+                 like contents(like the whole contents, while browsing a
+                 filtering.FilteredView of them). Marking costs O(1)
+                 whatever the number of contents.
+
+           20.2) markAll(), invertMarks() and markRange() methods mark
+                 contents in bulk, a byte of `selection` at a time.
+                 markMatching() method marks contents whose name matches a
+                 glob pattern. setMarked() method marks given contents
+                 again, e.g. once sorted in another order.
+
+           20.3) Contents inserted or removed by update() and extend()
+                 shift marks past them, see Selection.insert(): marks are
+                 only looked up by key again once contents got sorted in
+                 another order."""
 
         # Standard screen
         self.stdscr = stdscr
@@ -86,6 +163,44 @@ class Browser(object):
         # start slice of contents
         self.scrollIndex = 0
 
+        # status message, None if there is no status line.
+        self.status = None
+
+        # (scrollIndex, localIndex, height, width, status) last rendered.
+        self.painted = None
+
+        # Whether all lines have to be rendered again.
+        self.damaged = True
+
+        # indexes of contents whose lines have to be rendered again.
+        self.damagedIndexes = set()
+
+        # Lines prepared for the screen's width.
+        self.lineCache = LineCache()
+
+        # Lines written last time and since the beginning.
+        self.frameLines = 0
+        self.linesWritten = 0
+
+        # Whether rendering is held, and pending.
+        self.hold = False
+        self.pending = False
+
+        # Whether metadata columns are rendered.
+        self.columns = METADATA_COLUMNS
+
+        # DiskUsage measuring directories, None if no disk usage column.
+        self.diskUsage = None
+
+        # Contents marked, and index of the one marked last(None if
+        # none).
+        self.selection = Selection(len(self._source_()))
+        self.anchor = None
+
+        # Let the terminal scroll lines, when it can do so.
+        self.stdscr.scrollok(True)
+        self.stdscr.idlok(True)
+
         # render contents
         self._print_elements_()
 
@@ -96,22 +211,30 @@ class Browser(object):
 
         self.dims = self.stdscr.getmaxyx()
 
+        # Last line is taken by status line, if any.
+        self.height = self.dims[0] - (self.status is not None)
+
     def _print_elements_(self):
 
-        """Renders directory contents on screen"""
+        """Renders directory contents on screen.
 
-        # Erase standard screen.
-        self.stdscr.erase()
+        Only the lines which changed since last rendering are rewritten(see
+        `damaged` member). Screen is updated with noutrefresh() and
+        doupdate(), and `frameLines` member holds the number of lines
+        written."""
 
         # ensures to get updated standard screen dimensions.
         self._update_dims_()
 
-        # height of standard screen.
-        height = self.dims[0]
+        # height available to contents.
+        height = self.height
 
         # width of standard screen.
         width = self.dims[1]
 
+        # Lines prepared for another width are of no use.
+        self.lineCache.setWidth(width)
+
         # local selection index. Index of elements of screen, not the index of
         # elements of contents.
         localIndex = self.selectIndex - self.scrollIndex
@@ -134,39 +257,746 @@ class Browser(object):
             # Stay at the first element
             localIndex = 1
 
-        # Generator object of on-screen contents.
-        onscreen_contents = islice(self.contents, self.scrollIndex,
-                                   self.scrollIndex + height)
+        # Render later, see render().
+        if self.hold:
+            self.pending = True
+            return
+
+        start = PROFILER.begin("render")
+
+        # Profiled operation ends even if rendering fails, e.g. on a
+        # curses error.
+        try:
+            self._paint_(height, width, localIndex, start)
+
+        finally:
+            if start is not None:
+                PROFILER.end("render", start)
+
+    def _paint_(self, height, width, localIndex, start):
+
+        """Render contents' lines damaged on a screen `height` lines(of
+        contents) and `width` columns large, selection being on line
+        `localIndex`(from 1). `start` is the time rendering started, if
+        profiled. See _print_elements_()."""
+
+        # seconds taken by each prepareLine() call, while profiled.
+        times = []
+
+        # What was rendered last time.
+        last = self.painted
+        self.painted = (self.scrollIndex, localIndex, height, width,
+                        self.status)
+
+        # Lines to be rendered, all of them by default.
+        lines = None
 
-        # loop through all contents.
-        for curr_line, item in enumerate(onscreen_contents):
+        # Same contents on a same sized screen.
+        if not self.damaged and last[2:4] == (height, width):
+
+            # lines moved upward by scrolling.
+            shift = self.scrollIndex - last[0]
+
+            # local selection index, last time.
+            lastLocalIndex = last[1] - shift
+
+            if abs(shift) < height:
+
+                # Only previously and newly selected lines changed
+                lines = set([lastLocalIndex - 1, localIndex - 1])
+
+                if shift:
+
+                    # Let terminal scroll the rest.
+                    self.stdscr.scroll(shift)
+
+                    # Lines scrolled in.
+                    if shift > 0:
+                        lines.update(range(height - shift, height))
+                    else:
+                        lines.update(range(-shift))
+
+                # Lines of contents changed meanwhile.
+                lines.update(index - self.scrollIndex
+                             for index in self.damagedIndexes)
+
+        self.damagedIndexes.clear()
+
+        self.frameLines = 0
+
+        # Whether all lines are rendered.
+        full = lines is None
+
+        # Render all lines.
+        if full:
+
+            # Erase standard screen.
+            self.stdscr.erase()
+
+            # Scroll contents' lines only.
+            if height > 0:
+                self.stdscr.setscrreg(0, height - 1)
+
+            lines = range(height)
+
+        # lstat() results of contents, if metadata columns are rendered.
+        statResults = None
+
+        if self.columns and self.contents.sortKeys is not None:
+            statResults = self.contents.sortKeys.statResults
+
+        # directory of contents, if disk usage column is rendered.
+        path = None
+
+        if self.diskUsage is not None and self.contents.sortKeys is not None:
+            path = self.contents.sortKeys.path
+
+        # Contents(or contents viewed) stored by a ContentStore, whose
+        # lines are cached by location, unless columns are rendered.
+        store = self._source_()
+
+        if (statResults is not None or path is not None or
+                not isinstance(store, ContentStore)):
+            store = None
+        else:
+            self.lineCache.setBuffer(store.buffer)
+
+        # loop through lines to be rendered.
+        for curr_line in sorted(lines):
+
+            # Lines out of screen.
+            if not 0 <= curr_line < height:
+                continue
+
+            # Index of content on current line.
+            index = self.scrollIndex + curr_line
+
+            # No content on current line.
+            if index >= len(self.contents):
+
+                self.stdscr.move(curr_line, 0)
+                self.stdscr.clrtoeol()
+
+                continue
 
             # boolean -> whether to select current item.
             selectCurrent = (curr_line == localIndex - 1)
 
-            # Prepare current elements and determine its properties.
-            currElement, properties = prepareLine(item, selectCurrent, width)
+            sourceIndex = self._sourceIndex_(index)
+
+            # Whether current element is marked.
+            marked = (self.selection.count and
+                      self.selection.get(sourceIndex))
+
+            if start is not None:
+                before = perf_counter()
+
+            # Key of current line in cache, if located.
+            key = line = None
+
+            if store is not None:
+
+                key = (store.starts[sourceIndex], store.lengths[sourceIndex],
+                       store.types[sourceIndex], selectCurrent, marked)
+
+                line = self.lineCache.located.get(key)
+
+            # Content made only for lines not prepared yet.
+            if line is None:
+
+                content = self.contents[index]
+
+                # Prepare current elements and determine its properties.
+                line = prepareLine(content, selectCurrent, width,
+                                   self._columns_(content, statResults, path),
+                                   marked, self.lineCache, key)
+
+            currElement, properties = line
+
+            if start is not None:
+                times.append(perf_counter() - before)
 
             # Render currElement
             self.stdscr.addstr(curr_line, 0, currElement, properties)
 
+            self.frameLines += 1
+
+        # Render status line, if changed.
+        if (self.status is not None and height >= 0 and
+                (full or last[4] != self.status)):
+
+            statusLine, properties = prepareStatus(self.status, width)
+
+            self.stdscr.addstr(height, 0, statusLine, properties)
+
+            self.frameLines += 1
+
+        # Rendered, up to date.
+        self.damaged = False
+
+        self.linesWritten += self.frameLines
+
+        # Update physical screen once.
+        self.stdscr.noutrefresh()
+        doupdate()
+
+        if start is not None:
+
+            # Preparing lines, and writing them to screen.
+            preparing = sum(times)
+
+            PROFILER.recordCalls("prepareLine", times)
+
+            PROFILER.record("prepare", start, phase=True, elapsed=preparing)
+            PROFILER.record("paint", start, phase=True,
+                            elapsed=perf_counter() - start - preparing)
+
+    def render(self):
+
+        """Render changes held since last rendering, if any"""
+
+        if self.pending:
+
+            self.pending = False
+
+            # Render despite hold.
+            hold, self.hold = self.hold, False
+            self._print_elements_()
+            self.hold = hold
+
+    def viewport(self):
+
+        """Return range of indexes of contents on screen"""
+
+        return range(self.scrollIndex,
+                     min(len(self.contents), self.scrollIndex + self.height))
+
+    def redrawContent(self, content, key):
+
+        """Render line of `content` again if it is on screen, e.g. once its
+        metadata changed. `key` is the function contents are sorted by."""
+
+        contentKey = key(content)
+
+        index = bisect_left(self.contents, contentKey, key=key)
+
+        # Not listed, or out of screen.
+        if (index not in self.viewport() or
+                key(self.contents[index]) != contentKey):
+            return
+
+        self.damagedIndexes.add(index)
+
+        # renders it
+        self._print_elements_()
+
+    def redraw(self):
+
+        """Render all lines again, e.g. once metadata got fetched"""
+
+        # All lines changed.
+        self.damaged = True
+
+        # renders it
+        self._print_elements_()
+
+    def setWindow(self, window):
+
+        """Render contents in curses `window` from now on"""
+
+        self.stdscr = window
+
+        # Let the terminal scroll lines, when it can do so.
+        self.stdscr.scrollok(True)
+        self.stdscr.idlok(True)
+
+        # All lines changed.
+        self.damaged = True
+
+        # renders it
+        self._print_elements_()
+
     def setContents(self, contents):
 
         """set contents' list.
         Primarily developed to change contents' list"""
 
+        # Contents of another directory(or found), marks do not apply.
+        sameContents = contents.sortKeys is self.contents.sortKeys
+
         # change contents list
         self.contents = contents
 
+        if not sameContents:
+            self.selection = Selection(len(self._source_()))
+            self.anchor = None
+
         # Change maximum select index
         self.maxSelectIndex = len(self.contents)
 
         # Restore to defaults.
         self.selectIndex = 1
 
+        # All lines changed.
+        self.damaged = True
+
         # renders it
         self._print_elements_()
 
+    def setView(self, selectIndex, scrollIndex):
+
+        """Select content at `selectIndex` with contents scrolled to
+        `scrollIndex`, as far as contents allow it"""
+
+        # Stay within selectable contents.
+        self.selectIndex = max(self.minSelectIndex,
+                               min(selectIndex, self.maxSelectIndex))
+
+        # Selection gets scrolled into view, if out of it.
+        self.scrollIndex = max(0, scrollIndex)
+
+        # Every line may have moved.
+        self.damaged = True
+
+        # renders it
+        self._print_elements_()
+
+    def update(self, changes, key, renamed=None, forget=None):
+
+        """Apply `changes` to contents' list, without listing it again.
+
+        changes -> list of (action, Content) pairs, where action is
+                   "create", "delete" or "modify". Contents are inserted,
+                   removed or moved in order.
+        key     -> function returning the sort key of a Content. `contents`
+                   must be sorted by it.
+        renamed -> dict mapping sort key of a renamed Content to its new
+                   Content.
+        forget  -> function forgetting the cached key of a modified
+                   Content, called before it moves to its new key.
+
+        The selected content stays selected and at the same line on screen.
+        If it got deleted, selection stays at the same position. If it got
+        renamed, its new Content gets selected."""
+
+        # Anchor selection to the selected content, if any.
+        selected = key(self.getSelected()) if self.contents else None
+
+        # Line of selection on screen.
+        localIndex = self.selectIndex - self.scrollIndex
+
+        # Marks are indexed like other contents, found again by key then.
+        marked = None
+
+        if self._source_() is not self.contents:
+            marked = self.getMarked()
+
+        for action, content in changes:
+
+            contentKey = key(content)
+
+            # Position of content in the sorted contents' list.
+            index = bisect_left(self.contents, contentKey, key=key)
+
+            # whether an equal content already is at that position.
+            exists = (index < len(self.contents) and
+                      key(self.contents[index]) == contentKey)
+
+            if action == "create" and not exists:
+                self.contents.insert(index, content)
+
+                # Marks past it move along.
+                if marked is None:
+                    self._insertMarks_([index])
+
+            elif action == "delete" and exists:
+                del self.contents[index]
+
+                if marked is None:
+                    self._deleteMarks_([index])
+
+            elif action == "modify" and exists:
+
+                # Mark moves along with it.
+                mark = marked is None and self.selection.get(index)
+
+                del self.contents[index]
+
+                if marked is None:
+                    self._deleteMarks_([index])
+
+                # e.g. sorted by size, its key changed.
+                forget(content)
+
+                # Selection follows it.
+                if contentKey == selected:
+                    selected = key(content)
+
+                index = bisect_left(self.contents, key(content), key=key)
+                self.contents.insert(index, content)
+
+                if marked is None:
+                    self._insertMarks_([index])
+                    self.selection.set(index, mark)
+
+        # Change maximum select index
+        self.maxSelectIndex = len(self.contents)
+
+        if marked is not None:
+            self.setMarked(marked, key)
+
+        # Follow a renamed selection.
+        if renamed and selected in renamed:
+            selected = key(renamed[selected])
+
+        # Select anchored content, or the one next to it(the first one if
+        # there was none).
+        index = self.minSelectIndex
+
+        if selected is not None:
+            index = bisect_left(self.contents, selected, key=key) + 1
+
+        self.selectIndex = max(self.minSelectIndex,
+                               min(index, self.maxSelectIndex))
+
+        # Keep selection on the same line.
+        self.scrollIndex = max(0, self.selectIndex - localIndex)
+
+        # Any line may have changed.
+        self.damaged = True
+
+        # renders it
+        self._print_elements_()
+
+    def extend(self, batch, key):
+
+        """Merge `batch`, a list of Content-objects sorted by `key`, into
+        contents' list, which must be sorted by `key` too.
+
+        The selected content stays selected and at the same line on screen.
+        """
+
+        store, indexes = mergeContents(self.contents, batch, key)
+
+        self.replace(store, [indexes], key)
+
+    def replace(self, store, inserted, key):
+
+        """Hold contents of `store` instead, a ContentStore sorted by `key`
+        holding the contents of contents' list and more, see
+        ContentStore.adopt(). `inserted` lists the ascending indexes
+        contents got inserted at, a list per merge(None instead of a list
+        if contents got sorted again).
+
+        The selected content stays selected and at the same line on screen.
+        """
+
+        # Anchor selection to the selected content, if any.
+        selected = key(self.getSelected()) if self.contents else None
+
+        # Line of selection on screen.
+        localIndex = self.selectIndex - self.scrollIndex
+
+        # Marks are indexed like other contents, found again by key then.
+        marked = None
+
+        if None in inserted or self._source_() is not self.contents:
+            marked = self.getMarked()
+
+        # Same contents' list, holding more.
+        self.contents.adopt(store)
+
+        # Change maximum select index
+        self.maxSelectIndex = len(self.contents)
+
+        # Marks past contents inserted move along.
+        if marked is None:
+            for indexes in inserted:
+                self._insertMarks_(indexes)
+        else:
+            self.setMarked(marked, key)
+
+        if selected is not None:
+
+            # Select anchored content.
+            self.selectIndex = bisect_left(self.contents, selected,
+                                           key=key) + 1
+
+            # Keep selection on the same line.
+            self.scrollIndex = max(0, self.selectIndex - localIndex)
+
+        # Any line may have changed.
+        self.damaged = True
+
+        # renders it
+        self._print_elements_()
+
+    def setStatus(self, status):
+
+        """Set status message to `status`, None removes status line"""
+
+        # Status line appears or disappears, contents' height changes.
+        if (status is None) != (self.status is None):
+            self.damaged = True
+
+        self.status = status
+
+        # renders it
+        self._print_elements_()
+
+    def _columns_(self, content, statResults, path):
+
+        """Return columns rendered at the end of `content`'s line: metadata
+        columns, if `statResults`(lstat() results of contents) is given,
+        after disk usage column, if `path`(directory of contents) is given.
+        None if neither is."""
+
+        # Metadata columns, placeholders until stat-ed.
+        columns = None
+
+        if statResults is not None:
+            columns = formatMetadata(statResults.get(content.name,
+                                                     METADATA_PENDING))
+
+        # Disk usage column, placeholder while measured.
+        if path is not None:
+
+            size = ""
+
+            if (content.type == 'dir' and
+                    content.name not in SPECIAL_DIRS.values()):
+
+                contentPath = join(path, content.name)
+                size = self.diskUsage.get(contentPath)
+
+                if size is not None:
+                    size = formatSize(size)
+                elif self.diskUsage.measuring(contentPath):
+                    size = "..."
+                else:
+                    size = ""
+
+            columns = " %7s%s" % (size, columns or "")
+
+        return columns
+
+    def _source_(self):
+
+        """Return the whole contents marks are indexed like: contents
+        browsed, or the contents they are a view of"""
+
+        return getattr(self.contents, "contents", self.contents)
+
+    def _sourceIndex_(self, index):
+
+        """Return index in the whole contents of content at `index`"""
+
+        sourceIndex = getattr(self.contents, "sourceIndex", None)
+
+        if sourceIndex is None:
+            return index
+
+        return sourceIndex(index)
+
+    def _unmarkSpecial_(self):
+
+        """Unmark special directories, they can't be acted upon"""
+
+        source = self._source_()
+
+        if source.sortKeys is None:
+            return
+
+        key = source.sortKeys.key
+
+        for name in SPECIAL_DIRS.values():
+
+            contentKey = key(Content(name, 'dir'))
+
+            index = bisect_left(source, contentKey, key=key)
+
+            if index < len(source) and key(source[index]) == contentKey:
+                self.selection.set(index, False)
+
+    def toggleMark(self):
+
+        """Mark selected content, or unmark it if marked"""
+
+        selected = self.getSelected()
+
+        # Special directories can't be acted upon.
+        if selected is None or selected.name in SPECIAL_DIRS.values():
+            return
+
+        self.anchor = self._sourceIndex_(self.selectIndex - 1)
+
+        self.selection.toggle(self.anchor)
+
+        # renders it, selected line is rendered again anyway
+        self._print_elements_()
+
+    def markAll(self):
+
+        """Mark all contents browsed"""
+
+        # Only those filtered, if filtering.
+        if self._source_() is not self.contents:
+            self.selection.setIndexes(self.contents.indexes)
+        else:
+            self.selection.setAll()
+
+        self._unmarkSpecial_()
+
+        self.redraw()
+
+    def invertMarks(self):
+
+        """Mark contents browsed not marked, unmark the others"""
+
+        # Only those filtered, if filtering.
+        if self._source_() is not self.contents:
+
+            selection = self.selection
+
+            marked = [index for index in self.contents.indexes
+                      if selection.get(index)]
+
+            selection.setIndexes(self.contents.indexes)
+            selection.setIndexes(marked, False)
+
+        else:
+            self.selection.invert()
+
+        self._unmarkSpecial_()
+
+        self.redraw()
+
+    def markRange(self):
+
+        """Mark contents from the one marked last to the selected one,
+        both included"""
+
+        if self.anchor is None or not self.contents:
+            return
+
+        selected = self._sourceIndex_(self.selectIndex - 1)
+
+        start, end = sorted((self.anchor, selected))
+
+        # Only those filtered, if filtering.
+        if self._source_() is not self.contents:
+            indexes = self.contents.indexes
+            self.selection.setIndexes(
+                indexes[bisect_left(indexes, start):
+                        bisect_left(indexes, end + 1)])
+        else:
+            self.selection.setRange(start, end + 1)
+
+        self._unmarkSpecial_()
+
+        self.anchor = selected
+
+        self.redraw()
+
+    def markMatching(self, pattern):
+
+        """Mark contents browsed whose name matches glob `pattern`, case
+        insensitively"""
+
+        source = self._source_()
+
+        indexes = globIndexes(source, pattern)
+
+        # Only those filtered, if filtering.
+        if source is not self.contents:
+            indexes = sorted(set(indexes).intersection(self.contents.indexes))
+
+        self.selection.setIndexes(indexes)
+
+        self._unmarkSpecial_()
+
+        self.redraw()
+
+    def clearMarks(self):
+
+        """Unmark all contents"""
+
+        self.selection.clear()
+        self.anchor = None
+
+        self.redraw()
+
+    def _insertMarks_(self, indexes):
+
+        """Make room for contents inserted at `indexes`(ascending indexes
+        once inserted) in marks"""
+
+        self.selection.insert(indexes)
+
+        if self.anchor is not None:
+            self.anchor += self._shifted_(indexes, self.anchor)
+
+    def _shifted_(self, indexes, index):
+
+        """Return by how much `index` moves once contents got inserted at
+        `indexes`(ascending indexes once inserted)"""
+
+        shift = 0
+
+        for inserted in indexes:
+
+            if inserted > index + shift:
+                break
+
+            shift += 1
+
+        return shift
+
+    def _deleteMarks_(self, indexes):
+
+        """Remove contents at `indexes`(ascending indexes before removal)
+        from marks"""
+
+        self.selection.delete(indexes)
+
+        if self.anchor is not None:
+
+            if self.anchor in indexes:
+                self.anchor = None
+            else:
+                self.anchor -= bisect_left(indexes, self.anchor)
+
+    def setMarked(self, contents, key):
+
+        """Mark `contents`, and no other ones, e.g. once contents changed.
+        Contents must be sorted by `key`, as `contents` are."""
+
+        source = self._source_()
+
+        # Contents may have been inserted or removed.
+        self.selection = Selection(len(source))
+        self.anchor = None
+
+        for content in contents:
+
+            contentKey = key(content)
+
+            index = bisect_left(source, contentKey, key=key)
+
+            if index < len(source) and key(source[index]) == contentKey:
+                self.selection.toggle(index)
+
+    def getMarked(self):
+
+        """Return list of contents marked, in order"""
+
+        if not self.selection.count:
+            return []
+
+        source = self._source_()
+
+        return [source[index] for index in self.selection.indexes()]
+
     def getContents(self):
 
         """Return contents' list"""
@@ -176,22 +1006,34 @@ class Browser(object):
 
     def getSelected(self):
 
-        """Return selected content"""
+        """Return selected content, None if there are no contents"""
+
+        # Nothing to select
+        if not self.contents:
+            return None
 
         return self.contents[self.selectIndex - 1]
 
-    def Move(self, moveSteps):
+    def Move(self, moveSteps, clamp=False):
 
         """Move selection by `moveSteps`.
         (+)ve `moveSteps` moves selection forward.
         (-)ve `moveSteps` moves selection backward.
 
+        If `clamp` is True and selection can not be moved that far, it is
+        moved to the first or last content instead.
+
         If moved succesfully, return True, else, False.
         """
 
         # Determine the index on which we have to jump.
         jumpTo = self.selectIndex + moveSteps
 
+        # Stay within limits.
+        if clamp:
+            jumpTo = max(self.minSelectIndex,
+                         min(jumpTo, self.maxSelectIndex))
+
         # return
         return self.Jump(jumpTo)
 
@@ -236,11 +1078,15 @@ class Browser(object):
 
         """
 
-        # Height of screen
-        height = self.dims[0]
+        # Height available to contents
+        height = self.height
+
+        # Nothing to move by, e.g. on a screen without room for contents.
+        if not bulkFactor:
+            return
 
         # Separate direction from bulkFactor for simple calculations.
-        direction = bulkFactor/abs(bulkFactor)
+        direction = bulkFactor // abs(bulkFactor)
 
         # removing direction and conserving magnitude from bulkFactor.
         bulkFactor = abs(bulkFactor)
@@ -261,7 +1107,7 @@ class Browser(object):
             moveSteps = min(avail_contents - localIndex, bulkFactor)
 
             # If moveSteps is 0(i.e. selection is at the last element)
-            if moveSteps is 0:
+            if moveSteps == 0:
 
                 # steps to reach last element of all contents or bulkFactor
                 # steps, whichever is minimum.
@@ -275,7 +1121,7 @@ class Browser(object):
             moveSteps = min(bulkFactor, localIndex - 1)
 
             # If localIndex is 1(i.e. If selection is at the first element)
-            if localIndex is 1:
+            if localIndex == 1:
 
                 # steps to reach the first element of contentsAll list, or
                 # bulkFactor steps, whichever is minimum.
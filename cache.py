@@ -0,0 +1,237 @@
+# Copyright (c) 2015 ICRL
+# See the file LICENSE for copying permission.
+
+"""Contains ListingCache class"""
+
+from collections import OrderedDict
+from os import stat
+from os.path import abspath
+from sys import getsizeof
+
+from dtypes import ContentStore
+
+
+def stamp(path):
+
+    """Return a value that changes whenever directory at `path` has its
+    entries changed. Costs a single stat() call."""
+
+    st = stat(path)
+
+    return (st.st_ino, st.st_mtime_ns, st.st_ctime_ns)
+
+
+def itemsSize(items):
+
+    """Return approximate memory(in bytes) used by dict `items` and what it
+    holds, sampling a single key and value: all of them look alike."""
+
+    size = getsizeof(items)
+
+    if not items:
+        return size
+
+    key, value = next(iter(items.items()))
+
+    # Tuples and lstat() results hold further objects.
+    sample = getsizeof(key) + getsizeof(value)
+
+    for part in (key if isinstance(key, tuple) else ()):
+        sample += getsizeof(part)
+
+    if value is not None and isinstance(value, tuple):
+        sample += sum(getsizeof(part) for part in value)
+
+    return size + len(items) * sample
+
+
+def sortKeysSize(sortKeys):
+
+    """Return approximate memory(in bytes) used by `sortKeys`(a
+    sorting.SortKeys): its cached keys and lstat() results grow as large as
+    the listing once sorted by metadata or metadata got fetched."""
+
+    return itemsSize(sortKeys.keys) + itemsSize(sortKeys.statResults)
+
+
+def contentsSize(contents):
+
+    """Return approximate memory(in bytes) used by `contents`, a list of
+    Content-objects or a ContentStore, and by its sortKeys if any."""
+
+    sortKeys = getattr(contents, "sortKeys", None)
+
+    # A ContentStore accounts for its names too.
+    if isinstance(contents, ContentStore):
+        return getsizeof(contents) + (
+            0 if sortKeys is None else sortKeysSize(sortKeys))
+
+    # Size of the list itself.
+    size = getsizeof(contents)
+
+    # All Content-objects share the same layout, measure it only once.
+    if contents:
+        item = contents[0]
+        size += len(contents) * getsizeof(item)
+
+    if sortKeys is not None:
+        size += sortKeysSize(sortKeys)
+
+    # names are the only per-content variable part.
+    return size + sum(getsizeof(item.name) for item in contents)
+
+
+class ListingCache(object):
+
+    """Bounded, least recently used cache of directory listings.
+
+    01) Listings(lists of Content-objects, as built by main.getContents)
+        are keyed by absolute path of their directory.
+
+    02) Each listing is stored along with the stamp() of its directory,
+        taken before it was listed. A cached listing is only returned if
+        the directory's stamp is still the same, i.e. a hit costs one stat()
+        and no listdir().
+
+    03) Least recently used listings are evicted whenever there are more
+        than `maxEntries` listings or they are approximately using more
+        than `maxBytes` bytes of memory, their sort keys and metadata
+        included. reaccount() method measures a listing again once those
+        grew, e.g. metadata got fetched.
+
+    04) `hits`, `misses`, `evictions` and `invalidations`(stale listings
+        dropped on lookup) members count cache events. See stats().
+    """
+
+    def __init__(self, maxEntries, maxBytes):
+
+        # Limits
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+
+        # path -> (stamp, contents, size), least recently used first.
+        self.listings = OrderedDict()
+
+        # approximate memory used by all cached listings.
+        self.bytes = 0
+
+        # counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, path):
+
+        """Return cached contents of directory at `path` if still valid,
+        None otherwise."""
+
+        path = abspath(path)
+
+        cached = self.listings.get(path)
+
+        if cached is not None:
+
+            try:
+                valid = stamp(path) == cached[0]
+            except OSError:
+                valid = False
+
+            if valid:
+
+                # Mark as most recently used.
+                self.listings.move_to_end(path)
+
+                self.hits += 1
+
+                return cached[1]
+
+            # Stale, drop it.
+            self.invalidations += 1
+            self.discard(path)
+
+        self.misses += 1
+
+        return None
+
+    def put(self, path, contents, pathStamp):
+
+        """Cache `contents` of directory at `path`, listed after its stamp
+        was `pathStamp`."""
+
+        path = abspath(path)
+
+        # Replace previous listing, if any.
+        self.discard(path)
+
+        size = contentsSize(contents)
+
+        # Listings bigger than the whole cache are not worth keeping.
+        if size > self.maxBytes:
+            return
+
+        self.listings[path] = (pathStamp, contents, size)
+        self.bytes += size
+
+        self._evict_()
+
+    def _evict_(self):
+
+        """Evict least recently used listings, until within limits"""
+
+        while (len(self.listings) > self.maxEntries or
+               self.bytes > self.maxBytes):
+
+            _, (_, _, oldSize) = self.listings.popitem(last=False)
+            self.bytes -= oldSize
+
+            self.evictions += 1
+
+    def restamp(self, path, contents, pathStamp):
+
+        """Mark cached `contents` of directory at `path` as valid for
+        `pathStamp`, after they got updated in place."""
+
+        path = abspath(path)
+
+        cached = self.listings.get(path)
+
+        if cached is not None and cached[1] is contents:
+            self.listings[path] = (pathStamp,) + cached[1:]
+
+    def reaccount(self, path):
+
+        """Measure cached listing of directory at `path` again, if any, e.g.
+        once metadata got fetched into its sort keys"""
+
+        path = abspath(path)
+
+        cached = self.listings.get(path)
+
+        if cached is None:
+            return
+
+        size = contentsSize(cached[1])
+
+        self.listings[path] = cached[:2] + (size,)
+        self.bytes += size - cached[2]
+
+        self._evict_()
+
+    def discard(self, path):
+
+        """Remove cached listing of directory at `path`, if any."""
+
+        cached = self.listings.pop(abspath(path), None)
+
+        if cached is not None:
+            self.bytes -= cached[2]
+
+    def stats(self):
+
+        """Return a dict of cache counters and current usage."""
+
+        return {"hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self.listings), "bytes": self.bytes}
@@ -6,7 +6,10 @@
 import curses
 
 
-try:
+def initColorPairs():
+
+    """Start using curses colors and make color pairs. Curses screen has to
+    be initialized first."""
 
     # Start using curses colors
     curses.start_color()
@@ -25,9 +28,12 @@ try:
     # WHITE & MAGENTA
     curses.init_pair(4, curses.COLOR_WHITE, curses.COLOR_MAGENTA)
 
+    ## Color Pairs Specially For Marked Elements
+    # RED & WHITE
+    curses.init_pair(6, curses.COLOR_RED, curses.COLOR_WHITE)
+    # WHITE & RED
+    curses.init_pair(7, curses.COLOR_WHITE, curses.COLOR_RED)
+
     ## Color Pair For Author Credits
     # CYAN & BLACK
     curses.init_pair(5, curses.COLOR_CYAN, curses.COLOR_BLACK)
-
-except NameError:
-    raise NameError(" Colors pairs initialization before main")
@@ -1,7 +1,10 @@
 # Copyright (c) 2015 ICRL
 # See the file LICENSE for copying permission.
 
-"""Configures curses module, defines other configurations and functions"""
+"""Configures curses module, defines other configurations and functions.
+
+Importing it needs no terminal: curses gets set up by config(), once curses
+screen is initialized."""
 
 from constants import *  # all constant configurations
 from colorpairs import *  # all color pairs
@@ -10,11 +13,33 @@ from colorpairs import *  # all color pairs
 # BOLD[False] -> curses.A_NORMAL, BOLD[True] -> curses.A_BOLD
 BOLD = [curses.A_NORMAL, curses.A_BOLD]
 
-# Make curses invisible
-curses.curs_set(0)
 
-# Disable echoing typed character.
-curses.noecho()
+def colorPair(number):
+
+    """Return attribute of color pair `number`, see curses.color_pair().
+    Normal attribute until curses screen is initialized, e.g. when rendering
+    on a headless screen.Screen."""
+
+    try:
+        return curses.color_pair(number)
+
+    # Not initialized.
+    except curses.error:
+        return curses.A_NORMAL
+
+
+def doupdate():
+
+    """Update physical screen, see curses.doupdate(). Does nothing until
+    curses screen is initialized, e.g. when rendering on a headless
+    screen.Screen."""
+
+    try:
+        curses.doupdate()
+
+    # Not initialized.
+    except curses.error:
+        pass
 
 
 def config(stdscr):
@@ -22,11 +47,29 @@ def config(stdscr):
     """Standard screen configuration.
     Return configured screen."""
 
+    # Set up terminal, unless rendering on a headless screen.
+    try:
+        # Make color pairs.
+        initColorPairs()
+
+        # Make curses invisible
+        curses.curs_set(0)
+
+        # Disable echoing typed character.
+        curses.noecho()
+
+    # Curses screen not initialized.
+    except curses.error:
+        pass
+
     # Enable use of KEY_UP, KEY_DOWN etc.
     stdscr.keypad(True)
 
+    # Do not wait long for a key sequence to follow Escape key.
+    curses.set_escdelay(25)
+
     # Set background color
-    stdscr.bkgd(" ", curses.color_pair(1))
+    stdscr.bkgd(" ", colorPair(1))
 
     # Return configured standard screen
     return stdscr
@@ -5,20 +5,42 @@
 
 # imports action keys
 from curses import KEY_UP, KEY_DOWN, KEY_BACKSPACE, KEY_HOME, KEY_END
-from curses import KEY_PPAGE, KEY_NPAGE
+from curses import KEY_PPAGE, KEY_NPAGE, KEY_LEFT, KEY_RIGHT
 
 # alias of each supported *action key*
 KEYS = {"quit": "q", "enter": '\n', "up": KEY_UP, "down": KEY_DOWN,
         "back": KEY_BACKSPACE, "home": KEY_HOME, "end": KEY_END,
-        "pageup": KEY_PPAGE, "pagedown": KEY_NPAGE}
+        "pageup": KEY_PPAGE, "pagedown": KEY_NPAGE, "filter": "/",
+        "filtermode": "\t", "escape": "\x1b", "sort": "s",
+        "stats": "i", "historyback": KEY_LEFT,
+        "historyforward": KEY_RIGHT, "columns": "m",
+        "find": "f", "search": "g", "du": "u", "mark": " ",
+        "yank": "y", "paste": "p", "pastemove": "P", "delete": "D",
+        "confirm": "y", "markall": "a", "markinvert": "*",
+        "markrange": "v", "markmatching": "+", "profiler": "T"}
 
-# properties of files and directories when normal and when selected.
+# Other codes of Backspace key, sent by some terminals.
+BACKSPACE_CODES = (KEY_BACKSPACE, 127, 8)
+
+# properties of files and directories when normal and when selected, and
+# when marked.
 ELEMENT_PROPERTIES = {"dir": ((False, 3), (True, 4)),
-                      "file": ((False, 1), (True, 2))}
+                      "file": ((False, 1), (True, 2)),
+                      "markeddir": ((True, 6), (True, 7)),
+                      "markedfile": ((True, 6), (True, 7))}
+
+# color pair of status line.
+STATUS_COLORPAIR = 5
+
+# seconds a transient status message is shown for.
+STATUS_TIMEOUT = 2
 
 # Element line prefixes(placeholders)
 ELEMENT_PREFIX = {"dir": '+ ', "file": '  '}
 
+# flag replacing second character of prefix of marked elements.
+MARK_FLAG = '*'
+
 # filetypes to be considered as directories
 DIRS = ('mountpoint', 'dir')
 
@@ -28,8 +50,151 @@ FILES = ('file', 'link', 'other')
 # printing preference of different filetypes.
 PRINT_ORDER = ('dir', 'file')
 
+# filetypes to be considered as each type of content.
+CONTENT_TYPES = {'dir': DIRS, 'file': FILES}
+
 # Special directories.
 SPECIAL_DIRS = {'BACK_DIR': '..', 'CURR_DIR': '.'}
 
 # determines how contents will be sorted.
 CONTENTS_SORTFUNC = lambda x: x.lower()
+
+# orders contents can be sorted in, first one is the default.
+SORT_ORDERS = ('name', 'casefold', 'natural', 'extension', 'size', 'mtime')
+
+# orders needing file metadata, contents move as it changes.
+METADATA_ORDERS = ('size', 'mtime')
+
+# Maximum number of directory listings kept by the listing cache.
+CACHE_MAX_ENTRIES = 64
+
+# Approximate maximum memory(in bytes) used by the listing cache.
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Whether directories missing from the listing cache are listed in
+# background, rendering contents as they are listed.
+STREAM_LISTINGS = True
+
+# Number of items in the first batch of a streamed listing.
+STREAM_FIRST_BATCH = 256
+
+# Maximum number of items in a batch of a streamed listing.
+STREAM_MAX_BATCH = 256 * 1024
+
+# Maximum number of frames rendered per second.
+FRAME_RATE = 60
+
+# Number of threads listing directories in advance.
+PREFETCH_WORKERS = 2
+
+# Number of directories prefetched on each side of the selected one.
+PREFETCH_NEIGHBOURS = 1
+
+# Seconds selection has to rest on a directory before it gets prefetched.
+PREFETCH_DELAY = 0.05
+
+# Maximum number of paths remembered by navigation history.
+HISTORY_SIZE = 256
+
+# Number of threads fetching metadata of contents on screen.
+METADATA_WORKERS = 2
+
+# Maximum number of contents stat-ed at once by a metadata thread.
+METADATA_BATCH = 32
+
+# Whether metadata columns(mode, size and mtime) are shown at start.
+METADATA_COLUMNS = False
+
+# Minimum width left to names by metadata columns.
+METADATA_MIN_NAME = 20
+
+# Stands for metadata not fetched yet.
+METADATA_PENDING = object()
+
+# Metadata columns shown until metadata is fetched, or if it can't be.
+METADATA_PLACEHOLDER = " %10s %7s %16s" % ("-" * 10, "...", "")
+METADATA_MISSING = " %10s %7s %16s" % ("?" * 10, "?", "")
+
+# units of human readable sizes.
+SIZE_UNITS = ("", "K", "M", "G", "T", "P")
+
+# time.strftime format of modification time.
+MTIME_FORMAT = "%Y-%m-%d %H:%M"
+
+# type of content of each filetype.
+CONTENT_TYPE = {filetype: type for type in CONTENT_TYPES
+                for filetype in CONTENT_TYPES[type]}
+
+# Number of directories indexed between commits to the subtree index.
+INDEX_COMMIT_DIRS = 256
+
+# ways names are matched when finding, first one is the default.
+FIND_MODES = ('substring', 'prefix')
+
+# Maximum number of contents found at once.
+FIND_MAX_RESULTS = 10000
+
+# Number of processes searching directory trees.
+SEARCH_WORKERS = 4
+
+# Number of files searched by a single task of a search process.
+SEARCH_FILES_PER_TASK = 64
+
+# Number of bytes of a file scanned at once when searching its content.
+SEARCH_CHUNK = 16 * 1024 * 1024
+
+# Number of threads measuring disk usage of directories.
+DU_WORKERS = 4
+
+# Maximum number of directories whose disk usage is remembered.
+DU_MAX_ENTRIES = 1024 * 1024
+
+# Percentage of the screen width taken by the preview pane.
+PREVIEW_WIDTH_PERCENT = 50
+
+# Seconds the selection has to stay on a file before it gets previewed.
+PREVIEW_DELAY = 0.05
+
+# Maximum number of bytes scanned for the end of a previewed line.
+PREVIEW_MAX_SCAN = 64 * 1024
+
+# Number of bytes sniffed for NUL bytes, telling binary files apart.
+PREVIEW_SNIFF = 8 * 1024
+
+# extensions of files whose last lines are previewed.
+PREVIEW_TAIL_EXTENSIONS = (".log", ".out", ".err")
+
+# Number of threads copying, moving and deleting files.
+FILEOPS_WORKERS = 4
+
+# Number of bytes of a file copied at once.
+FILEOPS_CHUNK = 8 * 1024 * 1024
+
+# Maximum number of times traced by the profiler, last ones are kept.
+PROFILE_MAX_EVENTS = 100000
+
+# Number of last keys whose latency percentiles the profiler shows.
+PROFILE_LATENCY_SAMPLES = 1000
+
+# Size of the profiler overlay, drawn at the top right of screen.
+PROFILE_OVERLAY_HEIGHT = 14
+PROFILE_OVERLAY_WIDTH = 46
+
+# Number of threads listing directories in headless listing mode.
+EXPORT_WORKERS = 4
+
+# Number of entries handed over at once in headless listing mode, and
+# number of such batches of a directory held at most.
+EXPORT_BATCH = 4096
+EXPORT_QUEUE_BATCHES = 4
+
+# Whether the view of the directory dex started in is saved at exit, and
+# painted right away at next start.
+SNAPSHOTS = True
+
+# Maximum number of contents of a directory saved by its snapshot.
+SNAPSHOT_MAX_ENTRIES = 100000
+
+# Maximum number of lines prepared for the screen's width kept by a
+# helpers.LineCache, and of names' display widths.
+LINE_CACHE_SIZE = 4096
@@ -4,16 +4,213 @@
 """Contains all useful types and classes"""
 
 from constants import ELEMENT_PREFIX  # import ELEMENT_PREFIX constant
+from constants import PRINT_ORDER  # import PRINT_ORDER constant
+
+from array import array
+from heapq import merge
 
 
 class Content(object):
 
     """Contents class"""
 
+    __slots__ = ("name", "type")
+
     def __init__(self, name, type):
 
         self.name = name
 
         self.type = type
 
-        self.linePrefix = ELEMENT_PREFIX[self.type]
+    @property
+    def linePrefix(self):
+
+        """Line prefix of content's type"""
+
+        return ELEMENT_PREFIX[self.type]
+
+
+class ContentStore(object):
+
+    """Compact, list-like store of Contents.
+
+    01) Instead of one Content-object per content, names are stored
+        utf-8 encoded in a single `buffer`, located by `starts` and
+        `lengths` arrays, and types are stored as indexes of PRINT_ORDER in
+        `types` array. A content costs its encoded name plus 13 bytes.
+
+    02) Indexing and iterating return Content-objects, made on the fly.
+        Lengths, indexes, slices, insert() and del work as they do with
+        lists, so that a ContentStore can be browsed like a list.
+
+    03) Names are appended to `buffer` only, inserting or deleting contents
+        moves array items but not names. Space of deleted names is
+        reclaimed by compacting `buffer` once it is mostly unused.
+
+    04) All contents can be replaced in place, as with lists, by assigning
+        to the whole slice: store[:] = contents. adopt() method takes over
+        the contents of another ContentStore, at no cost.
+
+    05) `sortKeys` member holds the sorting.SortKeys contents are sorted
+        by, if any.
+    """
+
+    def __init__(self, contents=()):
+
+        # encoded names
+        self.buffer = bytearray()
+
+        # start and length of each name in buffer
+        self.starts = array('Q')
+        self.lengths = array('I')
+
+        # index in PRINT_ORDER of each content's type
+        self.types = array('B')
+
+        # bytes of buffer not used by any name
+        self.garbage = 0
+
+        # SortKeys contents are sorted by, if any.
+        self.sortKeys = None
+
+        for content in contents:
+            self.append(content.name, content.type)
+
+    def _encode_(self, name):
+
+        """Append `name` to buffer. Return its start and length"""
+
+        encoded = name.encode('utf-8', 'surrogateescape')
+
+        start = len(self.buffer)
+        self.buffer += encoded
+
+        return start, len(encoded)
+
+    def append(self, name, type):
+
+        """Append a content named `name` of type `type`"""
+
+        start, length = self._encode_(name)
+
+        self.starts.append(start)
+        self.lengths.append(length)
+        self.types.append(PRINT_ORDER.index(type))
+
+    def insert(self, index, content):
+
+        """Insert `content` before `index`"""
+
+        start, length = self._encode_(content.name)
+
+        self.starts.insert(index, start)
+        self.lengths.insert(index, length)
+        self.types.insert(index, PRINT_ORDER.index(content.type))
+
+    def name(self, index):
+
+        """Return name of content at `index`"""
+
+        start = self.starts[index]
+
+        return self.buffer[start:start + self.lengths[index]].decode(
+            'utf-8', 'surrogateescape')
+
+    def names(self):
+
+        """Return an iterator over all names, in order"""
+
+        return (self.name(index) for index in range(len(self)))
+
+    def __len__(self):
+
+        return len(self.types)
+
+    def __getitem__(self, index):
+
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        return Content(self.name(index), PRINT_ORDER[self.types[index]])
+
+    def __iter__(self):
+
+        for index in range(len(self)):
+            yield Content(self.name(index), PRINT_ORDER[self.types[index]])
+
+    def __setitem__(self, index, contents):
+
+        if index != slice(None):
+            raise TypeError("only all contents can be assigned")
+
+        # Build new columns first, `contents` may iterate over self.
+        self.adopt(ContentStore(contents))
+
+    def adopt(self, store):
+
+        """Hold contents of `store`(a ContentStore) instead, in place. They
+        are shared, not copied: `store` must not be changed any more."""
+
+        self.buffer = store.buffer
+        self.starts = store.starts
+        self.lengths = store.lengths
+        self.types = store.types
+        self.garbage = store.garbage
+
+    def __delitem__(self, index):
+
+        # Names of a slice of contents are deleted altogether.
+        if isinstance(index, slice):
+            self.garbage += sum(self.lengths[index])
+        else:
+            self.garbage += self.lengths[index]
+
+        del self.starts[index]
+        del self.lengths[index]
+        del self.types[index]
+
+        # Reclaim space of deleted names
+        if self.garbage > len(self.buffer) // 2:
+            self._compact_()
+
+    def _compact_(self):
+
+        """Rewrite buffer with used names only"""
+
+        buffer = bytearray()
+
+        for index, start in enumerate(self.starts):
+
+            self.starts[index] = len(buffer)
+            buffer += self.buffer[start:start + self.lengths[index]]
+
+        self.buffer = buffer
+        self.garbage = 0
+
+    def __sizeof__(self):
+
+        return (object.__sizeof__(self) + self.buffer.__sizeof__() +
+                self.starts.__sizeof__() + self.lengths.__sizeof__() +
+                self.types.__sizeof__())
+
+
+def mergeContents(contents, batch, key):
+
+    """Return (store, indexes): a ContentStore of `contents` and `batch`(a
+    list of Contents) merged, both sorted by `key`, and ascending indexes
+    of the contents of `batch` in it"""
+
+    # Contents of batch outlive merging, their identities stay unique.
+    batchIds = set(map(id, batch))
+
+    store = ContentStore()
+    indexes = []
+
+    for index, content in enumerate(merge(contents, batch, key=key)):
+
+        if id(content) in batchIds:
+            indexes.append(index)
+
+        store.append(content.name, content.type)
+
+    return store, indexes
@@ -0,0 +1,324 @@
+# Copyright (c) 2015 ICRL
+# See the file LICENSE for copying permission.
+
+"""Contains DiskUsage class"""
+
+from collections import OrderedDict
+from os import lstat, scandir
+from os.path import join
+from queue import Queue
+from stat import S_ISLNK
+from threading import Event, Lock, Thread
+from time import monotonic
+
+
+class Node(object):
+
+    """A directory being measured by DiskUsage"""
+
+    __slots__ = ("path", "parent", "device", "size", "pending")
+
+    def __init__(self, path, parent, device):
+
+        self.path = path
+
+        # Node of parent directory, None for directories requested.
+        self.parent = parent
+
+        # device ID of directory requested, other devices are not measured.
+        self.device = device
+
+        # bytes used by entries measured so far.
+        self.size = 0
+
+        # Directories to be measured before size is known, including itself.
+        self.pending = 1
+
+
+class Run(object):
+
+    """Directories requested at once from DiskUsage"""
+
+    def __init__(self, paths):
+
+        # paths of directories requested, not measured yet.
+        self.paths = set(paths)
+
+        # (device, inode) of files with several links, measured once.
+        self.seen = set()
+
+        self.cancelled = Event()
+
+        # directories measured, and when started.
+        self.dirs = 0
+        self.started = monotonic()
+
+
+class DiskUsage(object):
+
+    """Measures disk usage of directory trees, in background, as du -x
+    does.
+
+    01) request() method measures directories at given paths, each with
+        all its subdirectories, in a pool of `workers` daemon threads. Each
+        directory is measured by a task of its own, so that any tree is
+        measured in parallel. A request cancels the previous one.
+
+    02) Disk usage counts allocated blocks. Files with several hard links
+        are counted once per request, in whichever directory is measured
+        first. Links and other filesystems are not followed.
+
+    03) get() method returns the disk usage of a directory, as measured by
+        any request, including subdirectories measured along the way. So
+        once a directory got measured, the ones below it are known too.
+        At most `maxEntries` sizes are kept, oldest ones get forgotten.
+        discard() method forgets sizes made stale by changes.
+
+    04) `notify`, if given, gets called from a worker thread whenever a
+        requested directory got measured, and at most every 0.1 seconds
+        while measuring.
+    """
+
+    def __init__(self, workers, maxEntries, notify=None):
+
+        self.maxEntries = maxEntries
+        self.notify = notify
+
+        # (Run, Node) to be measured, None stops a worker.
+        self.jobs = Queue()
+
+        # path -> size of directories measured, oldest first.
+        self.sizes = OrderedDict()
+
+        # Run requested last, None if none.
+        self.run = None
+
+        # guards sizes and Nodes.
+        self.lock = Lock()
+
+        # When notified last.
+        self.notified = 0
+
+        self.workers = []
+
+        for _ in range(workers):
+
+            worker = Thread(target=self._work_)
+
+            # Do not keep the program alive, e.g. on a hung mount.
+            worker.daemon = True
+            worker.start()
+
+            self.workers.append(worker)
+
+    def request(self, path, names):
+
+        """Measure directories named `names` in directory at `path`"""
+
+        # Previous request gets cancelled.
+        if self.run is not None:
+            self.run.cancelled.set()
+
+        device = lstat(path).st_dev
+
+        paths = [join(path, name) for name in names]
+
+        self.run = run = Run(paths)
+
+        for dirPath in paths:
+            self.jobs.put((run, Node(dirPath, None, device)))
+
+    def get(self, path):
+
+        """Return disk usage of directory at `path` in bytes, None if not
+        measured"""
+
+        return self.sizes.get(path)
+
+    def discard(self, path):
+
+        """Forget disk usage of directory at `path`, of directories below it
+        and above it, e.g. because it or its entries changed"""
+
+        prefix = join(path, "")
+
+        with self.lock:
+
+            stale = [measured for measured in self.sizes
+                     if measured == path or measured.startswith(prefix) or
+                     prefix.startswith(join(measured, ""))]
+
+            for measured in stale:
+                del self.sizes[measured]
+
+    def measuring(self, path):
+
+        """Return whether directory at `path` is being measured"""
+
+        return self.run is not None and path in self.run.paths
+
+    def progress(self):
+
+        """Return (directories requested not measured yet, directories
+        measured, seconds elapsed) of last request"""
+
+        run = self.run
+
+        if run is None:
+            return (0, 0, 0)
+
+        return (len(run.paths), run.dirs, monotonic() - run.started)
+
+    def _work_(self):
+
+        """Measure directories, until stopped"""
+
+        while True:
+
+            job = self.jobs.get()
+
+            # Stopped.
+            if job is None:
+                return
+
+            run, node = job
+
+            if run.cancelled.is_set():
+                continue
+
+            size = 0
+            children = []
+
+            # Requested one, count itself unless mounted.
+            if node.parent is None:
+
+                try:
+                    st = lstat(node.path)
+                except OSError:
+                    st = None
+
+                # Gone, mounted or a link(listed as a directory when it
+                # links to one), not measured.
+                if (st is None or st.st_dev != node.device or
+                        S_ISLNK(st.st_mode)):
+
+                    with self.lock:
+                        run.paths.discard(node.path)
+
+                    continue
+
+                size += st.st_blocks * 512
+
+            try:
+                with scandir(node.path) as entries:
+
+                    for entry in entries:
+
+                        try:
+                            st = entry.stat(follow_symlinks=False)
+
+                        # Removed meanwhile, the others still count.
+                        except OSError:
+                            continue
+
+                        if entry.is_dir(follow_symlinks=False):
+
+                            # Mounted, not measured.
+                            if st.st_dev != node.device:
+                                continue
+
+                            child = Node(entry.path, node, node.device)
+
+                            # Counted along with its entries.
+                            child.size = st.st_blocks * 512
+                            children.append(child)
+
+                            continue
+
+                        # Hard linked, measured once.
+                        if st.st_nlink > 1:
+
+                            with self.lock:
+
+                                if (st.st_dev, st.st_ino) in run.seen:
+                                    continue
+
+                                run.seen.add((st.st_dev, st.st_ino))
+
+                        size += st.st_blocks * 512
+
+            # Unreadable or gone, measured as far as possible.
+            except OSError:
+                pass
+
+            with self.lock:
+
+                run.dirs += 1
+
+                node.size += size
+                node.pending += len(children)
+
+            for child in children:
+                self.jobs.put((run, child))
+
+            self._done_(run, node)
+
+    def _done_(self, run, node):
+
+        """Account for `node` measured, and its parent, if all its
+        directories were"""
+
+        # Whether a requested directory got measured.
+        measured = False
+
+        with self.lock:
+
+            while node is not None:
+
+                node.pending -= 1
+
+                if node.pending:
+                    break
+
+                self.sizes[node.path] = node.size
+                self.sizes.move_to_end(node.path)
+
+                if node.parent is None:
+                    run.paths.discard(node.path)
+                    measured = True
+                else:
+                    node.parent.size += node.size
+
+                node = node.parent
+
+            # Forget oldest sizes.
+            while len(self.sizes) > self.maxEntries:
+                self.sizes.popitem(last=False)
+
+        if self.notify is None or run.cancelled.is_set():
+            return
+
+        if measured or monotonic() - self.notified >= 0.1:
+
+            self.notified = monotonic()
+            self.notify()
+
+    def cancel(self):
+
+        """Stop measuring"""
+
+        if self.run is not None:
+
+            self.run.cancelled.set()
+
+            with self.lock:
+                self.run.paths.clear()
+
+    def close(self):
+
+        """Cancel request and stop workers"""
+
+        self.cancel()
+
+        for _ in self.workers:
+            self.jobs.put(None)
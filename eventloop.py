@@ -0,0 +1,143 @@
+# Copyright (c) 2015 ICRL
+# See the file LICENSE for copying permission.
+
+"""Contains EventLoop class"""
+
+import os
+
+from heapq import heappush, heappop
+from selectors import DefaultSelector, EVENT_READ
+from threading import Lock
+from time import monotonic
+
+
+class EventLoop(object):
+
+    """Waits, without polling, for events coming from any of several
+    sources, each known by a name.
+
+    01) register() method adds a file(anything having a fileno() method,
+        or a file descriptor) as a source, ready when it is readable.
+
+    02) wake() method makes a source ready from any thread, e.g. a
+        background worker having results. It writes to an internal pipe,
+        which wait() also waits for.
+
+    03) setTimer() method makes a source ready after a delay.
+
+    04) wait() method blocks until at least one source is ready, and
+        returns the set of names of ready sources.
+    """
+
+    def __init__(self):
+
+        self.selector = DefaultSelector()
+
+        # Pipe waking up wait().
+        self.wakeRead, self.wakeWrite = os.pipe()
+
+        for fd in (self.wakeRead, self.wakeWrite):
+            os.set_blocking(fd, False)
+
+        self.selector.register(self.wakeRead, EVENT_READ, None)
+
+        # Names woken up, guarded by lock.
+        self.woken = set()
+        self.lock = Lock()
+
+        # heap of (deadline, name) pairs and name -> deadline of timers set.
+        self.timers = []
+        self.deadlines = {}
+
+    def register(self, name, fileobj):
+
+        """Make `name` ready whenever `fileobj` is readable"""
+
+        self.selector.register(fileobj, EVENT_READ, name)
+
+    def unregister(self, fileobj):
+
+        """Stop waiting for `fileobj`"""
+
+        self.selector.unregister(fileobj)
+
+    def wake(self, name):
+
+        """Make `name` ready. Can be called from any thread."""
+
+        with self.lock:
+            self.woken.add(name)
+
+        try:
+            os.write(self.wakeWrite, b"\0")
+
+        # Pipe is full, wait() will wake up anyway.
+        except BlockingIOError:
+            pass
+
+    def setTimer(self, name, delay):
+
+        """Make `name` ready after `delay` seconds, unless a timer for
+        `name` is already set to expire earlier."""
+
+        deadline = monotonic() + delay
+
+        if self.deadlines.get(name, deadline + 1) > deadline:
+
+            self.deadlines[name] = deadline
+
+            heappush(self.timers, (deadline, name))
+
+    def cancelTimer(self, name):
+
+        """Cancel timer set for `name`, if any"""
+
+        self.deadlines.pop(name, None)
+
+    def wait(self):
+
+        """Block until some sources are ready, return their names"""
+
+        ready = set()
+
+        while not ready:
+
+            # Time left before next timer expires, None for no timer.
+            timeout = None
+
+            if self.timers:
+                timeout = max(0, self.timers[0][0] - monotonic())
+
+            for key, _ in self.selector.select(timeout):
+
+                if key.data is not None:
+                    ready.add(key.data)
+
+                # Woken up, empty the pipe.
+                else:
+
+                    try:
+                        while os.read(self.wakeRead, 4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+
+            with self.lock:
+                ready.update(self.woken)
+                self.woken.clear()
+
+            now = monotonic()
+
+            # Expired timers.
+            while self.timers and self.timers[0][0] <= now:
+
+                deadline, name = heappop(self.timers)
+
+                # Neither cancelled nor replaced by an earlier timer.
+                if self.deadlines.get(name) == deadline:
+
+                    del self.deadlines[name]
+
+                    ready.add(name)
+
+        return ready
@@ -0,0 +1,254 @@
+# Copyright (c) 2015 ICRL
+# See the file LICENSE for copying permission.
+
+"""Headless listing mode: lists directories as the browser does and writes
+their contents to standard output, one record per line, without curses.
+
+Usage : python main.py --list [options] [path ...]
+        python export.py [options] [path ...]
+
+Run with --help for options."""
+
+import argparse
+import json
+import os
+import sys
+
+from queue import Queue
+from threading import Thread
+
+from constants import CONTENT_TYPE, PRINT_ORDER, SORT_ORDERS
+from constants import EXPORT_BATCH, EXPORT_QUEUE_BATCHES, EXPORT_WORKERS
+from listing import getContents
+from tools import scanLocals
+
+
+# Escapes of characters which would break tab separated lines.
+TSV_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n",
+                             "\r": "\\r"})
+
+
+def ndjsonLines(path, batch):
+
+    """Return a JSON object per line for each (name, type) of `batch`, in
+    directory at `path`"""
+
+    # Same for the whole batch.
+    prefix = '{"path": %s, "type": "' % json.dumps(path)
+
+    return "".join('%s%s", "name": %s}\n' % (prefix, type, json.dumps(name))
+                   for name, type in batch)
+
+
+def tsvLines(path, batch):
+
+    """Return a line of tab separated path, type and name for each (name,
+    type) of `batch`, in directory at `path`. Backslashes, tabs and line
+    breaks are escaped by backslashes."""
+
+    path = path.translate(TSV_ESCAPES)
+
+    return "".join("%s\t%s\t%s\n" % (path, type, name.translate(TSV_ESCAPES))
+                   for name, type in batch)
+
+
+# name -> function formatting records of each output format.
+FORMATS = {"ndjson": ndjsonLines, "tsv": tsvLines}
+
+
+def listBatches(path, order, batches):
+
+    """List directory at `path` sorted in `order`(in directory order if
+    None) into `batches`(a Queue): lists of at most EXPORT_BATCH (name,
+    type) pairs, then None. An error message is put before None if listing
+    failed."""
+
+    try:
+        # Streamed as read, never held whole.
+        if order is None:
+
+            for dirContents in scanLocals(path).lsdirBatches(EXPORT_BATCH,
+                                                             EXPORT_BATCH):
+                batches.put([(name, CONTENT_TYPE[filetype])
+                             for filetype in dirContents
+                             for name in dirContents[filetype]])
+
+        else:
+            contents = getContents(path, None, order, False)
+
+            for start in range(0, len(contents), EXPORT_BATCH):
+                batches.put([(contents.name(index),
+                              PRINT_ORDER[contents.types[index]])
+                             for index in range(start, min(
+                                 len(contents), start + EXPORT_BATCH))])
+
+    except OSError as error:
+        batches.put(error.strerror or str(error))
+
+    # Raised by tools.scanLocals, if not a directory or missing.
+    except ValueError:
+        batches.put("not a directory" if os.path.lexists(path) else
+                    "no such file or directory")
+
+    batches.put(None)
+
+
+def listWorker(jobs, order):
+
+    """List directories of `jobs`(a Queue of (path, batches Queue)), see
+    listBatches(), until None is received"""
+
+    while True:
+
+        job = jobs.get()
+
+        if job is None:
+            return
+
+        path, batches = job
+
+        listBatches(path, order, batches)
+
+
+def export(paths, output, format=ndjsonLines, order=SORT_ORDERS[0],
+           workers=EXPORT_WORKERS, errors=sys.stderr):
+
+    """Write contents of directories at `paths`(an iterable) to `output`,
+    one record per line formatted by `format`, sorted in `order`(in
+    directory order if None). Return number of paths which could not be
+    listed, each reported to `errors`.
+
+    Directories are listed by a pool of `workers` daemon threads, and
+    written in the order of `paths`. Each directory is handed over in
+    batches, at most EXPORT_QUEUE_BATCHES at once, and at most `workers`
+    directories are listed ahead: memory is bounded whatever the number
+    of paths, and, in directory order, whatever the number of entries."""
+
+    jobs = Queue()
+
+    for _ in range(workers):
+
+        worker = Thread(target=listWorker, args=(jobs, order))
+
+        # Do not keep the program alive, e.g. on a hung mount.
+        worker.daemon = True
+        worker.start()
+
+    paths = iter(paths)
+
+    # (path, batches Queue) being listed, in order.
+    listing = []
+
+    failed = 0
+
+    while True:
+
+        # Keep workers busy.
+        while len(listing) < workers:
+
+            path = next(paths, None)
+
+            if path is None:
+                break
+
+            batches = Queue(EXPORT_QUEUE_BATCHES)
+
+            jobs.put((path, batches))
+            listing.append((path, batches))
+
+        if not listing:
+            break
+
+        path, batches = listing.pop(0)
+
+        for batch in iter(batches.get, None):
+
+            # Error message.
+            if isinstance(batch, str):
+                errors.write("%s: %s\n" % (path, batch))
+                failed += 1
+
+            else:
+                output.write(format(path, batch))
+
+    # Stop workers.
+    for _ in range(workers):
+        jobs.put(None)
+
+    output.flush()
+
+    return failed
+
+
+def readPaths(paths, stdin=sys.stdin):
+
+    """Yield `paths`, reading those from `stdin` instead of "-", one per
+    line"""
+
+    for path in paths:
+
+        if path != "-":
+            yield path
+            continue
+
+        for line in stdin:
+
+            line = line.rstrip("\n")
+
+            if line:
+                yield line
+
+
+def run(argv=None):
+
+    """Run headless listing mode with command line arguments `argv`
+    (sys.argv[1:] if None), return exit status"""
+
+    parser = argparse.ArgumentParser(
+        prog="dex --list",
+        description="List directories as dex does, a record per entry: "
+                    "directories first, then files, each sorted.")
+
+    parser.add_argument("paths", nargs="*", default=["."], metavar="path",
+                        help="directory to list(default: .), - reads "
+                             "paths from standard input, one per line")
+    parser.add_argument("--format", choices=sorted(FORMATS),
+                        default="ndjson",
+                        help="JSON objects or tab separated path, type and "
+                             "name(default: ndjson)")
+    parser.add_argument("--order", choices=SORT_ORDERS + ("none",),
+                        default=SORT_ORDERS[0],
+                        help="sort order, none streams entries in "
+                             "directory order(default: %s)" % SORT_ORDERS[0])
+    parser.add_argument("--workers", type=int, default=EXPORT_WORKERS,
+                        help="directories listed at once(default: %d)" %
+                             EXPORT_WORKERS)
+
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    # Names which are not valid utf-8 are written as they are.
+    sys.stdout.reconfigure(errors="surrogateescape")
+
+    try:
+        failed = export(readPaths(args.paths), sys.stdout,
+                        FORMATS[args.format],
+                        None if args.order == "none" else args.order,
+                        args.workers)
+
+    # Output closed early, e.g. piped to head.
+    except BrokenPipeError:
+
+        # Do not fail flushing standard output at exit.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+        return 1
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+
+    sys.exit(run())
@@ -0,0 +1,585 @@
+# Copyright (c) 2015 ICRL
+# See the file LICENSE for copying permission.
+
+"""Contains FileOperations class, copying, moving and deleting files"""
+
+import ctypes
+import errno
+import os
+
+from os import O_CREAT, O_EXCL, O_RDONLY, O_WRONLY, lstat, scandir
+from os.path import basename, dirname, join, lexists
+from queue import Queue
+from shutil import copystat, rmtree
+from stat import S_ISDIR, S_ISLNK, S_ISREG
+from threading import Event, Lock, Thread
+from time import monotonic
+
+from constants import FILEOPS_CHUNK
+
+
+# actions of file operations.
+FILEOPS_ACTIONS = ('copy', 'move', 'delete')
+
+# errors telling a way of copying is not supported, next one is tried.
+UNSUPPORTED = (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP,
+               errno.ENOTSUP)
+
+
+# renameat2() flag failing with EEXIST instead of replacing target, and
+# directory file descriptor standing for the current directory.
+RENAME_NOREPLACE = 1
+AT_FDCWD = -100
+
+
+def _renameat2_():
+
+    """Return libc's renameat2(), None if it does not provide it"""
+
+    try:
+        # Symbols python is linked with, libc's included, as in watcher.
+        return ctypes.CDLL(None, use_errno=True).renameat2
+    except (OSError, AttributeError):
+        return None
+
+
+renameat2 = _renameat2_()
+
+
+def renameNoReplace(path, targetPath):
+
+    """Rename entry at `path` to `targetPath`, atomically failing with
+    EEXIST if an entry exists there: with renameat2(RENAME_NOREPLACE),
+    with link() then unlink() where not supported. Directories there
+    are checked for first, one created in between may get replaced(if
+    empty, as rename() does)."""
+
+    if renameat2 is not None:
+
+        if not renameat2(AT_FDCWD, os.fsencode(path), AT_FDCWD,
+                         os.fsencode(targetPath), RENAME_NOREPLACE):
+            return
+
+        code = ctypes.get_errno()
+
+        # Not supported by kernel or filesystem.
+        if code not in (errno.ENOSYS, errno.EINVAL):
+            raise OSError(code, os.strerror(code), path, None, targetPath)
+
+    if not S_ISDIR(lstat(path).st_mode):
+
+        try:
+            # A link never replaces an entry.
+            os.link(path, targetPath, follow_symlinks=False)
+
+        except OSError as error:
+
+            # Exists, or across filesystems.
+            if error.errno in (errno.EEXIST, errno.EXDEV):
+                raise
+
+        else:
+            os.unlink(path)
+            return
+
+    if lexists(targetPath):
+        raise OSError(errno.EEXIST, os.strerror(errno.EEXIST), targetPath)
+
+    os.rename(path, targetPath)
+
+
+def copyRange(source, target, count):
+
+    """Copy at most `count` bytes from file descriptor `source` to
+    `target` within kernel, from their current positions"""
+
+    return os.copy_file_range(source, target, count)
+
+
+def sendFile(source, target, count):
+
+    """Copy at most `count` bytes from file descriptor `source` to
+    `target` within kernel, from their current positions"""
+
+    return os.sendfile(target, source, None, count)
+
+
+def readWrite(source, target, count):
+
+    """Copy at most `count` bytes from file descriptor `source` to
+    `target` through user space, from their current positions"""
+
+    data = os.read(source, count)
+    view = memoryview(data)
+
+    while view:
+        view = view[os.write(target, view):]
+
+    return len(data)
+
+
+# ways of copying, fastest first.
+COPY_METHODS = [method for method, supported in (
+    (copyRange, hasattr(os, "copy_file_range")),
+    (sendFile, hasattr(os, "sendfile")),
+    (readWrite, True)) if supported]
+
+
+def copyData(source, target, progress, cancelled):
+
+    """Copy file descriptor `source` to `target` till its end,
+    FILEOPS_CHUNK bytes at a time: in kernel, with copy_file_range() or
+    sendfile(), unless not supported. `progress(bytes)` is called after
+    each chunk. Return False if `cancelled`(an Event) got set."""
+
+    methods = list(COPY_METHODS)
+
+    while True:
+
+        if cancelled.is_set():
+            return False
+
+        try:
+            copied = methods[0](source, target, FILEOPS_CHUNK)
+
+        # Not supported, e.g. across filesystems, try next way.
+        except OSError as error:
+
+            if error.errno not in UNSUPPORTED or len(methods) == 1:
+                raise
+
+            methods.pop(0)
+
+            continue
+
+        # End of file.
+        if not copied:
+            return True
+
+        progress(copied)
+
+
+class Operation(object):
+
+    """A copy, move or delete of files requested at once from
+    FileOperations"""
+
+    def __init__(self, action, sources, target):
+
+        self.action = action
+
+        # paths of entries, and of directory they get copied or moved to
+        # (None if deleted).
+        self.sources = list(sources)
+        self.target = target
+
+        # Directories whose contents change.
+        self.affected = set(dirname(path) for path in self.sources)
+
+        if target is not None:
+            self.affected.add(target)
+
+        self.cancelled = Event()
+
+        # bytes copied(entries deleted) so far, out of `total`.
+        self.done = 0
+        self.total = 0
+
+        # Tasks not run yet, once planned.
+        self.pending = 0
+
+        # (path, message) of entries which failed.
+        self.errors = []
+
+        # Directories created(copying) or to be removed(deleting), parents
+        # first. Sources copied to be removed, moving across filesystems.
+        self.dirs = []
+        self.copied = []
+
+        # Whether all tasks were run.
+        self.finished = False
+
+        self.started = monotonic()
+
+    def progress(self):
+
+        """Return (done, total, rate per second, seconds left, None if not
+        known)"""
+
+        elapsed = monotonic() - self.started
+
+        rate = self.done / elapsed if elapsed > 0 else 0
+
+        left = None
+
+        if rate > 0:
+            left = (self.total - self.done) / rate
+
+        return (self.done, self.total, rate, left)
+
+
+class FileOperations(object):
+
+    """Copies, moves and deletes files in background, in a pool of
+    `workers` daemon threads.
+
+    01) request() method starts copying(or moving) entries into a
+        directory, or deleting them, and returns the Operation. Each file
+        is copied(or deleted) by a task of its own, so that any tree is
+        processed in parallel.
+
+    02) Files are copied in kernel, with copy_file_range() or sendfile(),
+        falling back to read() and write() if none is supported. Modes and
+        times are copied, links are copied as links. Entries are moved
+        with rename(), or copied and then deleted across filesystems.
+        Existing entries are never overwritten(see renameNoReplace() for
+        directories moved on old systems).
+
+    03) Operation's progress() method returns bytes copied(or entries
+        deleted), with its rate and the time left. collect() method
+        returns Operations finished since last call. `running` member
+        holds Operations not finished yet.
+
+    04) cancel() method stops all operations as soon as possible, files
+        partially copied are removed.
+
+    05) `notify`, if given, gets called from a worker thread whenever an
+        operation finished, and at most every 0.1 seconds while
+        operating.
+    """
+
+    def __init__(self, workers, notify=None):
+
+        self.notify = notify
+
+        # (Operation, task) to be run, task is None to plan an Operation,
+        # None stops a worker.
+        self.jobs = Queue()
+
+        # Operations not finished yet, and finished ones not collected.
+        self.running = []
+        self.finished = []
+
+        # guards Operations.
+        self.lock = Lock()
+
+        # When notified last.
+        self.notified = 0
+
+        self.workers = []
+
+        for _ in range(workers):
+
+            worker = Thread(target=self._work_)
+
+            # Do not keep the program alive, e.g. on a hung mount.
+            worker.daemon = True
+            worker.start()
+
+            self.workers.append(worker)
+
+    def request(self, action, sources, target=None):
+
+        """Copy or move(`action`) entries at `sources` into directory at
+        `target`, or delete them, return Operation"""
+
+        operation = Operation(action, sources, target)
+
+        with self.lock:
+            self.running.append(operation)
+
+        self.jobs.put((operation, None))
+
+        return operation
+
+    def collect(self):
+
+        """Return list of Operations finished since last call"""
+
+        with self.lock:
+            finished, self.finished = self.finished, []
+
+        return finished
+
+    def _work_(self):
+
+        """Run tasks, until stopped"""
+
+        while True:
+
+            job = self.jobs.get()
+
+            # Stopped.
+            if job is None:
+                return
+
+            operation, task = job
+
+            if task is None:
+                tasks = self._plan_(operation)
+
+                with self.lock:
+                    operation.pending += len(tasks)
+
+                for task in tasks:
+                    self.jobs.put((operation, task))
+
+            elif not operation.cancelled.is_set():
+                self._run_(operation, *task)
+
+            with self.lock:
+
+                operation.pending -= 1
+
+                # Planned and all tasks run.
+                finished = operation.pending < 0
+
+            if finished:
+                self._finish_(operation)
+
+            else:
+                self._notify_(False)
+
+    def _fail_(self, operation, path, error):
+
+        """Record that entry at `path` failed with `error`"""
+
+        message = getattr(error, "strerror", None) or str(error)
+
+        with self.lock:
+            operation.errors.append((path, message))
+
+    def _plan_(self, operation):
+
+        """Prepare `operation`, return list of its tasks: (source, target
+        path, size) of files to be copied, (source, None, 0) of files to be
+        deleted"""
+
+        tasks = []
+
+        # Entries deleted are counted, not bytes.
+        if operation.action == 'delete':
+
+            for path in operation.sources:
+                self._walk_(operation, path, None, tasks)
+
+            operation.total = len(tasks)
+
+            return tasks
+
+        for path in operation.sources:
+
+            if operation.cancelled.is_set():
+                break
+
+            targetPath = join(operation.target, basename(path))
+
+            if lexists(targetPath):
+                self._fail_(operation, path, "%s exists" % targetPath)
+                continue
+
+            # Into itself.
+            if (targetPath + os.sep).startswith(path + os.sep):
+                self._fail_(operation, path, "can't copy into itself")
+                continue
+
+            if operation.action == 'move':
+
+                try:
+                    renameNoReplace(path, targetPath)
+                    continue
+
+                # Across filesystems, copied then deleted.
+                except OSError as error:
+
+                    if error.errno != errno.EXDEV:
+                        self._fail_(operation, path, error)
+                        continue
+
+                operation.copied.append(path)
+
+            self._walk_(operation, path, targetPath, tasks)
+
+        operation.total = sum(task[2] for task in tasks)
+
+        return tasks
+
+    def _walk_(self, operation, path, targetPath, tasks):
+
+        """Add tasks copying entry at `path` to `targetPath`(deleting it if
+        None) to `tasks`, with entries below it. Directories and links get
+        created along the way."""
+
+        # (path, target path) of entries to be walked.
+        pending = [(path, targetPath)]
+
+        while pending:
+
+            if operation.cancelled.is_set():
+                return
+
+            path, targetPath = pending.pop()
+
+            try:
+                st = lstat(path)
+
+                if not S_ISDIR(st.st_mode):
+
+                    if targetPath is None:
+                        tasks.append((path, None, 0))
+
+                    elif S_ISREG(st.st_mode):
+                        tasks.append((path, targetPath, st.st_size))
+
+                    elif S_ISLNK(st.st_mode):
+                        os.symlink(os.readlink(path), targetPath)
+
+                    else:
+                        self._fail_(operation, path, "not a regular file")
+
+                    continue
+
+                # Created as it can be written to, mode is set once copied.
+                if targetPath is not None:
+                    os.mkdir(targetPath, 0o700)
+
+                operation.dirs.append((path, targetPath))
+
+                with scandir(path) as entries:
+
+                    for entry in entries:
+                        pending.append((entry.path,
+                                        None if targetPath is None else
+                                        join(targetPath, entry.name)))
+
+            except OSError as error:
+                self._fail_(operation, path, error)
+
+    def _run_(self, operation, path, targetPath, size):
+
+        """Copy file at `path` to `targetPath`, delete it if None"""
+
+        try:
+            if targetPath is None:
+
+                os.unlink(path)
+
+                with self.lock:
+                    operation.done += 1
+
+                return
+
+            source = os.open(path, O_RDONLY)
+
+            try:
+                target = os.open(targetPath, O_WRONLY | O_CREAT | O_EXCL,
+                                 0o600)
+
+                try:
+                    copied = copyData(source, target,
+                                      lambda count: self._copied_(operation,
+                                                                  count),
+                                      operation.cancelled)
+                finally:
+                    os.close(target)
+
+            finally:
+                os.close(source)
+
+            # Partially copied.
+            if not copied:
+                os.unlink(targetPath)
+                return
+
+            copystat(path, targetPath, follow_symlinks=False)
+
+        except OSError as error:
+            self._fail_(operation, path, error)
+
+    def _copied_(self, operation, count):
+
+        """Account for `count` bytes copied by `operation`"""
+
+        with self.lock:
+            operation.done += count
+
+        self._notify_(False)
+
+    def _finish_(self, operation):
+
+        """Complete `operation`, all of its tasks were run"""
+
+        # Set directories' modes and times, once their files are copied.
+        # Remove directories deleted, once empty. Children first.
+        for path, targetPath in reversed(operation.dirs):
+
+            try:
+                if targetPath is None:
+                    os.rmdir(path)
+
+                else:
+                    copystat(path, targetPath, follow_symlinks=False)
+
+            except OSError as error:
+                self._fail_(operation, path, error)
+
+        # Moved across filesystems, delete sources once copied.
+        if (operation.copied and not operation.errors and
+                not operation.cancelled.is_set()):
+
+            for path in operation.copied:
+
+                try:
+                    if S_ISDIR(lstat(path).st_mode):
+                        rmtree(path)
+                    else:
+                        os.unlink(path)
+
+                except OSError as error:
+                    self._fail_(operation, path, error)
+
+        with self.lock:
+
+            operation.finished = True
+
+            self.running.remove(operation)
+            self.finished.append(operation)
+
+        self._notify_(True)
+
+    def _notify_(self, finished):
+
+        """Notify whether an operation `finished`, or about progress every
+        once in a while"""
+
+        if self.notify is None:
+            return
+
+        if finished or monotonic() - self.notified >= 0.1:
+
+            self.notified = monotonic()
+            self.notify()
+
+    def cancel(self):
+
+        """Stop all operations"""
+
+        with self.lock:
+
+            for operation in self.running:
+                operation.cancelled.set()
+
+    def close(self, timeout=1.0):
+
+        """Cancel operations and stop workers, waiting at most `timeout`
+        seconds for files partially copied to be removed"""
+
+        self.cancel()
+
+        for _ in self.workers:
+            self.jobs.put(None)
+
+        deadline = monotonic() + timeout
+
+        for worker in self.workers:
+            worker.join(max(0, deadline - monotonic()))
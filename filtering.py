@@ -0,0 +1,259 @@
+# Copyright (c) 2015 ICRL
+# See the file LICENSE for copying permission.
+
+"""Contains NameIndex, NameFilter and FilteredView classes, to filter a
+list of Contents by name"""
+
+import re
+
+from array import array
+from bisect import bisect_left, bisect_right
+from fnmatch import translate
+from itertools import accumulate, chain, compress, count, repeat
+from operator import add
+
+from dtypes import ContentStore
+
+
+# Supported ways of matching names.
+FILTER_MODES = ('prefix', 'substring', 'fuzzy')
+
+
+def contentNames(contents):
+
+    """Return an iterator over names of `contents`"""
+
+    if isinstance(contents, ContentStore):
+        return contents.names()
+
+    return (content.name for content in contents)
+
+
+def globIndexes(contents, pattern):
+
+    """Return list of indexes, in ascending order, of `contents` whose name
+    matches glob `pattern`, case insensitively.
+
+    Names of a ContentStore are matched where they lie in its buffer, by
+    C code iterating over its arrays, unless some are not ASCII."""
+
+    fullmatch = re.compile(translate(pattern.casefold())).fullmatch
+
+    if isinstance(contents, ContentStore) and contents.buffer.isascii():
+
+        # Offsets of bytes and characters are the same.
+        text = contents.buffer.decode('ascii').lower()
+
+        return list(compress(count(), map(
+            fullmatch, repeat(text), contents.starts,
+            map(add, contents.starts, contents.lengths))))
+
+    return [index for index, name in enumerate(contentNames(contents))
+            if fullmatch(name.casefold())]
+
+
+class NameIndex(object):
+
+    """Index of names of a list of Contents, built once per list.
+
+    01) Names are case-folded. Matching is case insensitive.
+
+    02) `buffer` member holds all names, one per line, so that regular
+        expressions can scan all of them at once. `starts` member holds the
+        index of the first character of each name in `buffer`.
+
+    03) `order` member holds indexes of contents sorted by name. It is
+        built on the first prefix search, which then costs a binary search.
+
+    04) search() method returns the indexes, in ascending order, of
+        contents whose name matches a query.
+    """
+
+    def __init__(self, contents):
+
+        # case-folded names
+        self.names = [name.casefold() for name in contentNames(contents)]
+
+        self.buffer = "\n".join(self.names)
+
+        # start of each name in buffer, a name and a newline after another.
+        self.starts = array('L', accumulate(chain(
+            [0], (len(name) + 1 for name in self.names))))
+
+        # indexes sorted by name, see _prefix_()
+        self.order = None
+
+    def _pattern_(self, mode, query):
+
+        """Return compiled regular expression matching a line of buffer,
+        from the matched part to the end of the line"""
+
+        if mode == 'prefix':
+            pattern = "^" + re.escape(query)
+
+        elif mode == 'substring':
+            pattern = re.escape(query)
+
+        # Characters of query in the same order, anything in between.
+        else:
+            pattern = "[^\n]*?".join(re.escape(char) for char in query)
+
+        return re.compile(pattern + "[^\n]*", re.MULTILINE)
+
+    def _prefix_(self, query):
+
+        """Return indexes of names starting with `query`"""
+
+        if self.order is None:
+            self.order = array('L', sorted(range(len(self.names)),
+                                           key=self.names.__getitem__))
+
+        # Names starting with query lie together in sorted order.
+        start = bisect_left(self.order, query, key=self.names.__getitem__)
+        end = bisect_left(self.order, query + "\U0010ffff",
+                          key=self.names.__getitem__)
+
+        return sorted(self.order[start:end])
+
+    def search(self, mode, query, within=None):
+
+        """Return list of indexes of names matching `query` in `mode`(one
+        of FILTER_MODES).
+
+        If `within`, a list of indexes, is given, only those names are
+        searched. It is used to refine results of a shorter query."""
+
+        query = query.casefold()
+
+        if within is not None:
+
+            names = self.names
+
+            if mode == 'prefix':
+                return [i for i in within if names[i].startswith(query)]
+
+            if mode == 'substring':
+                return [i for i in within if query in names[i]]
+
+            search = self._pattern_(mode, query).search
+
+            return [i for i in within if search(names[i])]
+
+        if mode == 'prefix':
+            return self._prefix_(query)
+
+        # A single character matches most names, testing each name is
+        # cheaper than locating each match in buffer.
+        if len(query) == 1:
+            return [i for i, name in enumerate(self.names) if query in name]
+
+        starts = self.starts
+
+        # A line per match, see _pattern_()
+        return [bisect_right(starts, match.start()) - 1
+                for match in self._pattern_(mode, query).finditer(
+                    self.buffer)]
+
+
+class NameFilter(object):
+
+    """Incrementally filters names of a NameIndex.
+
+    01) setQuery() method filters names by a query, refining results of
+        the longest previous query which the new one starts with, instead
+        of searching all names again. Results of previous queries are kept,
+        so that erasing characters costs nothing.
+
+    02) setMode() method changes the way names are matched, one of
+        FILTER_MODES, and filters all names again.
+
+    03) `results` member holds indexes of matching names, in ascending
+        order, or None if there is no query.
+    """
+
+    def __init__(self, index, mode=FILTER_MODES[0]):
+
+        self.index = index
+        self.mode = mode
+
+        self.query = ""
+        self.results = None
+
+        # (query, results) of previous queries, each starting with the
+        # previous one.
+        self.history = []
+
+    def setQuery(self, query):
+
+        """Filter names by `query`"""
+
+        # Forget previous queries the new one does not extend.
+        while self.history and not query.startswith(self.history[-1][0]):
+            self.history.pop()
+
+        self.query = query
+
+        if not query:
+            self.results = None
+
+        elif self.history and self.history[-1][0] == query:
+            self.results = self.history[-1][1]
+
+        else:
+
+            # Refine results of the longest previous query.
+            within = self.history[-1][1] if self.history else None
+
+            self.results = self.index.search(self.mode, query, within)
+
+            self.history.append((query, self.results))
+
+    def setMode(self, mode):
+
+        """Match names in `mode` from now on"""
+
+        self.mode = mode
+
+        self.history = []
+
+        self.setQuery(self.query)
+
+
+class FilteredView(object):
+
+    """Read-only, list-like view of contents at some indexes of a list of
+    Contents, browsed instead of the whole list while filtering."""
+
+    def __init__(self, contents, indexes):
+
+        self.contents = contents
+        self.indexes = indexes
+
+    @property
+    def sortKeys(self):
+
+        """SortKeys of the whole list"""
+
+        return self.contents.sortKeys
+
+    def sourceIndex(self, index):
+
+        """Return index in the whole list of content at `index`"""
+
+        return self.indexes[index]
+
+    def __len__(self):
+
+        return len(self.indexes)
+
+    def __getitem__(self, index):
+
+        if isinstance(index, slice):
+            return [self.contents[i] for i in self.indexes[index]]
+
+        return self.contents[self.indexes[index]]
+
+    def __iter__(self):
+
+        for index in self.indexes:
+            yield self.contents[index]
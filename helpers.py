@@ -2,10 +2,183 @@
 # See the file LICENSE for copying permission.
 
 from constants import *  # import all constants
-from config import curses, BOLD  # import configured curses and other configs
+from config import curses, BOLD, colorPair  # configured curses and others
 
+from stat import filemode
+from time import localtime, strftime
+from unicodedata import category, east_asian_width
 
-def prepareLine(Item, select, Width):
+
+class LineCache(object):
+
+    """Lines prepared by prepareLine() for a screen `width`, so that
+    rendering a line again costs a lookup.
+
+    01) `lines` member maps (name, type, selected, marked) of a content to
+        its (line, properties), for lines without metadata columns(which
+        change as metadata gets fetched).
+
+    02) `located` member maps (start, length, type, selected, marked) of a
+        content of a dtypes.ContentStore(its name's location in `buffer`
+        member, and index of its type in PRINT_ORDER) to its (line,
+        properties) likewise: a line found there costs no Content, nor
+        decoding its name. setBuffer() method forgets them once contents
+        of another buffer are rendered, names are never moved within one.
+
+    03) `widths` member maps names to their display widths, see
+        displayWidth(), whatever the screen's width.
+
+    04) setWidth() method forgets lines prepared for another width, e.g.
+        once the terminal got resized.
+
+    05) Each of them holds at most LINE_CACHE_SIZE entries, and gets
+        cleared once full: lines on screen get prepared again at most once.
+    """
+
+    def __init__(self, width=None):
+
+        self.width = width
+
+        self.lines = {}
+        self.located = {}
+        self.widths = {}
+
+        # buffer names of `located` lines are located in.
+        self.buffer = None
+
+    def setWidth(self, width):
+
+        """Prepare lines for a screen `width` columns wide"""
+
+        if width != self.width:
+            self.width = width
+            self.lines.clear()
+            self.located.clear()
+
+    def setBuffer(self, buffer):
+
+        """Prepare lines of contents whose names are located in `buffer`(a
+        ContentStore's)"""
+
+        # Held, not only compared by id: a buffer freed since can't be
+        # mistaken for another one.
+        if buffer is not self.buffer:
+            self.buffer = buffer
+            self.located.clear()
+
+    def nameWidth(self, name):
+
+        """Return display width of `name`, computed once"""
+
+        try:
+            return self.widths[name]
+
+        except KeyError:
+
+            if len(self.widths) >= LINE_CACHE_SIZE:
+                self.widths.clear()
+
+            width = self.widths[name] = displayWidth(name)
+
+            return width
+
+
+def charWidth(char):
+
+    """Return number of terminal cells `char` takes: 2 if wide(East Asian
+    wide or fullwidth), 0 if combining or a format character, 1 otherwise"""
+
+    if category(char) in ("Mn", "Me", "Cf"):
+        return 0
+
+    if east_asian_width(char) in ("W", "F"):
+        return 2
+
+    return 1
+
+
+def displayWidth(text):
+
+    """Return number of terminal cells `text` takes, see charWidth()"""
+
+    # Most names.
+    if text.isascii():
+        return len(text)
+
+    return sum(map(charWidth, text))
+
+
+def fitText(text, width, textWidth=None):
+
+    """Return `text` truncated to at most `width` cells and padded with
+    spaces to exactly `width` cells. `textWidth` is its displayWidth(), if
+    known. Wide characters are never cut in half, combining characters stay
+    with the character they follow."""
+
+    width = max(0, width)
+
+    if textWidth is None:
+        textWidth = displayWidth(text)
+
+    if textWidth <= width:
+        return text + (width - textWidth) * " "
+
+    if text.isascii():
+        return text[:width]
+
+    # Cells taken by characters kept.
+    cells = 0
+
+    for index, char in enumerate(text):
+
+        cells += charWidth(char)
+
+        if cells > width:
+            cells -= charWidth(char)
+            break
+
+    return text[:index] + (width - cells) * " "
+
+
+def formatMetadata(result):
+
+    """Return metadata columns(mode, size and mtime) of a content, from
+    its lstat() `result`. METADATA_PENDING while `result` is not known yet,
+    METADATA_MISSING if it is None(lstat() failed)."""
+
+    if result is METADATA_PENDING:
+        return METADATA_PLACEHOLDER
+
+    if result is None:
+        return METADATA_MISSING
+
+    mtime = strftime(MTIME_FORMAT, localtime(result.st_mtime))
+
+    return " %s %7s %s" % (filemode(result.st_mode),
+                           formatSize(result.st_size), mtime)
+
+
+def formatSize(size):
+
+    """Return `size`(in bytes) in human readable form, e.g. 12.3K"""
+
+    size = float(size)
+
+    for unit in SIZE_UNITS:
+
+        if size < 1024 or unit == SIZE_UNITS[-1]:
+            break
+
+        size /= 1024
+
+    if unit:
+        return "%.1f%s" % (size, unit)
+
+    return "%d" % size
+
+
+def prepareLine(Item, select, Width, columns=None, marked=False,
+                cache=None, key=None):
 
     """Prepares line to rendered on screen
 
@@ -13,23 +186,82 @@ def prepareLine(Item, select, Width):
     type     -> type of item(string)
     select   -> bool to state whether to prepare it as a select element(bool)
     Width    -> Width of screen(int/long)
+    columns  -> metadata columns rendered at the end of line, if
+                any(string). See formatMetadata().
+    marked   -> bool to state whether item is marked(bool)
+    cache    -> lines prepared earlier for `Width`, if any(LineCache)
+    key      -> key of line in `cache.located`, if Item is located in a
+                ContentStore(tuple). Keyed by its name in `cache.lines`
+                otherwise.
     """
 
-    # Spaces followed by filename i.e. Item
-    tail = (Width - (len(Item.linePrefix) + len(Item.name)) - 1) * " "
+    # Metadata columns fit only on wide enough screens.
+    if columns is None or Width < len(columns) + METADATA_MIN_NAME:
+        columns = ""
+
+    # Prepared already.
+    if cache is not None and not columns:
+
+        if key is None:
+            key = (Item.name, Item.type, select, marked)
+            lines = cache.lines
+        else:
+            lines = cache.located
+
+        try:
+            return lines[key]
+        except KeyError:
+            pass
+
+    # Width left for the name, names too long get truncated.
+    nameWidth = Width - len(Item.linePrefix) - len(columns) - 1
+
+    # Truncated or padded to its cells on screen, whatever its characters.
+    name = fitText(Item.name, nameWidth,
+                   None if cache is None else cache.nameWidth(Item.name))
+
+    # Marked items are flagged in their prefix.
+    prefix = Item.linePrefix
+
+    if marked:
+        prefix = prefix[0] + MARK_FLAG
 
     # Prepares line
-    currElement = "%s%s%s" % (Item.linePrefix, Item.name, tail)
+    currElement = "%s%s%s" % (prefix, name, columns)
 
     ## Set properties
 
-    bold, colorPair = ELEMENT_PROPERTIES[Item.type][select]
+    # Marked items have properties of their own.
+    propertiesKey = "marked" + Item.type if marked else Item.type
+
+    bold, pairNumber = ELEMENT_PROPERTIES[propertiesKey][select]
+
+    properties = colorPair(pairNumber) | BOLD[bold]
+
+    if cache is not None and not columns:
 
-    properties = curses.color_pair(colorPair) | BOLD[bold]
+        if len(lines) >= LINE_CACHE_SIZE:
+            lines.clear()
+
+        lines[key] = (currElement, properties)
 
     return (currElement, properties)
 
 
+def prepareStatus(text, Width):
+
+    """Prepares status line to be rendered on screen
+
+    text     -> status message(string)
+    Width    -> Width of screen(int/long)
+    """
+
+    # Truncate or pad with spaces to screen's width.
+    line = fitText(text, Width - 1)
+
+    return (line, colorPair(STATUS_COLORPAIR) | curses.A_BOLD)
+
+
 def sortContents(dirContents):
 
     """Sorts directory contents of types returned by tools.lsdir() function"""
@@ -37,3 +269,4 @@ def sortContents(dirContents):
     # returns
     return {key: sorted(dirContents[key], key=CONTENTS_SORTFUNC)
             for key in dirContents}
+
@@ -10,5 +10,69 @@ from dtypes import *
 # import tools
 import tools
 
-# import abspath and join
-from os.path import abspath, join
+# import directory listing engine
+from listing import getContents, listContents, orderContents
+
+# import human readable sizes
+from helpers import formatSize
+
+# import directory listings' cache
+from cache import ListingCache, stamp
+
+# import background directory listing
+from loader import StreamLoader
+
+# import background directory prefetching
+from prefetch import Prefetcher
+
+# import background metadata fetching
+from metadata import MetadataFetcher
+
+# import subtree index
+from index import SubtreeIndex, Indexer, DatabaseError
+
+# import recursive search
+from search import Searcher, SEARCH_MODES
+
+# import disk usage measuring
+from du import DiskUsage
+
+# import snapshots of directories browsed
+from snapshot import SnapshotStore
+
+# import file preview
+from preview import PreviewPane
+
+# import file operations
+from fileops import FileOperations
+
+# import profiler, and its overlay
+from profiler import PROFILER, TRACE_FILE
+from overlay import ProfilerOverlay
+
+# import event loop
+from eventloop import EventLoop
+
+# import directory watcher
+from watcher import DirWatcher
+
+# import contents' sort keys
+from sorting import SortKeys
+
+# import type-to-filter classes
+from filtering import NameIndex, NameFilter, FilteredView, FILTER_MODES
+
+# import bisect_left
+from bisect import bisect_left
+
+# import partial
+from functools import partial
+
+# import abspath, basename, dirname, isdir, join and relpath
+from os.path import abspath, basename, dirname, isdir, join, relpath
+
+# import deque
+from collections import deque
+
+# import ref
+from weakref import ref
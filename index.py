@@ -0,0 +1,395 @@
+# Copyright (c) 2015 ICRL
+# See the file LICENSE for copying permission.
+
+"""Contains SubtreeIndex and Indexer classes"""
+
+import sqlite3
+
+from sqlite3 import Error as DatabaseError
+
+from os import environ, fsdecode, fsencode, makedirs, stat
+from os.path import abspath, dirname, expanduser, join
+from threading import Event, Thread
+
+from constants import DIRS, FILES, INDEX_COMMIT_DIRS
+from tools import scanLocals
+
+
+# filetypes stored in the index, by their index in this tuple.
+FILETYPES = DIRS + FILES
+
+# Version of the schema, indexes of other versions are built again.
+INDEX_VERSION = 1
+
+# Schema of the index: directories indexed, with their mtime when listed,
+# and their entries. Paths and names are stored as bytes, as named on disk:
+# not all of them decode to text SQLite can store.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    id INTEGER PRIMARY KEY,
+    path BLOB UNIQUE NOT NULL,
+    mtime INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    dir INTEGER NOT NULL,
+    name BLOB NOT NULL,
+    folded TEXT NOT NULL,
+    filetype INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entriesFolded ON entries (folded);
+CREATE INDEX IF NOT EXISTS entriesDir ON entries (dir);
+"""
+
+# Trigram index of casefolded names, finding substrings of at least 3
+# characters without scanning all names. Needs SQLite's FTS5 extension.
+TRIGRAMS = """
+CREATE VIRTUAL TABLE IF NOT EXISTS trigrams USING fts5 (
+    folded, content='entries', content_rowid='rowid', tokenize='trigram'
+);
+"""
+
+# Tables of indexes of previous versions.
+DROP = """
+DROP TABLE IF EXISTS trigrams;
+DROP TABLE IF EXISTS entries;
+DROP TABLE IF EXISTS dirs;
+"""
+
+
+def indexPath():
+
+    """Return path of the index file, under the user's cache directory"""
+
+    cacheDir = environ.get("XDG_CACHE_HOME") or expanduser("~/.cache")
+
+    return join(cacheDir, "dex", "index.sqlite")
+
+
+def foldName(name):
+
+    """Return casefolded `name`, as matched by queries. Bytes of `name`
+    which are not UTF-8 are replaced, as they can't be typed anyway."""
+
+    return fsencode(name).decode("utf-8", "replace").casefold()
+
+
+class SubtreeIndex(object):
+
+    """Persistent index of the names in directory trees, stored in a SQLite
+    database at `path`(indexPath() if None).
+
+    01) update() method walks a directory tree with tools.scanLocals and
+        stores each directory's entries along with its mtime. Updating it
+        again lists only directories whose mtime changed, others only cost
+        a stat(). Mountpoints and links are not followed.
+
+    02) find() method returns entries under a directory whose name matches
+        a query, either by prefix(looked up in an index of casefolded
+        names) or by substring(looked up in a trigram index of casefolded
+        names, if SQLite supports it and query is at least 3 characters
+        long, scanning casefolded names otherwise).
+
+    03) Each thread has to use its own SubtreeIndex, as SQLite connections
+        can't be shared. The database is in WAL mode, so that finding does
+        not wait for an update in progress.
+
+    04) Paths and names are stored encoded by os.fsencode(), so that any
+        name can be indexed and found again as listed.
+    """
+
+    def __init__(self, path=None):
+
+        if path is None:
+            path = indexPath()
+
+        self.path = path
+
+        makedirs(dirname(abspath(path)), exist_ok=True)
+
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+
+        version, = self.db.execute("PRAGMA user_version").fetchone()
+
+        # Built by another version, indexed again from scratch.
+        if version != INDEX_VERSION:
+
+            try:
+                self.db.executescript(DROP)
+
+            # Trigrams of a SQLite without FTS5 were never created.
+            except sqlite3.OperationalError:
+                pass
+
+            self.db.execute("PRAGMA user_version = %d" % INDEX_VERSION)
+
+        self.db.executescript(SCHEMA)
+
+        # Whether trigram index is available.
+        try:
+            self.db.executescript(TRIGRAMS)
+            self.trigrams = True
+        except sqlite3.OperationalError:
+            self.trigrams = False
+
+    def update(self, root, cancelled=None, progress=None):
+
+        """Index directory tree at `root`, until done or `cancelled`(an
+        Event) is set. `progress(stats)`, if given, is called each time
+        INDEX_COMMIT_DIRS directories got indexed.
+
+        Return dict of counters: directories walked, directories listed,
+        entries stored and system calls made."""
+
+        stats = {"walked": 0, "listed": 0, "entries": 0, "syscalls": 0}
+
+        db = self.db
+
+        # directories to be walked.
+        pending = [abspath(root)]
+
+        while pending:
+
+            if cancelled is not None and cancelled.is_set():
+                break
+
+            path = pending.pop()
+
+            stats["walked"] += 1
+
+            try:
+                st = stat(path)
+            except OSError:
+                self._forget_(path)
+                continue
+
+            stats["syscalls"] += 1
+
+            row = db.execute("SELECT id, mtime FROM dirs WHERE path = ?",
+                             (fsencode(path),)).fetchone()
+
+            # Unchanged since indexed, walk its directories as indexed.
+            if row is not None and row[1] == st.st_mtime_ns:
+
+                pending.extend(
+                    join(path, fsdecode(name)) for name, in db.execute(
+                        "SELECT name FROM entries "
+                        "WHERE dir = ? AND filetype = ?",
+                        (row[0], FILETYPES.index('dir'))))
+
+                continue
+
+            try:
+                # Links are not followed, they may loop.
+                scanner = scanLocals(path, followLinks=False)
+                listing = scanner.lsdir()
+            except (OSError, ValueError):
+                self._forget_(path)
+                continue
+
+            stats["listed"] += 1
+            stats["syscalls"] += listing.syscalls
+
+            # Directories gone since indexed.
+            if row is not None:
+
+                dirId = row[0]
+
+                gone = set(fsdecode(name) for name, in db.execute(
+                    "SELECT name FROM entries WHERE dir = ? AND filetype = ?",
+                    (dirId, FILETYPES.index('dir'))))
+                gone.difference_update(listing['dir'])
+
+                for name in gone:
+                    self._forget_(join(path, name))
+
+                self._delete_([(dirId,)])
+                db.execute("UPDATE dirs SET mtime = ? WHERE id = ?",
+                           (st.st_mtime_ns, dirId))
+
+            else:
+                dirId = db.execute(
+                    "INSERT INTO dirs (path, mtime) VALUES (?, ?)",
+                    (fsencode(path), st.st_mtime_ns)).lastrowid
+
+            for filetype, names in listing.items():
+
+                code = FILETYPES.index(filetype)
+
+                db.executemany(
+                    "INSERT INTO entries VALUES (?, ?, ?, ?)",
+                    ((dirId, fsencode(name), foldName(name), code)
+                     for name in names))
+
+                stats["entries"] += len(names)
+
+            if self.trigrams:
+                db.execute("INSERT INTO trigrams (rowid, folded) "
+                           "SELECT rowid, folded FROM entries WHERE dir = ?",
+                           (dirId,))
+
+            # Mountpoints and links are not followed.
+            pending.extend(join(path, name) for name in listing['dir'])
+
+            if stats["listed"] % INDEX_COMMIT_DIRS == 0:
+
+                db.commit()
+
+                if progress is not None:
+                    progress(stats)
+
+        db.commit()
+
+        return stats
+
+    def _forget_(self, path):
+
+        """Remove directory at `path` and directories below it from
+        index"""
+
+        path = fsencode(path)
+        prefix = join(path, b"")
+
+        dirIds = [(dirId,) for dirId, in self.db.execute(
+            "SELECT id FROM dirs WHERE path = ? OR substr(path, 1, ?) = ?",
+            (path, len(prefix), prefix))]
+
+        self._delete_(dirIds)
+        self.db.executemany("DELETE FROM dirs WHERE id = ?", dirIds)
+
+    def _delete_(self, dirIds):
+
+        """Remove entries of directories whose ids are `dirIds`, a list of
+        1-tuples"""
+
+        # Trigrams of an external content table are removed by value.
+        if self.trigrams:
+            self.db.executemany(
+                "INSERT INTO trigrams (trigrams, rowid, folded) "
+                "SELECT 'delete', rowid, folded FROM entries WHERE dir = ?",
+                dirIds)
+
+        self.db.executemany("DELETE FROM entries WHERE dir = ?", dirIds)
+
+    def find(self, root, query, mode, limit):
+
+        """Return list of (directory path, name, filetype) of at most
+        `limit` entries below directory at `root` whose name matches
+        `query`, case insensitively. `mode` is either 'prefix' or
+        'substring'."""
+
+        root = fsencode(abspath(root))
+        prefix = join(root, b"")
+
+        query = query.casefold()
+
+        tables = "entries e JOIN dirs d ON d.id = e.dir"
+
+        if mode == 'prefix':
+            match = "e.folded >= ? AND e.folded < ?"
+            args = (query, query + "\U0010ffff")
+
+        # Looked up by trigrams, as a phrase.
+        elif self.trigrams and len(query) >= 3:
+            tables = ("trigrams JOIN entries e ON e.rowid = trigrams.rowid "
+                      "JOIN dirs d ON d.id = e.dir")
+            match = "trigrams MATCH ?"
+            args = ('"%s"' % query.replace('"', '""'),)
+
+        else:
+            match = "instr(e.folded, ?) > 0"
+            args = (query,)
+
+        return [(fsdecode(path), fsdecode(name), FILETYPES[code])
+                for path, name, code in self.db.execute(
+                    "SELECT d.path, e.name, e.filetype FROM " + tables +
+                    " WHERE " + match + " AND "
+                    "(d.path = ? OR substr(d.path, 1, ?) = ?) LIMIT ?",
+                    args + (root, len(prefix), prefix, limit))]
+
+    def size(self):
+
+        """Return size of the index, in bytes"""
+
+        pageCount, = self.db.execute("PRAGMA page_count").fetchone()
+        pageSize, = self.db.execute("PRAGMA page_size").fetchone()
+
+        return pageCount * pageSize
+
+    def close(self):
+
+        """Close database"""
+
+        self.db.close()
+
+
+class Indexer(Thread):
+
+    """Updates the SubtreeIndex stored at `indexFile` for directory tree at
+    `root` in background, see SubtreeIndex.update().
+
+    01) Indexing starts with start() method, and stops as soon as possible
+        with cancel() method.
+
+    02) `stats` member holds the counters of the indexing so far, and
+        `done` member becomes True once done.
+
+    03) `notify`, if given, gets called from the indexing thread whenever
+        more directories got indexed, and once done.
+    """
+
+    def __init__(self, indexFile, root, notify=None):
+
+        Thread.__init__(self)
+
+        # Do not keep the program alive.
+        self.daemon = True
+
+        self.indexFile = indexFile
+        self.root = root
+        self.notify = notify
+
+        self.cancelled = Event()
+
+        self.stats = {}
+        self.done = False
+        self.error = None
+
+    def run(self):
+
+        """Index directory tree"""
+
+        try:
+            index = SubtreeIndex(self.indexFile)
+
+            try:
+                self.stats = index.update(self.root, self.cancelled,
+                                          self._progress_)
+            finally:
+                index.close()
+
+        except (OSError, sqlite3.Error) as error:
+            self.error = error
+
+        finally:
+
+            self.done = True
+
+            if self.notify is not None:
+                self.notify()
+
+    def _progress_(self, stats):
+
+        """Publish `stats`, and notify about it"""
+
+        self.stats = dict(stats)
+
+        if self.notify is not None:
+            self.notify()
+
+    def cancel(self):
+
+        """Stop indexing"""
+
+        self.cancelled.set()
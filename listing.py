@@ -0,0 +1,139 @@
+# Copyright (c) 2015 ICRL
+# See the file LICENSE for copying permission.
+
+"""Lists directories into sorted ContentStores: the listing engine shared
+by the browser(main.py) and the headless listing mode(export.py). Importing
+it needs no curses."""
+
+from functools import partial
+
+import tools
+
+from cache import stamp
+from constants import CONTENT_TYPES, PRINT_ORDER, SORT_ORDERS
+from dtypes import ContentStore
+from profiler import PROFILER
+from sorting import SortKeys
+
+
+def getContents(path, cache=None, order=None, extraPaths=True):
+
+    """Return list of Contents of directory at `path`, sorted in `order`
+    (default order if None). Special directories are included if
+    `extraPaths`.
+
+    If `cache`(a ListingCache) is given, a still valid cached list is
+    returned instead of listing the directory again, and a freshly listed
+    one gets cached."""
+
+    if order is None:
+        order = SORT_ORDERS[0]
+
+    start = PROFILER.begin("getContents")
+
+    try:
+        # Reuse a valid cached listing.
+        contentsAll = None if cache is None else cache.get(path)
+
+        if contentsAll is not None:
+
+            orderContents(contentsAll, order)
+
+            return contentsAll
+
+        # Stamp before listing, so that changes made while listing make the
+        # cached list stale.
+        if cache is not None:
+            pathStamp = stamp(path)
+
+        contentsAll = listContents(path, SortKeys(path, order), extraPaths)
+
+        if cache is not None:
+            cache.put(path, contentsAll, pathStamp)
+
+        return contentsAll
+
+    finally:
+        if start is not None:
+            PROFILER.end("getContents", start)
+
+
+def listContents(path, sortKeys, extraPaths=True):
+
+    """List directory at `path` and return its list of Contents, as a
+    ContentStore sorted by `sortKeys`. Special directories are included if
+    `extraPaths`."""
+
+    # Dictionary containing sorted list directory contents in some fashion.
+    # See -> lsdir's docstring.
+    dirContents = tools.lsdir(path, extraPaths)
+
+    # Single store containing dirs and files combined.
+    contentsAll = ContentStore()
+
+    # Append contents in the order defined in PRINT_ORDER constant.
+    for type in PRINT_ORDER:
+
+        # filetypes considered as `type`, e.g. DIRS for 'dir'
+        filetypes = CONTENT_TYPES[type]
+
+        # Gather all names of `type` in the first filetype's list.
+        names = dirContents[filetypes[0]]
+
+        for _type in filetypes[1:]:
+            names.extend(dirContents.pop(_type))
+
+        start = PROFILER.start()
+
+        # lstat() calls made so far, to sort by metadata.
+        stats = sortKeys.stats
+
+        # Sort in place, without copying.
+        if sortKeys.order == SORT_ORDERS[0]:
+            names.sort()
+        else:
+            names.sort(key=partial(sortKeys.nameKey, type))
+
+        if start is not None:
+            PROFILER.record("sort", start, sortKeys.stats - stats, phase=True)
+            start = PROFILER.start()
+
+        for fname in names:
+            contentsAll.append(fname, type)
+
+        if start is not None:
+            PROFILER.record("build", start, phase=True)
+
+    contentsAll.sortKeys = sortKeys
+
+    # Return all contents
+    return contentsAll
+
+
+def orderContents(contents, order):
+
+    """Sort `contents`, a ContentStore, in `order`. Contents already sorted
+    in another order are sorted again in place, reusing their cached sort
+    keys and metadata."""
+
+    sortKeys = contents.sortKeys
+
+    if sortKeys.order != order:
+
+        start = PROFILER.begin("orderContents")
+
+        # lstat() calls made so far, to sort by metadata.
+        stats = sortKeys.stats
+
+        try:
+            sortKeys.setOrder(order)
+
+            contents[:] = sorted(contents, key=sortKeys.key)
+
+            if start is not None:
+                PROFILER.record("sort", start, sortKeys.stats - stats,
+                                phase=True)
+
+        finally:
+            if start is not None:
+                PROFILER.end("orderContents", start)
@@ -0,0 +1,220 @@
+# Copyright (c) 2015 ICRL
+# See the file LICENSE for copying permission.
+
+"""Contains StreamLoader class"""
+
+from queue import Queue, Empty
+from threading import Event, Thread
+
+from constants import DIRS, FILES, SPECIAL_DIRS
+from constants import STREAM_FIRST_BATCH, STREAM_MAX_BATCH
+from dtypes import Content, ContentStore, mergeContents
+from profiler import PROFILER
+from sorting import SortKeys
+from tools import scanLocals
+
+
+class StreamLoader(Thread):
+
+    """Lists a directory in background, merging contents listed into
+    ContentStores as they come.
+
+    01) Listing starts with start() method. Contents are listed in batches,
+        each one sorted and merged into the contents listed before it by
+        the listing thread: browsing contents listed so far costs swapping
+        ContentStores only, whatever their size. The first batch is small,
+        and contains the special directories, to be rendered as soon as
+        possible. See tools.scanLocals.lsdirBatches.
+
+    02) Contents are sorted in the order of `sortKeys`, the SortKeys of
+        contents browsed, even if it changes while listing: contents listed
+        so far get sorted again then. Sort keys are computed by SortKeys of
+        the loader's own, those of the browsing thread are not touched.
+
+    03) updates() method returns the latest ContentStore merged, without
+        blocking, along with the indexes contents got inserted at.
+
+    04) `count` member holds the number of contents received so far and
+        `done` member becomes True once the whole directory got listed(or
+        listing failed, then `error` member holds the raised OSError).
+
+    05) cancel() method stops listing as soon as possible.
+
+    06) `stamp` member holds the cache.stamp() of the directory taken
+        before listing, to cache the complete listing with.
+
+    07) `notify`, if given, gets called from the listing thread whenever a
+        batch is merged or listing ended.
+    """
+
+    def __init__(self, path, pathStamp, sortKeys, notify=None):
+
+        Thread.__init__(self)
+
+        # Do not keep the program alive.
+        self.daemon = True
+
+        self.path = path
+        self.stamp = pathStamp
+        self.sortKeys = sortKeys
+        self.notify = notify
+
+        # Sort keys of contents merged, computed by listing thread.
+        self.keys = SortKeys(path, sortKeys.order)
+
+        # (ContentStore, indexes inserted at, order) merged, None marks the
+        # end of listing.
+        self.queue = Queue()
+
+        # Latest (ContentStore, order) merged not returned by updates() yet,
+        # and lists of indexes contents got inserted at meanwhile.
+        self.latest = None
+        self.inserted = []
+
+        self.cancelled = Event()
+
+        self.count = 0
+        self.done = False
+        self.error = None
+
+    def run(self):
+
+        """List directory, batch by batch"""
+
+        # Special directories come first.
+        extraPaths = [Content(name, 'dir')
+                      for name in (SPECIAL_DIRS['CURR_DIR'],
+                                   SPECIAL_DIRS['BACK_DIR'])]
+
+        # Contents merged so far.
+        contents = ContentStore()
+
+        # Profiled as a whole, phase by phase.
+        start = PROFILER.begin("streamListing")
+
+        try:
+
+            for dirContents in scanLocals(self.path).lsdirBatches(
+                    STREAM_FIRST_BATCH, STREAM_MAX_BATCH):
+
+                if self.cancelled.is_set():
+                    break
+
+                started = PROFILER.start()
+
+                batch = extraPaths
+                extraPaths = []
+
+                for types, contentType in ((DIRS, 'dir'), (FILES, 'file')):
+
+                    batch.extend(Content(fname, contentType)
+                                 for _type in types
+                                 for fname in dirContents[_type])
+
+                if started is not None:
+                    PROFILER.record("build", started, phase=True)
+
+                contents = self._merge_(contents, batch)
+
+        except OSError as error:
+            self.error = error
+
+        finally:
+
+            if start is not None:
+                PROFILER.end("streamListing", start)
+
+            # Empty or unreadable directory, still allow to leave it.
+            if extraPaths:
+                self._merge_(contents, extraPaths)
+
+            self._put_(None)
+
+    def _merge_(self, contents, batch):
+
+        """Return a ContentStore of `contents` and `batch` merged, in the
+        order contents are browsed in, and hand it over"""
+
+        keys = self.keys
+
+        started = PROFILER.start()
+
+        # Sorted in another order meanwhile.
+        order = self.sortKeys.order
+        resorted = order != keys.order
+
+        if resorted:
+            keys.setOrder(order)
+            contents = ContentStore(sorted(contents, key=keys.key))
+
+        batch.sort(key=keys.key)
+
+        if started is not None:
+            PROFILER.record("sort", started, phase=True)
+            started = PROFILER.start()
+
+        contents, indexes = mergeContents(contents, batch, keys.key)
+
+        if started is not None:
+            PROFILER.record("merge", started, phase=True)
+
+        self._put_((contents, None if resorted else indexes, order))
+
+        return contents
+
+    def _put_(self, update):
+
+        """Hand `update` over, and notify about it"""
+
+        self.queue.put(update)
+
+        if self.notify is not None:
+            self.notify()
+
+    def updates(self, order):
+
+        """Return (contents, order, inserted) merged since last call, None
+        if none: the latest ContentStore merged, sorted in `order`, and a
+        list of ascending lists of indexes contents got inserted at, one
+        per merge(None instead of a list if contents got sorted again).
+
+        Contents sorted in another order than `order` are held back until
+        sorted in it, unless listing ended."""
+
+        while not self.done:
+
+            try:
+                update = self.queue.get_nowait()
+            except Empty:
+                break
+
+            if update is None:
+                self.done = True
+                continue
+
+            contents, indexes, merged = update
+
+            self.latest = (contents, merged)
+            self.inserted.append(indexes)
+
+            self.count = len(contents)
+
+        if self.latest is None:
+            return None
+
+        contents, merged = self.latest
+
+        # Listing thread sorts it in order at next batch.
+        if merged != order and not self.done:
+            return None
+
+        inserted, self.inserted = self.inserted, []
+        self.latest = None
+
+        return contents, merged, inserted
+
+    def cancel(self):
+
+        """Stop listing"""
+
+        self.cancelled.set()
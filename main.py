@@ -1,220 +1,2193 @@
 # Copyright (c) 2015 ICRL
 # See the file LICENSE for copying permission.
 
-from curses import initscr, wrapper
+import sys
 
+from time import perf_counter
 
-def getContents(path):
+# When dex started, see main()'s startup profiling.
+STARTED = perf_counter()
 
-    # Dictionary containing sorted list directory contents in some fashion.
-    # See -> lsdir's docstring.
-    dirContents = tools.lsdir(path, True)
+# Headless listing mode(see export.py) needs no terminal: run it before
+# curses configuration(config.py) gets imported.
+if __name__ == "__main__" and sys.argv[1:2] == ["--list"]:
 
-    # contains those dirs whose filetype is considered as 'dir' by DIRS
-    dirs = [Content(fname, 'dir') for _type in DIRS
-            for fname in dirContents[_type]]
-    # contains those files whose filetype is considered as 'file' by FILES
-    files = [Content(fname, 'file') for _type in FILES
-             for fname in dirContents[_type]]
+    from export import run
 
-    # Single list containing dirs and files classes combined.
-    contentsAll = []
+    sys.exit(run(sys.argv[2:]))
 
-    dirs = sorted(dirs, key=lambda x: x.name)
-    files = sorted(files, key=lambda x: x.name)
+from curses import wrapper
+from time import monotonic
 
-    # Append Content objects in the order defined in PRINT_ORDER constant.
-    for type in PRINT_ORDER:
+# import configured `curses` module and other configurations, curses gets
+# set up by config().
+from config import *
 
-        # Requires `dirs` and `files` lists to be existed.
-        for item in locals()[type+'s']:
+# import all other required stuff
+from imports import *
 
-            # Append Content-object.
-            contentsAll.append(item)
 
-    # Return all contents
-    return contentsAll
+def browseContents(browser, path, cache, order, notify=None):
+
+    """Make `browser` browse contents of directory at `path`, sorted in
+    `order`.
+
+    Cached contents are browsed right away. Otherwise, if STREAM_LISTINGS
+    is set, directory gets listed in background and the StreamLoader
+    listing it is returned, see loadContents(). It calls `notify` whenever
+    it listed more contents. Return None if contents are complete."""
+
+    if STREAM_LISTINGS:
+
+        # Reuse a valid cached listing.
+        contentsAll = cache.get(path)
+
+        if contentsAll is None:
+
+            # Contents listed so far.
+            contentsAll = ContentStore()
+            contentsAll.sortKeys = SortKeys(path, order)
+
+            # Start listing in background.
+            loader = StreamLoader(path, stamp(path), contentsAll.sortKeys,
+                                  notify)
+            loader.start()
+
+            browser.status = "Loading..."
+            browser.setContents(contentsAll)
+
+            return loader
+
+        orderContents(contentsAll, order)
+
+        # Sort keys of cached listing grew.
+        cache.reaccount(path)
+
+    else:
+        contentsAll = getContents(path, cache, order)
+
+    # Set to browse new list of contents
+    browser.setContents(contentsAll)
+
+    return None
+
+
+def loadContents(browser, loader, cache):
+
+    """Make `browser` browse contents merged by `loader` so far, instead of
+    those merged before. Return `loader` while listing, None once contents
+    are complete."""
+
+    sortKeys = browser.getContents().sortKeys
+
+    # Merged by listing thread, in current order unless listing ended.
+    update = loader.updates(sortKeys.order)
+
+    if update is not None:
+
+        contents, order, inserted = update
+
+        # Order changed after contents got merged.
+        if order != sortKeys.order:
+            contents = ContentStore(sorted(contents, key=sortKeys.key))
+            inserted.append(None)
+
+        # Renders the first screenful as soon as it is listed.
+        browser.replace(contents, inserted, sortKeys.key)
+
+    if not loader.done:
+
+        browser.setStatus("Loading... %d entries" % loader.count)
+
+        return loader
+
+    browser.setStatus(None)
+
+    # Cache the complete listing.
+    if loader.error is None:
+        cache.put(loader.path, browser.getContents(), loader.stamp)
+
+    return None
+
+
+def revalidateSnapshot(snapshot, cache, notify=None):
+
+    """Check whether `snapshot`, browsed instead of its directory's
+    contents, is still up to date. If so, cache its contents and return
+    (None, None).
+
+    Otherwise list directory in background, as browseContents() does but
+    into contents not browsed yet, see loadBehind(): return (StreamLoader,
+    ContentStore) listing it."""
+
+    path = snapshot.path
+
+    pathStamp = stamp(path)
+
+    if snapshot.complete and pathStamp == snapshot.stamp:
+
+        cache.put(path, snapshot.contents, pathStamp)
+
+        return None, None
+
+    contents = ContentStore()
+    contents.sortKeys = SortKeys(path, snapshot.contents.sortKeys.order)
+
+    loader = StreamLoader(path, pathStamp, contents.sortKeys, notify)
+    loader.start()
+
+    return loader, contents
+
+
+def loadBehind(browser, loader, cache, contents):
+
+    """Make `contents` hold contents merged by `loader` so far, browsed by
+    `browser` instead of its snapshot once complete. Return `loader` while
+    listing, None once contents are complete."""
+
+    update = loader.updates(contents.sortKeys.order)
+
+    # Merged by listing thread, in order of `contents`.
+    if update is not None:
+        contents.adopt(update[0])
+
+    if not loader.done:
+        return loader
+
+    # Cache the complete listing.
+    if loader.error is None:
+        cache.put(loader.path, contents, loader.stamp)
+
+    # Order may have changed since listing started.
+    orderContents(contents, browser.getContents().sortKeys.order)
+
+    # Selection and marks move to the same contents, listed.
+    visit = Visit(loader.path)
+    visit.remember(browser)
+
+    marked = browser.getMarked()
+
+    browser.setContents(contents)
+    visit.restore(browser)
+
+    if marked:
+        browser.setMarked(marked, contents.sortKeys.key)
+        browser.redraw()
+
+    return None
+
+
+def saveSnapshot(snapshots, browser, paths, path, cache):
+
+    """Make `snapshots`(a SnapshotStore) save the view of directory at
+    `path`, as last browsed in `paths`, if its cached listing is up to
+    date. `browser` gets browsing it, to select as last browsed."""
+
+    visit = paths.findVisit(path)
+
+    if visit is None:
+        return
+
+    try:
+        # Stamp before checking cached listing, changes made afterwards
+        # make the snapshot stale.
+        pathStamp = stamp(path)
+
+    # Directory is gone.
+    except OSError:
+        return
+
+    contents = cache.get(path)
+
+    if contents is None:
+        return
+
+    # Select as when it was left, as if browsed again.
+    browser.setContents(contents)
+    visit.restore(browser)
+
+    snapshots.save(path, pathStamp, contents, browser.selectIndex,
+                   browser.scrollIndex)
+
+
+def refreshContents(browser, watcher, path, cache, stashed=()):
+
+    """Apply changes of directory at `path`, watched by `watcher`, to the
+    contents browsed by `browser` and cached by `cache`.
+
+    `stashed` are changes read from `watcher` earlier but not applied yet,
+    None if those were lost."""
+
+    try:
+        # Stamp before reading changes, changes made afterwards make the
+        # cached list stale.
+        pathStamp = stamp(path)
+
+    # Directory is gone.
+    except OSError:
+        return
+
+    changes = watcher.changes()
+
+    # Include changes read earlier.
+    if changes is not None and stashed is not None:
+        changes = list(stashed) + changes
+
+    sortKeys = browser.getContents().sortKeys
+
+    # Changes were lost, list the whole directory again.
+    if changes is None or stashed is None:
+
+        cache.discard(path)
+
+        browser.setContents(getContents(path, cache, sortKeys.order))
+
+        watcher.watch(path)
+
+    elif changes:
+
+        # (action, Content) pairs to be applied by browser.
+        updates = []
+
+        # renamed contents' old key -> new Content
+        renamed = {}
+
+        # renamed contents' cookie -> old key
+        oldKeys = {}
+
+        # Modified contents move only if sorted by their metadata, others
+        # only get their metadata fetched again.
+        moving = sortKeys.order in METADATA_ORDERS
+
+        # Modified contents staying in place.
+        touched = []
+
+        # names modified since last created, deleted or renamed: a file
+        # being written reports many modifications, one is enough.
+        modified = set()
+
+        for change in changes:
+
+            content = Content(change.name, 'dir' if change.isdir else 'file')
+
+            if change.action == "modify":
+
+                if change.name in modified:
+                    continue
+
+                modified.add(change.name)
+
+                if moving:
+                    updates.append(("modify", content))
+                else:
+                    touched.append(content)
+
+                continue
+
+            modified.discard(change.name)
+
+            # First rename change has the old name, second the new one.
+            if change.action == "rename":
+
+                if change.cookie in oldKeys:
+                    renamed[oldKeys.pop(change.cookie)] = content
+                    updates.append(("create", content))
+
+                else:
+                    oldKeys[change.cookie] = sortKeys.key(content)
+                    updates.append(("delete", content))
+
+            else:
+                updates.append((change.action, content))
+
+        # Disk usage measured before changes is stale.
+        if browser.diskUsage is not None:
+
+            for name in set(change.name for change in changes):
+                browser.diskUsage.discard(join(path, name))
+
+        # Modified contents' metadata gets fetched again, as any missing.
+        for content in touched:
+
+            sortKeys.forgetMetadata(content.name)
+
+            # Placeholder shown until fetched, disk usage column cleared.
+            if browser.columns or (browser.diskUsage is not None and
+                                   content.type == 'dir'):
+                browser.redrawContent(content, sortKeys.key)
+
+        # Only metadata changed, the list did not.
+        if not updates:
+            return
+
+        def forget(content):
+            sortKeys.forget(content.type, content.name)
+
+        browser.update(updates, sortKeys.key, renamed, forget)
+
+        # Deleted contents may come back, with other metadata.
+        for action, content in updates:
+            if action == "delete":
+                sortKeys.forget(content.type, content.name)
+
+        # The cached list was updated in place.
+        cache.restamp(path, browser.getContents(), pathStamp)
+
+
+def prefetchContents(browser, prefetcher, path, order):
+
+    """Make `prefetcher` list the directory selected in `browser`, and
+    PREFETCH_NEIGHBOURS directories around it, in advance. `path` is the
+    path of the directory browsed, `order` the order contents are sorted
+    in."""
+
+    contents = browser.getContents()
+
+    # Prefetch nothing, if nothing selected.
+    paths = []
+
+    if browser.getSelected() is not None:
+
+        selected = browser.selectIndex - 1
+
+        # Selected one first, then the closest ones.
+        for distance in range(PREFETCH_NEIGHBOURS + 1):
+
+            for index in sorted({selected - distance, selected + distance}):
+
+                if not 0 <= index < len(contents):
+                    continue
+
+                content = contents[index]
+
+                if (content.type == 'dir' and
+                        content.name != SPECIAL_DIRS['CURR_DIR']):
+                    paths.append(join(path, content.name))
+
+    prefetcher.request(paths, order)
+
+
+def showFilter(browser, contents, nameFilter):
+
+    """Make `browser` browse `contents` filtered by `nameFilter`, keeping
+    the selected content selected if it still matches"""
+
+    # Index of selected content in contents, if any.
+    selected = None
+
+    if browser.getSelected() is not None:
+
+        selected = browser.selectIndex - 1
+
+        # Already filtered.
+        if isinstance(browser.getContents(), FilteredView):
+            selected = browser.getContents().sourceIndex(selected)
+
+    # All contents match an empty query.
+    indexes = nameFilter.results
+    if indexes is None:
+        indexes = range(len(contents))
+
+    browser.status = "/%s  [%s] %d matches" % (nameFilter.query,
+                                               nameFilter.mode, len(indexes))
+    browser.setContents(FilteredView(contents, indexes))
+
+    # Select previously selected content, if still there.
+    if selected is not None:
+
+        position = bisect_left(indexes, selected)
+
+        if position < len(indexes) and indexes[position] == selected:
+            browser.Jump(position + 1)
+
+
+def showFound(browser, index, root, query, mode, indexer=None):
+
+    """Make `browser` browse contents below directory at `root` whose names
+    match `query` in `mode`(one of FIND_MODES), as found in `index`(a
+    SubtreeIndex). Contents are named by their path relative to `root`.
+
+    `indexer` is the Indexer updating `index`, if any."""
+
+    start = monotonic()
+
+    found = []
+
+    if query:
+        found = index.find(root, query, mode, FIND_MAX_RESULTS)
+
+    elapsed = monotonic() - start
+
+    sortKeys = SortKeys(root)
+
+    # (type, relative path) pairs, in order.
+    names = sorted(((CONTENT_TYPE[filetype], relpath(join(path, name), root))
+                    for path, name, filetype in found),
+                   key=lambda item: sortKeys.nameKey(*item))
+
+    contents = ContentStore()
+    contents.sortKeys = sortKeys
+
+    for type, name in names:
+        contents.append(name, type)
+
+    status = "find: %s  [%s] %d matches, %.1f ms" % (query, mode, len(found),
+                                                   elapsed * 1000)
+
+    if indexer is not None and not indexer.done:
+        status += ", indexing... %d dirs" % indexer.stats.get("walked", 0)
+
+    browser.status = status
+    browser.setContents(contents)
+
+
+def loadFound(browser, searcher):
+
+    """Merge hits found by `searcher` so far into `browser`'s contents.
+    Return `searcher` while searching, None once done."""
+
+    # Current sort key, order may have changed since searching started.
+    key = browser.getContents().sortKeys.key
+
+    # Unless selection moved, first hits stay on top as more arrive.
+    top = browser.selectIndex == 1 and browser.scrollIndex == 0
+
+    for batch in searcher.batches():
+
+        # Costs nothing if already sorted.
+        batch.sort(key=key)
+
+        browser.extend(batch, key)
+
+    if top:
+        browser.setView(1, 0)
+
+    status = "search: %s  [%s] %d hits in %d dirs" % (
+        searcher.query, searcher.mode, searcher.count, searcher.dirs)
+
+    if not searcher.done:
+
+        browser.setStatus(status + ", searching...(Escape cancels)")
+
+        return searcher
+
+    if searcher.error is not None:
+        status += ", failed: %s" % searcher.error
+
+    elif searcher.cancelled.is_set():
+        status += ", cancelled"
+
+    browser.setStatus(status)
+
+    return None
+
+
+def leaveFound(browser, contents, selectIndex):
+
+    """Make `browser` browse `contents` again, instead of contents found,
+    selecting content at `selectIndex`"""
+
+    browser.status = None
+    browser.setContents(contents)
+    browser.Jump(selectIndex)
+
+
+def openPreview(stdscr, browser):
+
+    """Split `stdscr` between `browser` and a preview pane, return the
+    PreviewPane"""
+
+    height, width = stdscr.getmaxyx()
+
+    # Width left to contents' list.
+    listWidth = width - width * PREVIEW_WIDTH_PERCENT // 100
+
+    browser.setWindow(stdscr.derwin(height, listWidth, 0, 0))
+
+    return PreviewPane(stdscr.derwin(height, width - listWidth, 0,
+                                     listWidth))
+
+
+def openOverlay(stdscr):
+
+    """Return ProfilerOverlay drawn at the top right of `stdscr`, above
+    the status line"""
+
+    height, width = stdscr.getmaxyx()
+
+    height = max(1, min(PROFILE_OVERLAY_HEIGHT, height - 1))
+    overlayWidth = min(PROFILE_OVERLAY_WIDTH, width)
+
+    return ProfilerOverlay(stdscr.derwin(height, overlayWidth, 0,
+                                         width - overlayWidth), PROFILER)
+
+
+def showPreview(browser, preview):
+
+    """Make `preview`(a PreviewPane) preview the file selected in
+    `browser`, if any"""
+
+    contents = browser.getContents()
+    selected = browser.getSelected()
+
+    if (selected is None or selected.type != 'file' or
+            contents.sortKeys is None):
+        preview.show(None, "")
+    else:
+        preview.show(join(contents.sortKeys.path, selected.name))
+
+
+def selectedPaths(browser):
+
+    """Return paths of contents marked in `browser`, or of the selected
+    content if none is marked"""
+
+    contents = browser.getContents()
+
+    if contents.sortKeys is None:
+        return []
+
+    marked = browser.getMarked()
+
+    if not marked:
+
+        selected = browser.getSelected()
+
+        if (selected is not None and
+                selected.name not in SPECIAL_DIRS.values()):
+            marked = [selected]
+
+    return [join(contents.sortKeys.path, content.name) for content in marked]
+
+
+def reloadContents(browser, path, cache):
+
+    """List directory at `path`, browsed by `browser`, again, keeping the
+    selected content selected"""
+
+    contents = browser.getContents()
+    selected = browser.getSelected()
+
+    cache.discard(path)
+
+    contents = getContents(path, cache, contents.sortKeys.order)
+    browser.setContents(contents)
+
+    if selected is not None:
+        key = contents.sortKeys.key
+        browser.Jump(bisect_left(contents, key(selected), key=key) + 1)
+
+
+def showOperations(browser, fileOps):
+
+    """Show progress of last file operation run by `fileOps`(a
+    FileOperations) in `browser`'s status line"""
+
+    # Operations finish on their threads meanwhile.
+    with fileOps.lock:
+        running = list(fileOps.running)
+
+    # All finished since.
+    if not running:
+        return
+
+    operation = running[-1]
+
+    done, total, rate, left = operation.progress()
+
+    # Entries are deleted, bytes copied.
+    if operation.action == 'delete':
+        status = "delete: %d/%d entries, %d/s" % (done, total, rate)
+    else:
+        status = "%s: %s/%s, %s/s" % (operation.action, formatSize(done),
+                                      formatSize(total), formatSize(rate))
+
+    if left is not None:
+        status += ", %d s left" % left
+
+    if len(running) > 1:
+        status += "(%d running)" % len(running)
+
+    browser.setStatus(status + "(Escape cancels)")
+
+
+def operationStatus(operation):
+
+    """Return status message of finished file `operation`"""
+
+    status = "%s: %d entries" % (operation.action, len(operation.sources))
+
+    if operation.errors:
+
+        path, message = operation.errors[0]
+
+        return status + ", %d failed(%s: %s)" % (len(operation.errors),
+                                                 basename(path), message)
+
+    if operation.cancelled.is_set():
+        return status + ", cancelled"
+
+    return status + ", done"
+
+
+class Visit(object):
+
+    """A directory browsed, as remembered by Paths"""
+
+    __slots__ = ("path", "selectIndex", "scrollIndex", "selected", "listing")
+
+    def __init__(self, path):
+
+        # normalized absolute path
+        self.path = path
+
+        # Browser's selection and scrolling when leaving directory, None if
+        # not left yet(scrolling None if selection only).
+        self.selectIndex = None
+        self.scrollIndex = None
+
+        # selected Content, to be selected again if listing changed.
+        self.selected = None
+
+        # weak reference to listing browsed, None if not left yet. Listings
+        # are kept by ListingCache, so that history costs no memory.
+        self.listing = None
+
+    def remember(self, browser):
+
+        """Remember selection and scrolling of `browser`, leaving
+        directory"""
+
+        self.selectIndex = browser.selectIndex
+        self.scrollIndex = browser.scrollIndex
+        self.selected = browser.getSelected()
+
+        contents = browser.getContents()
+
+        # Filtered contents are not cached, forget selection within them.
+        if isinstance(contents, FilteredView):
+            self.selectIndex = None
+        else:
+            self.listing = ref(contents)
+
+    def restore(self, browser):
+
+        """Make `browser` select and scroll as it did when leaving
+        directory, if it did"""
+
+        if self.selectIndex is None:
+            return
+
+        contents = browser.getContents()
+        selectIndex = self.selectIndex
+
+        if self.selected is not None and contents:
+
+            # Same listing, selected content may have moved by update()
+            # though.
+            unchanged = (self.listing is not None and
+                         self.listing() is contents and
+                         selectIndex <= len(contents) and
+                         contents[selectIndex - 1].name == self.selected.name)
+
+            # Look up selected content in listing.
+            if not unchanged:
+
+                key = contents.sortKeys.key
+
+                index = bisect_left(contents, key(self.selected), key=key)
+
+                if (index < len(contents) and
+                        contents[index].name == self.selected.name):
+                    selectIndex = index + 1
+
+        # Scroll as little as needed.
+        if self.scrollIndex is None:
+            browser.setView(selectIndex, 0)
+
+        # Keep selection on the same line.
+        else:
+            browser.setView(selectIndex,
+                            self.scrollIndex + selectIndex - self.selectIndex)
 
 
 class Paths(object):
 
-    """Paths manager"""
+    """Paths manager
+
+    01) History of paths browsed is a ring of at most `historySize` Visits,
+        oldest ones get forgotten. Paths are normalized absolute paths.
+
+    02) chPath() method browses a new path, forgetting the paths browsed
+        forward(see forward()). back() and forward() methods move within
+        history.
+
+    03) Each Visit remembers selection and scrolling of the directory, see
+        Visit.remember(). Browsing a path again starts with the last
+        selection and scrolling it had."""
+
+    def __init__(self, startPath, historySize=None):
+
+        """Start with `startPath` as current path, remembering at most
+        `historySize`(HISTORY_SIZE if None) paths"""
+
+        if historySize is None:
+            historySize = HISTORY_SIZE
+
+        # Initialize path history with startPath
+        self.pathHistory = deque([Visit(abspath(startPath))],
+                                 maxlen=historySize)
+
+        # index of current path in history
+        self.position = 0
+
+    def chPath(self, newPath):
+
+        """Change the current path to newPath and return it"""
+
+        # Last path
+        lastPath = self.pathHistory[self.position].path
+
+        # normalizes e.g. '..'
+        newPath = abspath(join(lastPath, newPath))
+
+        # Last time it was browsed, if it was.
+        lastVisit = self.findVisit(newPath)
+
+        visit = Visit(newPath)
+
+        if lastVisit is not None:
+            for name in Visit.__slots__[1:]:
+                setattr(visit, name, getattr(lastVisit, name))
+
+        # Parent path not browsed yet, select directory left.
+        elif newPath == dirname(lastPath) != lastPath:
+            visit.selectIndex = 1
+            visit.selected = Content(basename(lastPath), 'dir')
+
+        # Paths browsed forward get replaced.
+        while len(self.pathHistory) > self.position + 1:
+            self.pathHistory.pop()
+
+        # Oldest path gets dropped, if history is full.
+        self.pathHistory.append(visit)
+        self.position = len(self.pathHistory) - 1
+
+        # Return the most recent path(the current path)
+        return self.getHistory()
+
+    def findVisit(self, path):
+
+        """Return the most recent Visit of `path` before the current one,
+        None if there is none"""
+
+        for index in range(self.position, -1, -1):
+
+            if self.pathHistory[index].path == path:
+                return self.pathHistory[index]
+
+        return None
+
+    def getVisit(self):
+
+        """Return Visit of the current path"""
+
+        return self.pathHistory[self.position]
+
+    def back(self):
+
+        """Go back to the previous path, return its Visit or None if there
+        is no previous path"""
+
+        if self.position == 0:
+            return None
+
+        self.position -= 1
+
+        return self.getVisit()
+
+    def forward(self):
+
+        """Go forward to the path gone back from, return its Visit or None
+        if there is no such path"""
+
+        if self.position == len(self.pathHistory) - 1:
+            return None
+
+        self.position += 1
+
+        return self.getVisit()
+
+    def getHistory(self, history_depth=0):
+
+        """Return the path from path history
+
+        --Parameters--
+
+        history_depth(int)(default=0):
+
+          Range - [0, x] (x is no. of paths before the current one)
+          min value means *most recent path*
+          max value means *oldest path*
+        """
+
+        return self.pathHistory[self.position - history_depth].path
+
+    def popHistory(self, history_depth=0):
+
+        """Pop(remove & return) path from path history
+
+        --Parameters--
+
+        history_depth(int)(default=0):
+
+          Range - [0, x] (x is no. of paths before the current one)
+          min value means *most recent path*
+          max value means *oldest path*
+        """
+
+        # Remove every path after history_depth
+        self.position -= history_depth
+
+        while len(self.pathHistory) > self.position + 1:
+            self.pathHistory.pop()
+
+        # Return the required path
+        return self.getHistory()
+
+
+def keyCode(name):
+
+    """Return code read by getch() for action key `name`, see KEYS"""
+
+    key = KEYS[name]
+
+    if isinstance(key, str):
+        return ord(key)
+
+    return key
+
+
+class Session(object):
+
+    """State of browsing, shared by main() and key handlers
+
+    01) Keys are handled by the prompt open, if any(see Prompt), and by
+        the handlers of BROWSE_KEYS otherwise.
+
+    02) What is browsed is told by `loader`(listing in progress),
+        `prompt` and `findBase`(contents found, or searched, browsed
+        instead of current directory's)."""
+
+    def __init__(self, stdscr, browser, paths, loop, cache, prefetcher,
+                 diskUsage, fileOps, sortOrder):
+
+        self.stdscr = stdscr
+        self.browser = browser
+        self.paths = paths
+        self.loop = loop
+        self.cache = cache
+        self.prefetcher = prefetcher
+        self.diskUsage = diskUsage
+        self.fileOps = fileOps
+
+        # Order contents are sorted in.
+        self.sortOrder = sortOrder
+
+        # StreamLoader listing current directory, None once listed.
+        self.loader = None
+
+        # Up and Down moves not applied yet.
+        self.moveSteps = 0
+
+        # Prompt taking keys first, None when closed.
+        self.prompt = None
+
+        # While browsing contents found(or searched): whole contents and
+        # selection before finding.
+        self.findBase = None
+        self.findSelect = None
+
+        # Last query of find prompt, and modes of find and search prompts.
+        self.findLast = ""
+        self.findMode = FIND_MODES[0]
+        self.searchMode = SEARCH_MODES[0]
+
+        # Subtree index queried by find prompt(None until opened), Indexer
+        # updating it and Searcher searching(None if not searching).
+        self.index = self.indexer = None
+        self.searcher = None
+
+        # PreviewPane sharing screen with contents, None if closed.
+        self.preview = None
+
+        # paths of entries yanked to be copied(or moved).
+        self.yanked = []
+
+        # ProfilerOverlay drawn over contents, None if hidden, and whether
+        # it has to be drawn again.
+        self.overlay = None
+        self.overlayDamaged = False
+
+        # Whether quit key was pressed, typed text(e.g. filter's) does not
+        # quit.
+        self.quitting = False
+
+    def filtering(self):
+
+        """Return whether contents are filtered by name"""
+
+        return isinstance(self.prompt, FilterPrompt)
+
+    def showStatus(self, status):
+
+        """Show `status` in status line for a while"""
+
+        self.browser.setStatus(status)
+        self.loop.setTimer('status', STATUS_TIMEOUT)
+
+    def leaveFound(self):
+
+        """Browse contents again instead of contents found, closing prompt
+        open on them"""
+
+        leaveFound(self.browser, self.findBase, self.findSelect)
+
+        self.findBase = None
+        self.prompt = None
+
+
+class Prompt(object):
+
+    """A prompt of the status line, taking keys before they browse
+    contents"""
+
+    def edit(self, text, key):
+
+        """Return `text` as edited by `key`, None if `key` does not edit
+        text"""
+
+        # Printable character typed, add it to text.
+        if 32 <= key < 127:
+            return text + chr(key)
+
+        # Backspace erases last character of text.
+        if key in BACKSPACE_CODES and text:
+            return text[:-1]
+
+        return None
+
+    def key(self, session, key, events):
+
+        """Handle `key` typed during `session`, `events` being the events
+        woken up for. Return whether `key` was taken, keys not taken
+        browse contents."""
+
+        raise NotImplementedError
+
+
+class FilterPrompt(Prompt):
+
+    """Type-to-filter mode, browsing contents whose names match query"""
+
+    def __init__(self, browser):
+
+        # Whole contents, and selection before filtering.
+        self.base = browser.getContents()
+        self.select = browser.selectIndex
+
+        self.nameFilter = NameFilter(NameIndex(self.base))
+
+    def show(self, session):
+
+        """Browse contents matching query"""
+
+        showFilter(session.browser, self.base, self.nameFilter)
+
+    def key(self, session, key, events):
+
+        browser = session.browser
+        nameFilter = self.nameFilter
+
+        query = self.edit(nameFilter.query, key)
+
+        if query is not None:
+            nameFilter.setQuery(query)
+
+        # Tab switches the way names are matched.
+        elif key == keyCode('filtermode'):
+
+            mode = FILTER_MODES.index(nameFilter.mode) + 1
+            nameFilter.setMode(FILTER_MODES[mode % len(FILTER_MODES)])
+
+        # Enter keeps selection, Escape(or Backspace on an empty query)
+        # restores it. Both stop filtering.
+        elif (key in (keyCode('enter'), keyCode('escape')) or
+              key in BACKSPACE_CODES):
+
+            select = self.select
+
+            # Select the content selected while filtering.
+            if key == keyCode('enter') and browser.getSelected() is not None:
+                select = browser.getContents().sourceIndex(
+                    browser.selectIndex - 1) + 1
+
+            browser.status = None
+            browser.setContents(self.base)
+            browser.Jump(select)
+
+            session.prompt = None
+
+            # Merge contents listed(or searched) and apply changes made
+            # meanwhile, see main().
+            events.update(('loader', 'watcher', 'searcher'))
+
+            return True
+
+        # Other keys browse contents matching.
+        else:
+            return False
+
+        self.show(session)
+
+        return True
+
+
+class FindPrompt(Prompt):
+
+    """Find prompt, browsing contents of current directory's tree whose
+    names match query"""
+
+    def __init__(self, query):
+
+        self.query = query
+
+    def show(self, session):
+
+        """Browse contents found, as indexed so far"""
+
+        showFound(session.browser, session.index,
+                  session.paths.getHistory(), self.query, session.findMode,
+                  session.indexer)
+
+    def key(self, session, key, events):
+
+        query = self.edit(self.query, key)
+
+        if query is not None:
+            self.query = query
+
+        # Tab switches the way names are matched.
+        elif key == keyCode('filtermode'):
+
+            mode = FIND_MODES.index(session.findMode) + 1
+            session.findMode = FIND_MODES[mode % len(FIND_MODES)]
+
+        # Enter closes prompt, contents found are browsed.
+        elif key == keyCode('enter'):
+
+            session.findLast = self.query
+            session.prompt = None
+
+            return True
+
+        # Escape(or Backspace on an empty query) stops finding.
+        elif key == keyCode('escape') or key in BACKSPACE_CODES:
+
+            session.leaveFound()
+
+            # Merge contents listed and apply changes made meanwhile, see
+            # main().
+            events.update(('loader', 'watcher'))
+
+            return True
+
+        # Other keys browse contents found.
+        else:
+            return False
+
+        self.show(session)
+
+        return True
+
+
+class SearchPrompt(Prompt):
+
+    """Search prompt, searching current directory's tree once query is
+    entered"""
+
+    def __init__(self):
+
+        self.query = ""
+
+    def show(self, session):
+
+        """Show query and mode"""
+
+        session.browser.setStatus("search: %s  [%s]" % (self.query,
+                                                         session.searchMode))
+
+    def key(self, session, key, events):
+
+        query = self.edit(self.query, key)
+
+        if query is not None:
+            self.query = query
+
+        # Tab switches what is searched.
+        elif key == keyCode('filtermode'):
+
+            mode = SEARCH_MODES.index(session.searchMode) + 1
+            session.searchMode = SEARCH_MODES[mode % len(SEARCH_MODES)]
+
+        # Enter starts searching, contents found are browsed.
+        elif key == keyCode('enter') and self.query:
+
+            path = session.paths.getHistory()
+
+            contents = ContentStore()
+            contents.sortKeys = SortKeys(path)
+
+            session.browser.setContents(contents)
+
+            session.searcher = Searcher(path, session.searchMode, self.query,
+                                        contents.sortKeys.key,
+                                        SEARCH_WORKERS,
+                                        partial(session.loop.wake,
+                                                'searcher'))
+            session.searcher.start()
+
+            session.prompt = None
+
+            # Show progress.
+            events.add('searcher')
+
+            return True
+
+        # Escape(or Backspace/Enter on an empty query) closes it.
+        elif (key in BACKSPACE_CODES or
+              key in (keyCode('enter'), keyCode('escape'))):
+
+            session.leaveFound()
+
+            # Merge contents listed and apply changes made meanwhile, see
+            # main().
+            events.update(('loader', 'watcher'))
+
+            return True
+
+        self.show(session)
+
+        return True
+
+
+class MarkPrompt(Prompt):
+
+    """Mark prompt, marking contents whose names match a glob pattern"""
+
+    def __init__(self):
+
+        self.pattern = ""
+
+    def show(self, session):
+
+        """Show pattern"""
+
+        session.browser.setStatus("mark: %s" % self.pattern)
+
+    def key(self, session, key, events):
+
+        browser = session.browser
+
+        pattern = self.edit(self.pattern, key)
+
+        if pattern is not None:
+            self.pattern = pattern
+
+        # Enter marks contents matching, closing prompt.
+        elif key == keyCode('enter') and self.pattern:
+
+            browser.markMatching(self.pattern)
+
+            session.showStatus("%d marked" % len(browser.selection))
+            session.prompt = None
+
+            return True
+
+        # Escape(or Backspace/Enter on an empty pattern) closes it.
+        elif (key in BACKSPACE_CODES or
+              key in (keyCode('enter'), keyCode('escape'))):
+
+            browser.setStatus(None)
+            session.prompt = None
+
+            return True
+
+        self.show(session)
+
+        return True
+
+
+class DeletePrompt(Prompt):
+
+    """Delete confirmation, taking the next key"""
+
+    def __init__(self, paths):
+
+        # paths of entries to be deleted once confirmed.
+        self.paths = paths
+
+    def key(self, session, key, events):
+
+        if key == keyCode('confirm'):
+
+            session.fileOps.request('delete', self.paths)
+
+            session.browser.clearMarks()
+
+            # Show progress.
+            events.add('fileops')
+
+        else:
+            session.showStatus("delete: cancelled")
+
+        session.prompt = None
+
+        return True
+
+
+def onQuit(session, key, events):
+
+    """Quit"""
+
+    session.quitting = True
+
+
+def onUp(session, key, events):
+
+    """Move selection to previous element, see main()"""
+
+    session.moveSteps -= 1
+
+
+def onDown(session, key, events):
+
+    """Move selection to next element, see main()"""
+
+    session.moveSteps += 1
+
+
+def onEnter(session, key, events):
+
+    """Browse directory selected(or the one a content found is in), or
+    open(or close) preview of file selected"""
+
+    browser = session.browser
+    paths = session.paths
+
+    # Get selected Content from browser
+    selected_content = browser.getSelected()
+
+    if selected_content is None:
+        return None
+
+    # Content found, browse directory it is in.
+    if session.findBase is not None:
+
+        session.leaveFound()
+
+        # Remember where we were
+        paths.getVisit().remember(browser)
+
+        if selected_content.type == 'dir':
+            paths.chPath(selected_content.name)
+
+        # Select file once browsed.
+        else:
+            paths.chPath(dirname(selected_content.name))
+
+            paths.getVisit().selectIndex = 1
+            paths.getVisit().scrollIndex = None
+            paths.getVisit().selected = Content(
+                basename(selected_content.name), 'file')
 
-    def __init__(self, startPath):
+        return paths.getVisit()
 
-        """Start with `startPath` as current path"""
+    # If it is a directory
+    if selected_content.type == 'dir':
 
-        # Initialize path history with startPath
-        self.pathHistory = [abspath(startPath)]
+        # Remember where we were
+        paths.getVisit().remember(browser)
 
-    def chPath(self, newPath):
+        # Gets new path
+        paths.chPath(selected_content.name)
 
-        """Change the current path to newPath and return it"""
+        return paths.getVisit()
 
-        # Last path
-        lastPath = self.pathHistory[-1]
+    # File selected, open(or close) preview pane.
+    if session.preview is None:
 
-        # Append new absolute path to path history.
-        self.pathHistory.append(join(abspath(lastPath), newPath))
+        session.preview = openPreview(session.stdscr, browser)
+        showPreview(browser, session.preview)
 
-        # Return the most recent path(the current path)
-        return self.getHistory()
+    else:
 
-    def getHistory(self, history_depth=0):
+        browser.setWindow(session.stdscr)
+        session.preview = None
 
-        """Return the path from path history
+    return None
 
-        --Parameters--
 
-        history_depth(int)(default=0):
+def onEscape(session, key, events):
 
-          Range - [0, x] (x is no. of paths in the history)
-          min value means *most recent path*
-          max value means *oldest path*
-        """
+    """Stop searching(keeping contents found so far), browsing contents
+    found or file operations"""
 
-        return self.pathHistory[-(history_depth + 1)]
+    if session.searcher is not None:
+        session.searcher.cancel()
 
-    def popHistory(self, history_depth=0):
+    elif session.findBase is not None:
 
-        """Pop(remove & return) path from path history
+        session.leaveFound()
 
-        --Parameters--
+        events.update(('loader', 'watcher'))
 
-        history_depth(int)(default=0):
+    elif session.fileOps.running:
+        session.fileOps.cancel()
 
-          Range - [0, x] (x is no. of paths in the history)
-          min value means *most recent path*
-          max value means *oldest path*
-        """
 
-        # Remove every path after history_depth
-        self.pathHistory = self.pathHistory[:-history_depth]
+def onBack(session, key, events):
 
-        # Return the required path
-        return self.pathHistory[-1]
+    """Stop browsing contents found, or browse parent directory"""
+
+    if session.findBase is not None:
+
+        session.leaveFound()
+
+        events.update(('loader', 'watcher'))
+
+        return None
+
+    # If parent path in contents
+    if any(content.name == SPECIAL_DIRS['BACK_DIR']
+           for content in session.browser.getContents()):
+
+        # Remember where we were
+        session.paths.getVisit().remember(session.browser)
+
+        # Switch to parent path
+        session.paths.chPath(SPECIAL_DIRS['BACK_DIR'])
+
+        return session.paths.getVisit()
+
+    return None
+
+
+def onMark(session, key, events):
+
+    """Mark(or unmark) selected content, and select next one"""
+
+    session.browser.toggleMark()
+    session.moveSteps += 1
+
+
+def onMarkBulk(session, key, events):
+
+    """Mark all contents, invert marks or mark a range"""
+
+    browser = session.browser
+
+    if key == keyCode('markall'):
+        browser.markAll()
+    elif key == keyCode('markinvert'):
+        browser.invertMarks()
+    else:
+        browser.markRange()
+
+    # Unless status line is in use.
+    if session.loader is None and session.findBase is None:
+        session.showStatus("%d marked" % len(browser.selection))
+
+
+def onMarkMatching(session, key, events):
+
+    """Open mark prompt, marking contents by name"""
+
+    session.prompt = MarkPrompt()
+    session.prompt.show(session)
+
+
+def onYank(session, key, events):
+
+    """Yank contents marked(or selected) to be copied or moved"""
+
+    session.yanked = selectedPaths(session.browser)
+
+    session.browser.clearMarks()
+
+    session.showStatus("%d entries yanked" % len(session.yanked))
+
+
+def onPaste(session, key, events):
+
+    """Copy(or move) contents yanked into current directory"""
+
+    if not session.yanked or session.findBase is not None:
+        return
+
+    if key == keyCode('paste'):
+        session.fileOps.request('copy', session.yanked,
+                                session.paths.getHistory())
+
+    # Moved away, can't be moved again.
+    else:
+        session.fileOps.request('move', session.yanked,
+                                session.paths.getHistory())
+        session.yanked = []
+
+    # Show progress.
+    events.add('fileops')
+
+
+def onDelete(session, key, events):
+
+    """Delete contents marked(or selected), once confirmed"""
+
+    deleting = selectedPaths(session.browser)
+
+    if deleting:
+
+        session.browser.setStatus("delete %d entries? (%s/n)" % (
+            len(deleting), KEYS['confirm']))
+
+        session.prompt = DeletePrompt(deleting)
+
+
+def onHistory(session, key, events):
+
+    """Go back or forward in history"""
+
+    paths = session.paths
+
+    # Stop browsing contents found.
+    if session.findBase is not None:
+        session.leaveFound()
+
+    # Remember where we were
+    paths.getVisit().remember(session.browser)
+
+    if key == KEYS['historyback']:
+        visit = paths.back()
+    else:
+        visit = paths.forward()
+
+    # Directory may be gone meanwhile.
+    if visit is not None and not isdir(visit.path):
+
+        session.showStatus("%s: no such directory" % visit.path)
+
+        # Stay where we are.
+        if key == KEYS['historyback']:
+            paths.forward()
+        else:
+            paths.back()
+
+        visit = None
+
+    return visit
+
+
+def onFilter(session, key, events):
+
+    """Start filtering by name"""
+
+    session.prompt = FilterPrompt(session.browser)
+    session.prompt.show(session)
+
+
+def onSort(session, key, events):
+
+    """Sort contents in next order"""
+
+    browser = session.browser
+
+    order = SORT_ORDERS.index(session.sortOrder) + 1
+    session.sortOrder = SORT_ORDERS[order % len(SORT_ORDERS)]
+
+    contents = browser.getContents()
+    selected = browser.getSelected()
+    marked = browser.getMarked()
+
+    orderContents(contents, session.sortOrder)
+    browser.setContents(contents)
+
+    # Sort keys of cached listing grew.
+    if contents.sortKeys is not None:
+        session.cache.reaccount(contents.sortKeys.path)
+
+    # Keep marked contents marked.
+    if marked:
+        browser.setMarked(marked, contents.sortKeys.key)
+        browser.redraw()
+
+    # Keep selected content selected.
+    if selected is not None:
+        key = contents.sortKeys.key
+        browser.Jump(bisect_left(contents, key(selected), key=key) + 1)
+
+    # Show order for a while, unless status line is in use.
+    if session.loader is None:
+        session.showStatus("Sorted by %s" % session.sortOrder)
+
+
+def onSearch(session, key, events):
+
+    """Open search prompt, searching the whole directory"""
+
+    if session.findBase is not None:
+        session.leaveFound()
+
+    session.findBase = session.browser.getContents()
+    session.findSelect = session.browser.selectIndex
+
+    session.prompt = SearchPrompt()
+    session.prompt.show(session)
+
+
+def onFind(session, key, events):
+
+    """Open find prompt, browsing contents found"""
+
+    path = session.paths.getHistory()
+
+    # Stop searching, contents found replace contents searched.
+    if session.searcher is not None:
+        session.searcher.cancel()
+        session.searcher = None
+
+    try:
+        if session.index is None:
+            session.index = SubtreeIndex()
+
+    except (OSError, DatabaseError) as error:
+        session.showStatus("find: %s" % error)
+
+        return
+
+    indexer = session.indexer
+
+    # Update index of current directory's tree in background.
+    if indexer is None or indexer.done or indexer.root != path:
+
+        if indexer is not None:
+            indexer.cancel()
+
+        session.indexer = Indexer(session.index.path, path,
+                                  partial(session.loop.wake, 'indexer'))
+        session.indexer.start()
+
+    # Open prompt again, with last query.
+    if session.findBase is None:
+        session.findBase = session.browser.getContents()
+        session.findSelect = session.browser.selectIndex
+        session.prompt = FindPrompt("")
+    else:
+        session.prompt = FindPrompt(session.findLast)
+
+    session.prompt.show(session)
+
+
+def onDu(session, key, events):
+
+    """Measure disk usage of directories browsed"""
+
+    browser = session.browser
+    contents = browser.getContents()
+
+    if contents.sortKeys is None:
+        return
+
+    try:
+        session.diskUsage.request(
+            contents.sortKeys.path,
+            [content.name for content in contents
+             if content.type == 'dir' and
+             content.name not in SPECIAL_DIRS.values()])
+
+    except OSError as error:
+        session.showStatus("du: %s" % error)
+
+    # Render disk usage column from now on.
+    browser.diskUsage = session.diskUsage
+    browser.redraw()
+
+
+def onProfiler(session, key, events):
+
+    """Show or hide profiler overlay, profiling while shown"""
+
+    if session.overlay is None:
+
+        PROFILER.enable()
+
+        session.overlay = openOverlay(session.stdscr)
+        session.overlayDamaged = True
+
+        return
+
+    # Keep profiling, if traced.
+    PROFILER.enable(TRACE_FILE is not None)
 
+    session.overlay = None
 
-def main(stdscr):
+    # Render what the overlay hid.
+    session.browser.redraw()
 
-    """Contains curses main loop"""
+    if session.preview is not None:
+        showPreview(session.browser, session.preview)
+
+
+def onColumns(session, key, events):
+
+    """Show or hide metadata columns"""
+
+    session.browser.columns = not session.browser.columns
+    session.browser.redraw()
+
+
+def onStats(session, key, events):
+
+    """Show how well listings are cached and prefetched"""
+
+    cacheStats = session.cache.stats()
+    prefetchStats = session.prefetcher.stats()
+
+    session.showStatus(
+        "Prefetch: %d hits, %d misses(%d%%), %d listed  "
+        "Cache: %d hits, %d misses, %d entries" % (
+            prefetchStats["hits"], prefetchStats["misses"],
+            100 * prefetchStats["hitRate"], prefetchStats["listed"],
+            cacheStats["hits"], cacheStats["misses"],
+            cacheStats["entries"]))
+
+
+def onHome(session, key, events):
+
+    """Select the first selectable element"""
+
+    session.browser.Jump(session.browser.minSelectIndex)
+
+
+def onEnd(session, key, events):
+
+    """Select the last selectable element"""
+
+    session.browser.Jump(session.browser.maxSelectIndex)
+
+
+def onPageDown(session, key, events):
+
+    """Page down by height"""
+
+    session.browser.bulkMove(session.browser.height)
+
+
+def onPageUp(session, key, events):
+
+    """Page up by height"""
+
+    session.browser.bulkMove(-session.browser.height)
+
+
+# Handlers of keys browsing contents, by key code. Each is called with the
+# Session, the key and the events woken up for, and returns the Visit of
+# the directory browsed next, if any.
+BROWSE_KEYS = {keyCode('quit'): onQuit, keyCode('up'): onUp,
+               keyCode('down'): onDown, keyCode('enter'): onEnter,
+               keyCode('escape'): onEscape, keyCode('back'): onBack,
+               keyCode('mark'): onMark, keyCode('markall'): onMarkBulk,
+               keyCode('markinvert'): onMarkBulk,
+               keyCode('markrange'): onMarkBulk,
+               keyCode('markmatching'): onMarkMatching,
+               keyCode('yank'): onYank, keyCode('paste'): onPaste,
+               keyCode('pastemove'): onPaste, keyCode('delete'): onDelete,
+               keyCode('historyback'): onHistory,
+               keyCode('historyforward'): onHistory,
+               keyCode('filter'): onFilter, keyCode('sort'): onSort,
+               keyCode('search'): onSearch, keyCode('find'): onFind,
+               keyCode('du'): onDu, keyCode('profiler'): onProfiler,
+               keyCode('columns'): onColumns, keyCode('stats'): onStats,
+               keyCode('home'): onHome, keyCode('end'): onEnd,
+               keyCode('pagedown'): onPageDown,
+               keyCode('pageup'): onPageUp}
+
+
+def main(stdscr, keyboard=None):
+
+    """Contains curses main loop.
+
+    `stdscr` is the curses screen, or a headless screen.Screen, and
+    `keyboard` a file readable whenever keys were typed(sys.stdin if
+    None). Keys are handled by the prompt open, if any, and by
+    BROWSE_KEYS' handlers, see Session."""
+
+    if keyboard is None:
+        keyboard = sys.stdin
+
+    # Startup is profiled from main.py's first line to the first frame
+    # showing contents, phase by phase.
+    startup = PROFILER.begin("startup", STARTED)
+    phaseStart = PROFILER.start()
+
+    if startup is not None:
+        PROFILER.record("imports", STARTED, phase=True,
+                        elapsed=phaseStart - STARTED)
 
     # Configure standard screen.
     stdscr = config(stdscr)
 
+    # Do not wait for keyboard input, event loop waits for it.
+    stdscr.nodelay(True)
+
     # default keyboard input
     stdscr_key = None
 
+    # Waits for keyboard input and background events.
+    loop = EventLoop()
+    loop.register('keyboard', keyboard)
+
+    # Background listings wake up event loop.
+    def notify():
+        loop.wake('loader')
+
     # Manage paths
     paths = Paths('.')
 
-    # Get all contents
-    contentsAll = getContents(paths.getHistory())
+    # Directory dex started in.
+    startPath = paths.getHistory()
 
     # Instantiate Browser-class
-    browser = Browser(stdscr, contentsAll)
+    browser = Browser(stdscr, ContentStore())
+
+    # Render at most FRAME_RATE frames per second, see below.
+    browser.hold = True
+
+    # Order contents are sorted in.
+    sortOrder = SORT_ORDERS[0]
+
+    # Last session's view of start directory, if saved.
+    snapshots = SnapshotStore()
+    snapshot = None
+
+    if SNAPSHOTS:
+        snapshot = snapshots.load(startPath)
+
+    # Paint it right away, before anything else gets set up. It gets
+    # revalidated below.
+    if snapshot is not None:
+
+        sortOrder = snapshot.contents.sortKeys.order
+
+        browser.setContents(snapshot.contents)
+        browser.setView(snapshot.selectIndex, snapshot.scrollIndex)
+
+        if startup is not None:
+            PROFILER.record("setup", phaseStart, phase=True)
+            phaseStart = PROFILER.start()
+
+        browser.render()
+
+        if startup is not None:
+            PROFILER.record("firstFrame", phaseStart, phase=True)
+            PROFILER.end("startup", startup)
+            startup = None
+
+    # Recently visited directories' contents
+    cache = ListingCache(CACHE_MAX_ENTRIES, CACHE_MAX_BYTES)
+
+    # Lists selected directories into cache, before they get browsed.
+    prefetcher = Prefetcher(lambda path, order: getContents(path, None, order),
+                            cache, PREFETCH_WORKERS,
+                            partial(loop.wake, 'prefetched'))
+
+    # lstat()-s contents on screen for metadata columns.
+    fetcher = MetadataFetcher(METADATA_WORKERS, METADATA_BATCH,
+                              partial(loop.wake, 'metadata'))
+
+    # Measures disk usage of directories, on demand.
+    diskUsage = DiskUsage(DU_WORKERS, DU_MAX_ENTRIES,
+                          partial(loop.wake, 'du'))
+
+    # Copies, moves and deletes files.
+    fileOps = FileOperations(FILEOPS_WORKERS, partial(loop.wake, 'fileops'))
+
+    # What is browsed, and how, shared with key handlers.
+    session = Session(stdscr, browser, paths, loop, cache, prefetcher,
+                      diskUsage, fileOps, sortOrder)
+
+    # When last frame was rendered.
+    lastFrame = 0
+
+    # Changes of current directory held back while contents are listed,
+    # filtered or found(None if lost).
+    stashed = []
+
+    # Visit to be restored once its directory is listed, see Paths.
+    restoring = None
+
+    # When keys not painted yet were read, while profiling.
+    typedAt = None
+
+    # Watch current directory for changes, if supported.
+    try:
+        watcher = DirWatcher()
+        watcher.watch(paths.getHistory())
+        loop.register('watcher', watcher)
+    except OSError:
+        watcher = None
+
+    # Contents listed while a snapshot is browsed instead, None if none.
+    behind = None
+
+    # Get all contents
+    if snapshot is None:
+        session.loader = browseContents(browser, paths.getHistory(), cache,
+                                        sortOrder, notify)
+
+    # Unless snapshot is still up to date.
+    else:
+        session.loader, behind = revalidateSnapshot(snapshot, cache, notify)
+
+    if startup is not None:
+        PROFILER.record("setup", phaseStart, phase=True)
+        phaseStart = PROFILER.start()
 
     # Main loop. Quits when keyboard input is 'q'
-    while stdscr_key is not ord(KEYS['quit']):
+    while not session.quitting:
 
-        # Get input from keyboard.
-        stdscr_key = stdscr.getch()
+        # Wait for events
+        events = loop.wait()
 
-        # Arrow Up key pressed
-        if stdscr_key == KEYS['up']:
+        # When woken up, while profiling.
+        woken = PROFILER.start()
 
-            # Move selection to previous element
-            browser.Move(-1)
+        # Keys typed so far.
+        typed = []
 
-        # Arrow Down key pressed
-        elif stdscr_key == KEYS['down']:
+        if 'keyboard' in events:
 
-            # Move selection to next element.
-            browser.Move(1)
+            # Get all pending input from keyboard.
+            stdscr_key = stdscr.getch()
 
-        # Enter/Return key pressed
-        elif stdscr_key == ord(KEYS['enter']):
+            while stdscr_key != -1:
+                typed.append(stdscr_key)
+                stdscr_key = stdscr.getch()
 
-            # Get selected Content from browser
-            selected_content = browser.getSelected()
+        # Keys are painted by the next frame rendered.
+        if typed and typedAt is None:
+            typedAt = woken
 
-            # If it is a directory
-            if selected_content.type == 'dir':
+        for stdscr_key in typed:
 
-                # Gets new path
-                newPath = paths.chPath(selected_content.name)
+            # Apply consecutive moves as a single one, before other keys.
+            if (session.moveSteps and
+                    stdscr_key not in (KEYS['up'], KEYS['down'])):
+                browser.Move(session.moveSteps, clamp=True)
+                session.moveSteps = 0
 
-                # Get new list of Contents
-                contentsAll = getContents(newPath)
+            # Prompt open takes keys first.
+            if (session.prompt is not None and
+                    session.prompt.key(session, stdscr_key, events)):
+                continue
 
-                # Set to browse new list of contents
-                browser.setContents(contentsAll)
+            handler = BROWSE_KEYS.get(stdscr_key)
 
-        elif stdscr_key == KEYS['back']:
+            if handler is None:
+                continue
+
+            # Visit of path browsed next, if any.
+            visit = handler(session, stdscr_key, events)
+
+            if session.quitting:
+                break
+
+            # Browse path changed to
+            if visit is not None:
+
+                newPath = visit.path
+
+                # Stop listing previous path
+                if session.loader is not None:
+                    session.loader.cancel()
+
+                # Count whether it was prefetched
+                prefetcher.descend(newPath)
+
+                # Forget changes of previous path
+                stashed = []
+
+                # Snapshot is not browsed any more.
+                behind = None
+
+                # Watch new path for changes
+                if watcher is not None:
+                    watcher.watch(newPath)
+
+                # Browse new list of Contents
+                session.loader = browseContents(browser, newPath, cache,
+                                                session.sortOrder, notify)
+
+                # Select as when leaving it, once listed.
+                if session.loader is None:
+                    visit.restore(browser)
+                    restoring = None
+                else:
+                    restoring = visit
+
+        # Contents searched are not browsed any more, stop searching.
+        if session.searcher is not None and session.findBase is None:
+            session.searcher.cancel()
+            session.searcher = None
+
+        # Apply remaining moves.
+        if session.moveSteps:
+            browser.Move(session.moveSteps, clamp=True)
+            session.moveSteps = 0
+
+        # Whether contents browsed are listed ones, as they were listed.
+        listed = not session.filtering() and session.findBase is None
+
+        # Remove status line shown for a while, revalidating a snapshot
+        # does not use it.
+        if ('status' in events and
+                (session.loader is None or behind is not None) and
+                session.prompt is None and session.findBase is None):
+            browser.setStatus(None)
+
+        # Contents being listed or filtered stay as they are, changes of
+        # current directory are held back meanwhile.
+        if (watcher is not None and 'watcher' in events and
+                (session.loader is not None or not listed)):
+
+            changes = watcher.changes()
+
+            # Changes were lost.
+            if changes is None or stashed is None:
+                stashed = None
+            else:
+                stashed.extend(changes)
+
+        # Merge contents listed so far
+        if session.loader is not None and listed and 'loader' in events:
+
+            listing = session.loader
+
+            if behind is None:
+                session.loader = loadContents(browser, listing, cache)
+            else:
+                session.loader = loadBehind(browser, listing, cache, behind)
+
+            # Completely listed, apply changes held back.
+            if session.loader is None:
+
+                behind = None
+
+                # Unreadable, only special directories are listed.
+                if listing.error is not None:
+                    session.showStatus("Listing failed: %s" % listing.error)
+
+                events.add('watcher')
+
+                # Select as when leaving it, unless selection moved.
+                if (restoring is not None and
+                        browser.selectIndex == browser.minSelectIndex):
+                    restoring.restore(browser)
+
+                restoring = None
+
+                # Prefetch once selection rests on the listing.
+                loop.setTimer('prefetch', PREFETCH_DELAY)
+
+        # Apply changes of current directory
+        if (watcher is not None and 'watcher' in events and
+                session.loader is None and listed):
+
+            refreshContents(browser, watcher, paths.getHistory(), cache,
+                            stashed)
+
+            stashed = []
+
+        # Cache directories prefetched meanwhile.
+        if 'prefetched' in events:
+            prefetcher.collect()
+
+        # Prefetch selected directory once selection rests on it.
+        if typed:
+            loop.cancelTimer('prefetch')
+            loop.setTimer('prefetch', PREFETCH_DELAY)
+
+        # Preview selected file once selection rests on it, skipping files
+        # selected on the way.
+        if session.preview is not None and (typed or 'loader' in events or
+                                            'searcher' in events):
+            loop.cancelTimer('preview')
+            loop.setTimer('preview', PREVIEW_DELAY)
+
+        if 'preview' in events and session.preview is not None:
+            showPreview(browser, session.preview)
+            session.overlayDamaged = True
+
+        if 'prefetch' in events and session.loader is None:
+            prefetchContents(browser, prefetcher, paths.getHistory(),
+                             session.sortOrder)
+
+        # Merge contents searched so far
+        if (session.searcher is not None and not session.filtering() and
+                'searcher' in events):
+            session.searcher = loadFound(browser, session.searcher)
+
+        # Find again in the index updated meanwhile.
+        if 'indexer' in events and isinstance(session.prompt, FindPrompt):
+            session.prompt.show(session)
+
+        # Render disk usage measured meanwhile.
+        if 'du' in events:
+
+            browser.redraw()
+
+            left, dirs, elapsed = diskUsage.progress()
+
+            # Unless status line is in use.
+            if session.loader is None and listed:
+
+                if left:
+                    browser.setStatus("du: %d dirs measured, %d left..." %
+                                      (dirs, left))
+                else:
+                    session.showStatus("du: %d dirs measured in %.1f s" %
+                                       (dirs, elapsed))
+
+        # List directories changed by file operations again, report them.
+        if 'fileops' in events:
+
+            for operation in fileOps.collect():
+
+                for path in operation.affected:
+
+                    # Changes of current directory are watched.
+                    if path != paths.getHistory() or watcher is None:
+                        cache.discard(path)
+
+                # Disk usage measured before is stale.
+                if browser.diskUsage is not None:
+
+                    for path in operation.affected.union(operation.sources):
+                        diskUsage.discard(path)
+
+                    browser.redraw()
+
+                # Current directory changed, unless listed meanwhile.
+                if (watcher is None and
+                        paths.getHistory() in operation.affected and
+                        session.loader is None and listed):
+                    reloadContents(browser, paths.getHistory(), cache)
+
+                session.showStatus(operationStatus(operation))
+
+            # Unless status line is in use.
+            if (fileOps.running and session.loader is None and
+                    session.prompt is None and session.findBase is None):
+                showOperations(browser, fileOps)
+
+        # Render metadata fetched meanwhile.
+        if 'metadata' in events:
+
+            fetched = fetcher.collect()
+
+            # Cached listings grew.
+            for sortKeys in fetched:
+                cache.reaccount(sortKeys.path)
+
+            if fetched and browser.columns:
+                browser.redraw()
+
+        # Fetch metadata of contents on screen only.
+        if browser.columns and browser.getContents().sortKeys is not None:
 
-            # Get contents' list.
             contents = browser.getContents()
 
-            # If parent path in contents
-            if SPECIAL_DIRS['BACK_DIR'] in [content.name
-                                            for content in contents]:
+            fetcher.request(contents.sortKeys,
+                            [contents[index].name
+                             for index in browser.viewport()])
 
-                # Switch to parent path
-                newPath = paths.chPath(SPECIAL_DIRS['BACK_DIR'])
+        # Render changes, unless last frame was rendered too recently.
+        if browser.pending:
 
-                # Get new list of Contents
-                contentsAll = getContents(newPath)
+            # Time left before next frame.
+            delay = lastFrame + 1.0 / FRAME_RATE - monotonic()
 
-                # Set to browse new list of contents
-                browser.setContents(contentsAll)
+            if delay <= 0:
 
-        # Home key pressed
-        elif stdscr_key == KEYS['home']:
+                browser.render()
+                lastFrame = monotonic()
 
-            # Determine the index of first selectable element.
-            first_element = browser.minSelectIndex
+                # First frame showing contents.
+                if startup is not None and browser.getContents():
+                    PROFILER.record("firstFrame", phaseStart, phase=True)
+                    PROFILER.end("startup", startup)
+                    startup = None
 
-            # Jump to select the first selectable element
-            browser.Jump(first_element)
+                # Keys typed were painted.
+                if typedAt is not None:
+                    PROFILER.keyPainted(typedAt)
+                    typedAt = None
 
-        # End key pressed
-        elif stdscr_key == KEYS['end']:
+                session.overlayDamaged = True
 
-            # Determine the index of last selectable element.
-            last_element = browser.maxSelectIndex
+            # Wake up to render it.
+            else:
+                loop.setTimer('frame', delay)
 
-            # Jump to select the last selectable element
-            browser.Jump(last_element)
+        # Keys typed changed nothing on screen.
+        else:
+            typedAt = None
 
-        # Page Down key pressed
-        elif stdscr_key == KEYS['pagedown']:
-            # Page down by height
-            # This may not be the best way. Correct it if it's really not #
-            height = browser.dims[0]
-            browser.bulkMove(height)
+        # Draw overlay over contents rendered.
+        if session.overlay is not None and session.overlayDamaged:
+            session.overlay.show()
 
-        # Page up key pressed
-        elif stdscr_key == KEYS['pageup']:
-            # Page up by height
-            # This may not be the best way. Correct it if it's really not #
-            height = browser.dims[0]
-            browser.bulkMove(-height)
+        session.overlayDamaged = False
 
-        # Wait for 100 ms
-        # TODO -> increase to decrease CPU cycles.
-        stdscr.timeout(100)
+    # Stop indexing and searching.
+    if session.indexer is not None:
+        session.indexer.cancel()
 
+    if session.searcher is not None:
+        session.searcher.cancel()
 
-if __name__ == "__main__":
+    # Stop prefetching and measuring.
+    prefetcher.close()
+    diskUsage.close()
+    fetcher.close()
+
+    # Stop file operations, files partially copied are removed.
+    fileOps.close()
 
-    # Initializes curses screen.
-    stdscr = initscr()
+    # Save view of start directory, painted right away next time. Contents
+    # found are not the directory's.
+    if SNAPSHOTS:
 
-    # import configured `curses` module and other configurations.
-    from config import *
+        if session.findBase is None:
+            paths.getVisit().remember(browser)
 
-    # import all other required stuff
-    from imports import *
+        saveSnapshot(snapshots, browser, paths, startPath, cache)
+
+    # Write trace of what got profiled.
+    if TRACE_FILE is not None:
+        PROFILER.dump(TRACE_FILE)
+
+
+if __name__ == "__main__":
 
-    # call `main` and wait till it exits.
+    # Initializes curses screen, call `main` and wait till it exits.
     wrapper(main)
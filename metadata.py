@@ -0,0 +1,162 @@
+# Copyright (c) 2015 ICRL
+# See the file LICENSE for copying permission.
+
+"""Contains MetadataFetcher class"""
+
+from os import lstat
+from os.path import join
+from queue import Queue
+from threading import Lock, Thread
+
+
+class MetadataFetcher(object):
+
+    """lstat()-s contents in background, for metadata columns.
+
+    01) request() method asks for the metadata of contents named `names`
+        of the directory whose SortKeys are `sortKeys`, i.e. the contents
+        on screen. Names are split in batches of at most `batchSize` names,
+        stat-ed by one of `workers` daemon threads.
+
+    02) Names requested earlier and not stat-ed yet are skipped if not
+        requested again, e.g. because they were scrolled out of screen. So
+        only contents actually seen get stat-ed.
+
+    03) Results are stored in `sortKeys.statResults`(name -> lstat()
+        result, None if it failed) by collect() method, called by the
+        thread owning them. They are cached along with the listing, valid
+        as long as the directory's stamp(inode, mtime) is unchanged, and
+        are reused by sort orders needing metadata. `notify`, if given, is
+        called from a worker thread whenever results are ready to be
+        collected.
+
+    04) `stats` member counts lstat() calls made.
+    """
+
+    def __init__(self, workers, batchSize, notify=None):
+
+        self.batchSize = batchSize
+        self.notify = notify
+
+        # (sortKeys, names) batches to be stat-ed, None stops a worker.
+        self.jobs = Queue()
+
+        # (sortKeys, frozenset of names) requested last, replaced at once.
+        self.wanted = (None, frozenset())
+
+        # names of wanted sortKeys requested and not collected yet.
+        self.inflight = set()
+
+        # (sortKeys, {name: result}, skipped names) not collected yet,
+        # guarded by lock.
+        self.results = []
+
+        self.lock = Lock()
+
+        self.stats = 0
+
+        self.workers = []
+
+        for _ in range(workers):
+
+            worker = Thread(target=self._work_)
+
+            # Do not keep the program alive, e.g. on a hung mount.
+            worker.daemon = True
+            worker.start()
+
+            self.workers.append(worker)
+
+    def _work_(self):
+
+        """Stat batches of names requested, until stopped"""
+
+        while True:
+
+            job = self.jobs.get()
+
+            # Stopped.
+            if job is None:
+                return
+
+            sortKeys, names = job
+
+            results = {}
+            skipped = []
+
+            for name in names:
+
+                wantedKeys, wantedNames = self.wanted
+
+                # Not on screen any more.
+                if sortKeys is not wantedKeys or name not in wantedNames:
+                    skipped.append(name)
+                    continue
+
+                try:
+                    results[name] = lstat(join(sortKeys.path, name))
+                except OSError:
+                    results[name] = None
+
+            with self.lock:
+                self.results.append((sortKeys, results, skipped))
+                self.stats += len(results)
+
+            if self.notify is not None:
+                self.notify()
+
+    def request(self, sortKeys, names):
+
+        """Fetch metadata of contents named `names`, of directory whose
+        SortKeys are `sortKeys`. Forget names requested earlier and not
+        fetched yet, if not in `names`."""
+
+        # Contents of another directory, or sorted another way.
+        if sortKeys is not self.wanted[0]:
+            self.inflight = set()
+
+        names = [name for name in names
+                 if name not in sortKeys.statResults]
+
+        self.wanted = (sortKeys, frozenset(names))
+
+        names = [name for name in names if name not in self.inflight]
+
+        self.inflight.update(names)
+
+        for start in range(0, len(names), self.batchSize):
+            self.jobs.put((sortKeys, names[start:start + self.batchSize]))
+
+    def collect(self):
+
+        """Store metadata fetched so far. Return SortKeys which got any, an
+        empty list if none."""
+
+        with self.lock:
+            results = self.results
+            self.results = []
+
+        fetched = []
+
+        for sortKeys, statResults, skipped in results:
+
+            # Still valid, even if not on screen any more.
+            sortKeys.statResults.update(statResults)
+
+            if statResults and sortKeys not in fetched:
+                fetched.append(sortKeys)
+
+            if sortKeys is self.wanted[0]:
+                self.inflight.difference_update(statResults)
+                self.inflight.difference_update(skipped)
+
+        return fetched
+
+    def close(self):
+
+        """Forget requests and stop workers"""
+
+        self.wanted = (None, frozenset())
+
+        for _ in self.workers:
+            self.jobs.put(None)
@@ -0,0 +1,67 @@
+# Copyright (c) 2015 ICRL
+# See the file LICENSE for copying permission.
+
+"""Contains ProfilerOverlay class, showing what a profiler.Profiler
+recorded"""
+
+from config import curses, doupdate
+
+
+class ProfilerOverlay(object):
+
+    """Shows what `profiler` recorded in a curses `window`, drawn over
+    contents: percentiles of the latency of keys, and breakdown of the
+    last operations"""
+
+    def __init__(self, window, profiler):
+
+        self.window = window
+        self.profiler = profiler
+
+    def lines(self):
+
+        """Return lines to be shown"""
+
+        lines = []
+
+        latency = self.profiler.latency(.5, .99)
+
+        if latency is None:
+            lines.append("keys: none painted yet")
+        else:
+            lines.append("keys: p50 %.1f ms, p99 %.1f ms(%d)" % (
+                latency[0] * 1000, latency[1] * 1000,
+                len(self.profiler.latencies)))
+
+        with self.profiler.lock:
+            operations = sorted(self.profiler.operations.values(),
+                                key=lambda operation: operation.name)
+
+        for operation in operations:
+
+            lines.append("%s: %.1f ms" % (operation.name,
+                                          operation.elapsed * 1000))
+
+            for name, (seconds, syscalls, calls) in list(
+                    operation.phases.items()):
+                lines.append("  %-9s %8.2f ms %6d sc %6d" % (
+                    name, seconds * 1000, syscalls, calls))
+
+        return lines
+
+    def show(self):
+
+        """Draw overlay"""
+
+        height, width = self.window.getmaxyx()
+
+        self.window.erase()
+
+        for y, line in enumerate(self.lines()[:height]):
+
+            # Last column of a window can't be written to without error.
+            self.window.addstr(y, 0, line[:width - 1].ljust(width - 1),
+                               curses.A_REVERSE)
+
+        self.window.noutrefresh()
+        doupdate()
@@ -0,0 +1,237 @@
+# Copyright (c) 2015 ICRL
+# See the file LICENSE for copying permission.
+
+"""Contains Prefetcher class"""
+
+from os.path import abspath
+from queue import Queue
+from threading import Event, Lock, Thread
+
+from cache import stamp
+
+
+class Prefetch(object):
+
+    """A directory to be listed in advance by a Prefetcher"""
+
+    __slots__ = ("path", "order", "knownStamp", "cancelled")
+
+    def __init__(self, path, order, knownStamp):
+
+        self.path = path
+
+        # order to sort contents in.
+        self.order = order
+
+        # stamp of the cached listing, if any, None otherwise.
+        self.knownStamp = knownStamp
+
+        self.cancelled = Event()
+
+
+class Prefetcher(object):
+
+    """Lists directories in background, before they get browsed, into a
+    ListingCache.
+
+    01) `listing(path, order)` is called to list the directory at `path`,
+        sorted in `order`(see main.listContents). It is called by one of
+        `workers` daemon threads, so that at most `workers` directories are
+        listed at once.
+
+    02) request() method replaces directories to be listed by the given
+        ones. Directories requested earlier and not listed yet are
+        cancelled, i.e. only the latest selection gets prefetched. A
+        directory whose listing already started can't be interrupted, it
+        is still cached when done.
+
+    03) Listings are handed over to the thread owning `cache` by collect()
+        method, as ListingCache is not thread-safe. All methods but the
+        workers' are to be called by that thread. `notify`, if given, is
+        called from a worker thread whenever a listing is ready to be
+        collected.
+
+    04) A directory whose cached listing is still valid is only stat()-ed,
+        not listed again.
+
+    05) descend() method has to be called whenever a directory gets
+        browsed, to count prefetch hits(directory was prefetched) and
+        misses(directory was neither prefetched nor cached). See stats().
+    """
+
+    def __init__(self, listing, cache, workers, notify=None):
+
+        self.listing = listing
+        self.cache = cache
+        self.notify = notify
+
+        # Prefetch-objects to be listed, None stops a worker.
+        self.jobs = Queue()
+
+        # path -> Prefetch-object of directories requested and not
+        # collected yet.
+        self.requested = {}
+
+        # (Prefetch-object, stamp, contents) listed and not collected yet,
+        # guarded by lock.
+        self.results = []
+
+        self.lock = Lock()
+
+        # paths of listings prefetched into cache and not browsed yet.
+        self.fetched = set()
+
+        # counters
+        self.hits = 0
+        self.misses = 0
+        self.listed = 0
+        self.cancelled = 0
+
+        self.workers = []
+
+        for _ in range(workers):
+
+            worker = Thread(target=self._work_)
+
+            # Do not keep the program alive, e.g. on a hung mount.
+            worker.daemon = True
+            worker.start()
+
+            self.workers.append(worker)
+
+    def _work_(self):
+
+        """List directories requested, until stopped"""
+
+        while True:
+
+            job = self.jobs.get()
+
+            # Stopped.
+            if job is None:
+                return
+
+            if job.cancelled.is_set():
+                continue
+
+            try:
+                # Stamp before listing, so that changes made while listing
+                # make the cached list stale.
+                pathStamp = stamp(job.path)
+
+                # Cached listing is still valid.
+                if pathStamp == job.knownStamp:
+                    contents = None
+                else:
+                    contents = self.listing(job.path, job.order)
+
+            # Unreadable or gone, browsing it will tell.
+            except OSError:
+                pathStamp = contents = None
+
+            with self.lock:
+                self.results.append((job, pathStamp, contents))
+
+            if self.notify is not None:
+                self.notify()
+
+    def request(self, paths, order):
+
+        """Prefetch directories at `paths`, in order of preference, sorted
+        in `order`. Cancel directories requested earlier and not listed
+        yet, if not in `paths`."""
+
+        paths = [abspath(path) for path in paths]
+
+        # Obsolete requests.
+        for path in list(self.requested):
+
+            job = self.requested[path]
+
+            if path not in paths or job.order != order:
+
+                job.cancelled.set()
+                del self.requested[path]
+
+                self.cancelled += 1
+
+        for path in paths:
+
+            if path in self.requested:
+                continue
+
+            # Stamp of cached listing, compared by worker.
+            cached = self.cache.listings.get(path)
+
+            job = Prefetch(path, order,
+                           cached[0] if cached is not None else None)
+
+            self.requested[path] = job
+            self.jobs.put(job)
+
+    def collect(self):
+
+        """Cache listings prefetched so far. Must be called by the thread
+        owning cache."""
+
+        with self.lock:
+            results = self.results
+            self.results = []
+
+        for job, pathStamp, contents in results:
+
+            # Forget it, unless a newer request is pending.
+            if self.requested.get(job.path) is job:
+                del self.requested[job.path]
+
+            if contents is None:
+                continue
+
+            self.cache.put(job.path, contents, pathStamp)
+            self.fetched.add(job.path)
+
+            self.listed += 1
+
+    def descend(self, path):
+
+        """Count browsing directory at `path` as a prefetch hit or miss"""
+
+        path = abspath(path)
+
+        self.collect()
+
+        # Prefetched listing is still cached.
+        if path in self.fetched and path in self.cache.listings:
+            self.hits += 1
+
+        # Has to be listed, unless cached by browsing it earlier.
+        elif path not in self.cache.listings:
+            self.misses += 1
+
+        self.fetched.discard(path)
+
+        # Gets listed by browsing it anyway.
+        job = self.requested.pop(path, None)
+
+        if job is not None:
+            job.cancelled.set()
+
+    def stats(self):
+
+        """Return a dict of prefetch counters"""
+
+        descents = self.hits + self.misses
+
+        return {"hits": self.hits, "misses": self.misses,
+                "hitRate": float(self.hits) / descents if descents else 0.0,
+                "listed": self.listed, "cancelled": self.cancelled,
+                "unused": len(self.fetched)}
+
+    def close(self):
+
+        """Cancel all requests and stop workers"""
+
+        self.request((), None)
+
+        for _ in self.workers:
+            self.jobs.put(None)
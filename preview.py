@@ -0,0 +1,232 @@
+# Copyright (c) 2015 ICRL
+# See the file LICENSE for copying permission.
+
+"""Contains PreviewPane class, previewing files"""
+
+import mmap
+
+from os import O_NONBLOCK, fstat, open as osOpen
+from os.path import splitext
+from stat import S_ISREG
+
+from config import curses, doupdate
+from constants import PREVIEW_MAX_SCAN, PREVIEW_SNIFF, PREVIEW_TAIL_EXTENSIONS
+from helpers import fitText
+
+
+# Printable replacement of each control character, but tab.
+CONTROL_CHARS = {code: u"." for code in list(range(32)) + [127]
+                 if code != 9}
+
+
+def openNonBlocking(path, flags):
+
+    """Open file at `path` with `flags` in non-blocking mode, return its
+    file descriptor"""
+
+    return osOpen(path, flags | O_NONBLOCK)
+
+
+def textLine(line, width):
+
+    """Return bytes `line` decoded to be shown within `width` columns(cells
+    on screen, wide characters take two)"""
+
+    text = line.decode('utf-8', 'replace').rstrip(u"\r")
+
+    return fitText(text.expandtabs(4).translate(CONTROL_CHARS), width)
+
+
+def hexBytes(width):
+
+    """Return bytes per hex dump line within `width` columns"""
+
+    # 4 columns per byte and 10 for offset, a multiple of 4 bytes.
+    return max(4, (width - 10) // 16 * 4)
+
+
+def hexLines(data, start, end, width):
+
+    """Return hex dump lines of bytes `start`..`end` of `data`, each line
+    within `width` columns"""
+
+    perLine = hexBytes(width)
+
+    lines = []
+
+    for offset in range(start, end, perLine):
+
+        chunk = data[offset:min(end, offset + perLine)]
+
+        hexa = u" ".join(u"%02x" % byte for byte in chunk)
+        text = u"".join(chr(byte) if 32 <= byte < 127 else u"."
+                        for byte in chunk)
+
+        lines.append(fitText(u"%08x  %-*s %s" % (offset, perLine * 3 - 1,
+                                                  hexa, text), width))
+
+    return lines
+
+
+def previewLines(path, height, width, tail=None):
+
+    """Return at most `height` lines previewing file at `path`, each within
+    `width` columns: first lines, or last ones if `tail`(by default, for
+    files whose extension is in PREVIEW_TAIL_EXTENSIONS). Binary files are
+    previewed as hex dump.
+
+    File is mapped in memory, and only bytes of lines previewed are read
+    and decoded: at most PREVIEW_MAX_SCAN bytes are scanned for each line
+    end, whatever the size of file."""
+
+    if tail is None:
+        tail = splitext(path)[1].casefold() in PREVIEW_TAIL_EXTENSIONS
+
+    # Do not block on FIFOs and devices, they are not previewed anyway.
+    with open(path, 'rb', opener=openNonBlocking) as fileobj:
+
+        st = fstat(fileobj.fileno())
+
+        if not S_ISREG(st.st_mode):
+            raise ValueError("not a regular file")
+
+        size = st.st_size
+
+        # Empty files can't be mapped.
+        if not size or height <= 0:
+            return []
+
+        with mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ) as data:
+
+            # Bytes of a line shown, at most 4 bytes per character.
+            lineBytes = width * 4
+
+            # Binary if a NUL byte is among the first(or last) ones.
+            if tail:
+                binary = data.find(b"\0", max(0, size - PREVIEW_SNIFF)) != -1
+            else:
+                binary = data.find(b"\0", 0, PREVIEW_SNIFF) != -1
+
+            if binary:
+
+                perLine = hexBytes(width)
+
+                if tail:
+                    start = max(0, (size - 1) // perLine - height + 1)
+                    start *= perLine
+                else:
+                    start = 0
+
+                return hexLines(data, start,
+                                min(size, start + height * perLine), width)
+
+            lines = []
+
+            if not tail:
+
+                start = 0
+
+                while start < size and len(lines) < height:
+
+                    end = data.find(b"\n", start,
+                                    min(size, start + PREVIEW_MAX_SCAN))
+
+                    # Line too long to find its end, show its beginning.
+                    if end == -1:
+
+                        lines.append(textLine(
+                            data[start:start + lineBytes], width))
+
+                        if start + PREVIEW_MAX_SCAN < size:
+                            break
+
+                        end = size
+
+                    else:
+                        lines.append(textLine(
+                            data[start:min(end, start + lineBytes)], width))
+
+                    start = end + 1
+
+                return lines
+
+            # Last line end, if file ends with a line.
+            end = size - 1 if data[size - 1:size] == b"\n" else size
+
+            while end > 0 and len(lines) < height:
+
+                start = data.rfind(b"\n", max(0, end - PREVIEW_MAX_SCAN), end)
+
+                # Line too long to find its beginning, show its end.
+                if start == -1 and end > PREVIEW_MAX_SCAN:
+
+                    lines.append(textLine(data[end - lineBytes:end], width))
+
+                    break
+
+                lines.append(textLine(
+                    data[start + 1:min(end, start + 1 + lineBytes)], width))
+
+                end = start
+
+            lines.reverse()
+
+            return lines
+
+
+class PreviewPane(object):
+
+    """Previews a file in curses window `window`, see previewLines().
+
+    01) show() method previews the file at given path, or shows a message
+        if it can't be previewed.
+
+    02) The first column of window separates the pane from the list.
+
+    03) Previewing costs the same whatever the size of file, only the
+        bytes of the lines previewed are read.
+    """
+
+    def __init__(self, window):
+
+        self.window = window
+
+        # path of file previewed, None if none.
+        self.path = None
+
+    def show(self, path, message=None):
+
+        """Preview file at `path`, or show `message` if given"""
+
+        self.path = path
+
+        height, width = self.window.getmaxyx()
+
+        if message is None:
+
+            try:
+                lines = previewLines(path, height, width - 3)
+
+            except (OSError, ValueError) as error:
+                lines = [fitText(str(error), width - 3)]
+
+        else:
+            lines = [fitText(message, width - 3)]
+
+        self.window.erase()
+
+        for line in range(height):
+
+            try:
+                self.window.addstr(line, 0, u"|")
+
+                if line < len(lines):
+                    self.window.addstr(line, 2, lines[line])
+
+            # Window too narrow, e.g. while the terminal gets resized.
+            except curses.error:
+                pass
+
+        # Update physical screen once.
+        self.window.noutrefresh()
+        doupdate()
@@ -0,0 +1,357 @@
+# Copyright (c) 2015 ICRL
+# See the file LICENSE for copying permission.
+
+"""Contains Profiler class, timing dex's hot paths, and PROFILER, the
+profiler they report to. Importing it needs no curses, see
+overlay.ProfilerOverlay for showing what it recorded.
+
+Profiling is off unless enabled, e.g. by the profiler overlay's key or by
+the DEX_TRACE environment variable: naming a file, it enables profiling at
+start and a JSON trace gets written to it at exit."""
+
+import json
+import os
+
+from collections import deque
+from os import environ
+from threading import Lock, get_ident, local
+from time import perf_counter
+
+from constants import PROFILE_MAX_EVENTS, PROFILE_LATENCY_SAMPLES
+
+
+# Number of buckets of a Histogram, the last one holds anything longer.
+HISTOGRAM_BUCKETS = 32
+
+# path of JSON trace file written at exit, profiling from start if set.
+TRACE_FILE = environ.get("DEX_TRACE") or None
+
+
+class Histogram(object):
+
+    """Wall times, counted in buckets of powers of 2 microseconds: bucket
+    i holds times shorter than 2**i microseconds(and not shorter than
+    2**(i-1))"""
+
+    __slots__ = ("buckets", "count", "total", "maximum")
+
+    def __init__(self):
+
+        self.buckets = [0] * HISTOGRAM_BUCKETS
+
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def add(self, seconds):
+
+        """Count a time of `seconds`"""
+
+        bucket = min(int(seconds * 1e6).bit_length(), HISTOGRAM_BUCKETS - 1)
+
+        self.buckets[bucket] += 1
+
+        self.count += 1
+        self.total += seconds
+        self.maximum = max(self.maximum, seconds)
+
+    def percentile(self, fraction):
+
+        """Return upper bound(in seconds) of `fraction` percentile of times
+        counted, 0 if none"""
+
+        rank = fraction * self.count
+
+        for bucket, count in enumerate(self.buckets):
+
+            rank -= count
+
+            if rank <= 0 and count:
+                return min((1 << bucket) / 1e6, self.maximum)
+
+        return self.maximum
+
+    def toDict(self):
+
+        """Return histogram as a dict, e.g. to be dumped as JSON"""
+
+        return {"count": self.count, "total": self.total,
+                "max": self.maximum,
+                "p50": self.percentile(.5), "p99": self.percentile(.99),
+                # upper bound in microseconds -> count
+                "buckets": {str(1 << bucket): count for bucket, count
+                            in enumerate(self.buckets) if count}}
+
+
+class Operation(object):
+
+    """Breakdown of an operation profiled, e.g. a listing, by phase"""
+
+    __slots__ = ("name", "start", "elapsed", "phases")
+
+    def __init__(self, name, start):
+
+        self.name = name
+        self.start = start
+
+        # seconds taken, once ended.
+        self.elapsed = None
+
+        # phase name -> [seconds, system calls, calls], in order of first
+        # call.
+        self.phases = {}
+
+    def add(self, name, seconds, syscalls, calls):
+
+        """Account for `calls` calls of phase `name`"""
+
+        phase = self.phases.setdefault(name, [0.0, 0, 0])
+
+        phase[0] += seconds
+        phase[1] += syscalls
+        phase[2] += calls
+
+    def toDict(self):
+
+        return {"elapsed": self.elapsed,
+                "phases": [{"name": name, "seconds": seconds,
+                            "syscalls": syscalls, "calls": calls}
+                           for name, (seconds, syscalls, calls)
+                           in self.phases.items()]}
+
+
+class Profiler(object):
+
+    """Records wall times and system calls of dex's hot paths, while
+    `enabled`.
+
+    01) Hooks call start(), returning None while disabled, and skip
+        everything else if it did: disabled, profiling costs a call and a
+        test per hook. Loops timing each item check `enabled` once, and
+        only time items while it is set.
+
+    02) record() method counts time since start() in a Histogram named
+        after the hook, with the system calls made meanwhile, and traces
+        it. recordCalls() method counts times of many calls at once, e.g.
+        of each line prepared, without tracing them.
+
+    03) begin() and end() methods delimit an operation, e.g. a listing.
+        Times recorded as a `phase` by the same thread meanwhile make up
+        its breakdown. `operations` member holds the last Operation of
+        each name. Operations begun within another one add their phases
+        to the outer one's. end() is called in a finally clause, so that
+        an error does not leave later operations nested in a dead one.
+
+    04) keyPainted() method records the latency from keys typed to the
+        frame showing them, latency() method returns its percentiles.
+
+    05) dump() method writes a JSON trace file, in Trace Event Format(as
+        loaded by chrome://tracing or Perfetto), holding the last
+        PROFILE_MAX_EVENTS times traced, with histograms, system call
+        counts and operations as extra members.
+
+    06) Hooks may run in any thread, recording is guarded by a lock.
+    """
+
+    def __init__(self):
+
+        self.enabled = False
+
+        # name -> Histogram of times, and system calls made.
+        self.histograms = {}
+        self.syscalls = {}
+
+        # name -> last Operation of that name ended.
+        self.operations = {}
+
+        # latencies of keys painted, last ones in seconds and all of them.
+        self.latencies = deque(maxlen=PROFILE_LATENCY_SAMPLES)
+        self.keyToPaint = Histogram()
+
+        # trace events, last ones only.
+        self.events = deque(maxlen=PROFILE_MAX_EVENTS)
+
+        # perf_counter() traced times are relative to.
+        self.origin = perf_counter()
+
+        self.lock = Lock()
+
+        # Operation begun by each thread, and how deep begin() calls nest.
+        self.local = local()
+
+    def enable(self, enabled=True):
+
+        """Start(or stop) profiling"""
+
+        self.enabled = enabled
+
+    def start(self):
+
+        """Return perf_counter() to be passed to record(), None if
+        disabled"""
+
+        if self.enabled:
+            return perf_counter()
+
+        return None
+
+    def _count_(self, name, seconds, syscalls):
+
+        """Count a time of `seconds` in histogram `name`, lock held"""
+
+        try:
+            histogram = self.histograms[name]
+        except KeyError:
+            histogram = self.histograms[name] = Histogram()
+
+        histogram.add(seconds)
+
+        self.syscalls[name] = self.syscalls.get(name, 0) + syscalls
+
+    def record(self, name, start, syscalls=0, phase=False, elapsed=None):
+
+        """Record time since `start`(or `elapsed` seconds from it) of hook
+        `name`, which made `syscalls` system calls. If `phase`, it is a
+        phase of the operation begun by the current thread, if any."""
+
+        if elapsed is None:
+            elapsed = perf_counter() - start
+
+        if phase:
+            operation = getattr(self.local, "operation", None)
+
+            if operation is not None:
+                operation.add(name, elapsed, syscalls, 1)
+
+        with self.lock:
+
+            self._count_(name, elapsed, syscalls)
+
+            self.events.append((name, start, elapsed, get_ident(),
+                                syscalls))
+
+    def recordCalls(self, name, times, syscalls=0):
+
+        """Record `times`(in seconds) of calls of hook `name`, which made
+        `syscalls` system calls altogether. Calls are not traced."""
+
+        if not times:
+            return
+
+        with self.lock:
+
+            for seconds in times:
+                self._count_(name, seconds, 0)
+
+            self.syscalls[name] += syscalls
+
+    def begin(self, name, start=None):
+
+        """Begin operation `name` in current thread, at `start`(a
+        perf_counter() time, now if None). Return start to be passed to
+        end(), None if disabled."""
+
+        if not self.enabled:
+            return None
+
+        if start is None:
+            start = perf_counter()
+
+        state = self.local
+
+        # Within another operation.
+        if getattr(state, "depth", 0):
+            state.depth += 1
+            return start
+
+        state.depth = 1
+        state.operation = Operation(name, start)
+
+        return start
+
+    def end(self, name, start, syscalls=0):
+
+        """End operation `name` begun at `start`, which made `syscalls`
+        system calls besides its phases'"""
+
+        state = self.local
+
+        # Begun while disabled.
+        if not getattr(state, "depth", 0):
+            return
+
+        state.depth -= 1
+
+        # Within another operation, holding its phases.
+        if state.depth:
+            self.record(name, start, syscalls)
+            return
+
+        operation, state.operation = state.operation, None
+
+        self.record(name, start, syscalls)
+
+        operation.elapsed = perf_counter() - start
+
+        with self.lock:
+            self.operations[name] = operation
+
+    def keyPainted(self, typed):
+
+        """Record latency of keys typed at `typed`(a perf_counter() time),
+        now painted"""
+
+        latency = perf_counter() - typed
+
+        with self.lock:
+            self.latencies.append(latency)
+            self.keyToPaint.add(latency)
+
+    def latency(self, *fractions):
+
+        """Return percentiles(in seconds) of last key latencies, one per
+        fraction, None if no keys were painted yet"""
+
+        with self.lock:
+            latencies = sorted(self.latencies)
+
+        if not latencies:
+            return None
+
+        return [latencies[min(len(latencies) - 1,
+                              int(fraction * len(latencies)))]
+                for fraction in fractions]
+
+    def dump(self, path):
+
+        """Write JSON trace file at `path`"""
+
+        pid = os.getpid()
+
+        with self.lock:
+
+            trace = {
+                "traceEvents": [
+                    {"name": name, "cat": "dex", "ph": "X", "pid": pid,
+                     "tid": thread,
+                     "ts": (start - self.origin) * 1e6,
+                     "dur": elapsed * 1e6, "args": {"syscalls": syscalls}}
+                    for name, start, elapsed, thread, syscalls
+                    in self.events],
+                "displayTimeUnit": "ms",
+                "histograms": {name: histogram.toDict() for name, histogram
+                               in self.histograms.items()},
+                "syscalls": dict(self.syscalls),
+                "operations": {name: operation.toDict() for name, operation
+                               in self.operations.items()},
+                "keyToPaint": self.keyToPaint.toDict()}
+
+        with open(path, "w") as fileobj:
+            json.dump(trace, fileobj)
+
+
+# Profiler hot paths report to.
+PROFILER = Profiler()
+
+if TRACE_FILE is not None:
+    PROFILER.enable()
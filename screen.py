@@ -0,0 +1,281 @@
+# Copyright (c) 2015 ICRL
+# See the file LICENSE for copying permission.
+
+"""Contains Screen class, a headless stand-in for curses windows"""
+
+import os
+
+from collections import deque
+from threading import Condition
+from time import perf_counter
+
+
+class Screen(object):
+
+    """Headless, in-memory screen of `height` lines and `width` columns,
+    rendered on by Browser and main.main() instead of a curses window, e.g.
+    to measure rendering without a terminal.
+
+    01) Implements the subset of the curses window API dex uses: addstr(),
+        erase(), move(), clrtoeol(), scroll(), setscrreg(), getmaxyx(),
+        noutrefresh(), derwin(), getch() and options which do nothing
+        here(bkgd(), keypad(), nodelay(), scrollok(), idlok()).
+
+    02) `lines` member holds the text on screen, a string per line.
+        Attributes are not kept.
+
+    03) feed() method queues keys, which getch() method returns(-1 if
+        none, as in nodelay mode). Screen is readable while keys are
+        queued, see fileno(), so that main.main()'s EventLoop wakes up for
+        them.
+
+    04) `frames` member counts noutrefresh() calls and `writes` member
+        addstr() calls. waitPainted() method waits until keys got read and
+        screen was refreshed afterwards, and returns when. waitShown()
+        method waits until a refresh shows what is looked for.
+
+    05) derwin() method returns a Screen rendering on a part of this one,
+        sharing its lines and counters.
+    """
+
+    def __init__(self, height=24, width=80, parent=None, y=0, x=0):
+
+        self.height = height
+        self.width = width
+
+        # Screen this one is part of, at line `y` and column `x`.
+        self.parent = parent
+        self.y = y
+        self.x = x
+
+        # Screen holding lines and counters.
+        self.root = self if parent is None else parent.root
+
+        # scrolling region
+        self.top = 0
+        self.bottom = height - 1
+
+        # cursor
+        self.cursor = (0, 0)
+
+        if parent is not None:
+            return
+
+        self.lines = [" " * width for _ in range(height)]
+
+        self.frames = 0
+        self.writes = 0
+
+        # Keys queued, and number of keys read so far and when screen was
+        # refreshed after reading them last.
+        self.keys = deque()
+        self.keysRead = 0
+        self.keysPainted = 0
+        self.paintedAt = None
+
+        # guards keys and counters, notified on refresh.
+        self.painted = Condition()
+
+        # Readable while keys are queued.
+        self.keyRead, self.keyWrite = os.pipe()
+        os.set_blocking(self.keyRead, False)
+
+    def _put_(self, y, x, text):
+
+        """Write `text` at line `y` and column `x`, clipped to screen"""
+
+        if not 0 <= y < self.height or not 0 <= x < self.width:
+            return
+
+        text = text[:self.width - x]
+
+        y += self.y
+        x += self.x
+
+        line = self.root.lines[y]
+        self.root.lines[y] = line[:x] + text + line[x + len(text):]
+
+    def addstr(self, y, x, text, attr=0):
+
+        """Write `text` at line `y` and column `x`"""
+
+        self._put_(y, x, text)
+
+        self.cursor = (y, min(self.width - 1, x + len(text)))
+
+        self.root.writes += 1
+
+    def erase(self):
+
+        """Blank screen"""
+
+        for y in range(self.height):
+            self._put_(y, 0, " " * self.width)
+
+    def move(self, y, x):
+
+        """Move cursor to line `y` and column `x`"""
+
+        self.cursor = (y, x)
+
+    def clrtoeol(self):
+
+        """Blank line from cursor to its end"""
+
+        y, x = self.cursor
+
+        self._put_(y, x, " " * (self.width - x))
+
+    def setscrreg(self, top, bottom):
+
+        """Scroll lines `top` to `bottom` only"""
+
+        self.top = top
+        self.bottom = bottom
+
+    def scroll(self, lines=1):
+
+        """Scroll region upward by `lines`, downward if negative"""
+
+        region = [self.root.lines[self.y + y][self.x:self.x + self.width]
+                  for y in range(self.top, self.bottom + 1)]
+
+        blank = [" " * self.width] * min(abs(lines), len(region))
+
+        if lines > 0:
+            region = region[lines:] + blank
+        else:
+            region = blank + region[:len(region) + lines]
+
+        for y, line in enumerate(region, self.top):
+            self._put_(y, 0, line)
+
+    def getmaxyx(self):
+
+        return (self.height, self.width)
+
+    def derwin(self, height, width, y, x):
+
+        """Return Screen rendering on `height` lines and `width` columns of
+        this one, from line `y` and column `x`"""
+
+        return Screen(height, width, self, self.y + y, self.x + x)
+
+    def noutrefresh(self):
+
+        """Count a frame, keys read so far are painted"""
+
+        root = self.root
+
+        with root.painted:
+
+            root.frames += 1
+
+            root.keysPainted = root.keysRead
+            root.paintedAt = perf_counter()
+
+            root.painted.notify_all()
+
+    refresh = noutrefresh
+
+    def bkgd(self, *args):
+        pass
+
+    def keypad(self, flag):
+        pass
+
+    def nodelay(self, flag):
+        pass
+
+    def scrollok(self, flag):
+        pass
+
+    def idlok(self, flag):
+        pass
+
+    def feed(self, keys):
+
+        """Queue `keys`, key codes as returned by getch()"""
+
+        root = self.root
+
+        with root.painted:
+
+            root.keys.extend(keys)
+
+            os.write(root.keyWrite, b"\0" * len(keys))
+
+    def getch(self):
+
+        """Return next key queued, -1 if none"""
+
+        root = self.root
+
+        with root.painted:
+
+            if not root.keys:
+
+                # Not readable any more.
+                try:
+                    while os.read(root.keyRead, 4096):
+                        pass
+                except BlockingIOError:
+                    pass
+
+                return -1
+
+            root.keysRead += 1
+
+            return root.keys.popleft()
+
+    def fileno(self):
+
+        """Return file descriptor readable while keys are queued"""
+
+        return self.root.keyRead
+
+    def waitPainted(self, keys, timeout):
+
+        """Wait until `keys` keys got read and screen got refreshed, at most
+        `timeout` seconds. Return perf_counter() when refreshed, None if
+        not refreshed in time."""
+
+        root = self.root
+
+        with root.painted:
+
+            if root.painted.wait_for(lambda: root.keysPainted >= keys,
+                                     timeout):
+                return root.paintedAt
+
+        return None
+
+    def waitShown(self, predicate, timeout):
+
+        """Wait until screen got refreshed showing what `predicate`(called
+        without arguments, e.g. checking `lines`) looks for, at most
+        `timeout` seconds. Return perf_counter() when refreshed, None if
+        not shown in time."""
+
+        root = self.root
+
+        with root.painted:
+
+            if root.painted.wait_for(
+                    lambda: root.paintedAt is not None and predicate(),
+                    timeout):
+                return root.paintedAt
+
+        return None
+
+    def close(self):
+
+        """Close keyboard pipe"""
+
+        os.close(self.root.keyRead)
+        os.close(self.root.keyWrite)
+
+    def __str__(self):
+
+        return "\n".join(line.rstrip() for line in
+                         self.root.lines[self.y:self.y + self.height])
@@ -0,0 +1,214 @@
+# Copyright (c) 2015 ICRL
+# See the file LICENSE for copying permission.
+
+"""Contains Searcher class"""
+
+from os.path import join, relpath
+from queue import Queue, Empty
+from threading import Event, Thread
+from time import monotonic
+
+from constants import SEARCH_CHUNK, SEARCH_FILES_PER_TASK
+from dtypes import Content
+from searchtasks import grepFiles, walkDirectory
+
+
+# ways contents are searched: names matching a glob, or files containing a
+# string.
+SEARCH_MODES = ('name', 'content')
+
+
+class Searcher(Thread):
+
+    """Searches directory tree at `root` in background, in a pool of
+    `workers` processes, streaming hits as batches of Content-objects.
+
+    01) In 'name' mode, contents whose name matches glob `query`(case
+        insensitively) are hits. In 'content' mode, files containing
+        `query` are, see searchtasks.fileContains(). Mountpoints and links
+        are not followed.
+
+    02) Each directory is listed by a worker process, which also matches
+        names. Files are searched by worker processes too, in tasks of
+        SEARCH_FILES_PER_TASK files. Worker processes are forked by a fork
+        server running searchtasks module only, never from dex's threads.
+
+    03) Contents are named by their path relative to `root`. Each batch is
+        sorted by `key`, as StreamLoader's. batches() method returns the
+        batches received so far, without blocking.
+
+    04) `count` member holds the number of hits received so far, `dirs`
+        member the number of directories searched and `done` member
+        becomes True once searching ended(`error` member holds the
+        exception which ended it, if any).
+
+    05) cancel() method stops searching as soon as possible. Directories
+        and files already being searched by worker processes are still
+        searched, but their hits dropped.
+
+    06) `notify`, if given, gets called from the searching thread whenever
+        hits are found(at least every 0.1 seconds while searching) or
+        searching ended.
+    """
+
+    def __init__(self, root, mode, query, key, workers, notify=None):
+
+        Thread.__init__(self)
+
+        # Do not keep the program alive.
+        self.daemon = True
+
+        self.root = root
+        self.mode = mode
+        self.query = query
+        self.key = key
+        self.workers = workers
+        self.notify = notify
+
+        # batches of hits, None marks the end of searching.
+        self.queue = Queue()
+
+        self.cancelled = Event()
+
+        self.count = 0
+        self.dirs = 0
+        self.done = False
+        self.error = None
+
+    def run(self):
+
+        """Search directory tree, walking it in worker processes"""
+
+        # Imported once searching, multiprocessing takes long to import
+        # and would slow dex's startup down.
+        from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor
+        from concurrent.futures import wait
+        from concurrent.futures.process import BrokenProcessPool
+        from multiprocessing import get_context
+
+        if self.mode == 'name':
+            pattern, needle = self.query.casefold(), None
+        else:
+            pattern, needle = None, self.query.encode('utf-8')
+
+        # Forking this process, whose threads may hold locks, could
+        # deadlock workers: they get forked from a fork server instead,
+        # which only imported their tasks.
+        context = get_context("forkserver")
+        context.set_forkserver_preload(["searchtasks"])
+
+        pool = ProcessPoolExecutor(self.workers, mp_context=context)
+
+        try:
+            # future -> path of directory walked, None if files searched.
+            pending = {pool.submit(walkDirectory, self.root, pattern):
+                       self.root}
+
+            # When notified last.
+            notified = monotonic()
+
+            while pending and not self.cancelled.is_set():
+
+                # Check for cancellation every once in a while.
+                done, _ = wait(pending, timeout=0.1,
+                               return_when=FIRST_COMPLETED)
+
+                # (type, path) pairs of hits.
+                hits = []
+
+                for future in done:
+
+                    path = pending.pop(future)
+
+                    try:
+                        result = future.result()
+
+                    # Unreadable or gone.
+                    except (OSError, ValueError):
+                        continue
+
+                    # Files searched.
+                    if path is None:
+                        hits.extend(('file', hit) for hit in result)
+                        continue
+
+                    self.dirs += 1
+
+                    names, dirs, files = result
+
+                    hits.extend((type, join(path, name))
+                                for type, name in names)
+
+                    for dirPath in dirs:
+                        pending[pool.submit(walkDirectory, dirPath,
+                                            pattern)] = dirPath
+
+                    for start in range(0, len(files), SEARCH_FILES_PER_TASK):
+                        pending[pool.submit(
+                            grepFiles,
+                            files[start:start + SEARCH_FILES_PER_TASK],
+                            needle, SEARCH_CHUNK)] = None
+
+                if hits and not self.cancelled.is_set():
+
+                    batch = [Content(relpath(hit, self.root), type)
+                             for type, hit in hits]
+                    batch.sort(key=self.key)
+
+                    self._put_(batch)
+
+                    notified = monotonic()
+
+                # Report progress every once in a while, even without hits.
+                elif (self.notify is not None and
+                      monotonic() - notified >= 0.1):
+
+                    self.notify()
+
+                    notified = monotonic()
+
+        except BrokenProcessPool as error:
+            self.error = error
+
+        finally:
+
+            # Do not wait for tasks being run.
+            pool.shutdown(wait=False, cancel_futures=True)
+
+            self._put_(None)
+
+    def _put_(self, batch):
+
+        """Hand `batch` over, and notify about it"""
+
+        self.queue.put(batch)
+
+        if self.notify is not None:
+            self.notify()
+
+    def batches(self):
+
+        """Return list of batches received since last call"""
+
+        batches = []
+
+        while not self.done:
+
+            try:
+                batch = self.queue.get_nowait()
+            except Empty:
+                break
+
+            if batch is None:
+                self.done = True
+            else:
+                self.count += len(batch)
+                batches.append(batch)
+
+        return batches
+
+    def cancel(self):
+
+        """Stop searching"""
+
+        self.cancelled.set()
@@ -0,0 +1,112 @@
+# Copyright (c) 2015 ICRL
+# See the file LICENSE for copying permission.
+
+"""Contains tasks run by Searcher's worker processes.
+
+Worker processes are started by a fork server, not forked from dex's
+threads: this module imports the standard library only, so that they
+start without importing curses or anything dex sets up."""
+
+import mmap
+
+from fnmatch import fnmatchcase
+from os import fstat, scandir, stat
+
+
+def fileContains(path, needle, chunk):
+
+    """Return whether file at `path` contains `needle`(bytes). File is
+    mapped in memory and scanned `chunk` bytes at a time."""
+
+    with open(path, 'rb') as fileobj:
+
+        size = fstat(fileobj.fileno()).st_size
+
+        # Also, empty files can't be mapped.
+        if size < len(needle):
+            return False
+
+        with mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ) as data:
+
+            # Read ahead aggressively.
+            if hasattr(data, "madvise"):
+                data.madvise(mmap.MADV_SEQUENTIAL)
+
+            for start in range(0, size, chunk):
+
+                # Chunks overlap, not to miss needles across them.
+                end = min(size, start + chunk + len(needle) - 1)
+
+                if data.find(needle, start, end) != -1:
+                    return True
+
+    return False
+
+
+def walkDirectory(path, pattern):
+
+    """List directory at `path`, return (hits, dirs, files): (type, name)
+    pairs of contents whose casefolded name matches glob `pattern`(type
+    being 'dir' or 'file', as for Contents), paths of directories to be
+    walked and paths of files to be searched if `pattern` is None.
+
+    Entries are classified as tools.scanLocals does without following
+    links: mountpoints are directories, but not walked."""
+
+    hits = []
+    dirs = []
+    files = []
+
+    device = stat(path).st_dev
+
+    with scandir(path) as entries:
+
+        for entry in entries:
+
+            if entry.is_dir(follow_symlinks=False):
+
+                contentType = 'dir'
+
+                try:
+                    st = entry.stat(follow_symlinks=False)
+
+                # Removed meanwhile.
+                except OSError:
+                    continue
+
+                # Mountpoints and links are not followed.
+                if st.st_dev == device:
+                    dirs.append(entry.path)
+
+            else:
+
+                contentType = 'file'
+
+                if pattern is None and entry.is_file(follow_symlinks=False):
+                    files.append(entry.path)
+
+            if (pattern is not None and
+                    fnmatchcase(entry.name.casefold(), pattern)):
+                hits.append((contentType, entry.name))
+
+    return hits, dirs, files
+
+
+def grepFiles(paths, needle, chunk):
+
+    """Return paths of files among `paths` containing `needle`, see
+    fileContains()"""
+
+    hits = []
+
+    for path in paths:
+
+        try:
+            if fileContains(path, needle, chunk):
+                hits.append(path)
+
+        # Unreadable or gone.
+        except (OSError, ValueError):
+            pass
+
+    return hits
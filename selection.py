@@ -0,0 +1,279 @@
+# Copyright (c) 2015 ICRL
+# See the file LICENSE for copying permission.
+
+"""Contains Selection class, a bitset of contents marked"""
+
+import re
+
+from bisect import bisect_left
+
+
+# Inverts each bit of a byte, see Selection.invert().
+INVERT = bytes(255 - byte for byte in range(256))
+
+# Bytes with some bits set, see Selection.indexes().
+NONZERO = re.compile(b"[^\x00]")
+
+
+class Selection(object):
+
+    """Compact set of indexes of `size` contents, one bit per content.
+
+    01) `bits` member holds a bit per content, in a bytearray: bit i % 8 of
+        byte i // 8 is set if content at index i is in the set.
+
+    02) get(), toggle() and set() methods cost O(1). `count` member holds
+        the number of indexes in the set, kept up to date.
+
+    03) setAll(), clear(), invert() and setRange() methods work on whole
+        bytes at once, within Python's C code, so that they cost little
+        even for millions of contents.
+
+    04) indexes() method returns the indexes in the set, in ascending
+        order, skipping bytes without bits set at C speed.
+
+    05) insert() and delete() methods follow contents inserted and removed:
+        bits past them get shifted, as a whole within Python's C code,
+        costing O(size / 64) per content whatever the number of indexes in
+        the set. Many contents at once move indexes in the set instead, at
+        O(count) altogether. Both cost O(1) while the set is empty.
+    """
+
+    def __init__(self, size=0):
+
+        self.size = size
+
+        self.bits = bytearray((size + 7) // 8)
+
+        # Number of bits set.
+        self.count = 0
+
+    def __len__(self):
+
+        return self.count
+
+    def get(self, index):
+
+        """Return whether `index` is in the set"""
+
+        return bool(self.bits[index >> 3] & (1 << (index & 7)))
+
+    def set(self, index, value=True):
+
+        """Add `index` to the set, remove it if not `value`"""
+
+        if self.get(index) != value:
+            self.toggle(index)
+
+    def toggle(self, index):
+
+        """Add `index` to the set, or remove it if in it"""
+
+        if not 0 <= index < self.size:
+            raise IndexError("selection index out of range")
+
+        bit = 1 << (index & 7)
+
+        self.bits[index >> 3] ^= bit
+
+        self.count += 1 if self.bits[index >> 3] & bit else -1
+
+    def _trim_(self):
+
+        """Clear bits past `size` in last byte, and count bits set"""
+
+        if self.size & 7:
+            self.bits[-1] &= (1 << (self.size & 7)) - 1
+
+        self.count = int.from_bytes(self.bits, 'little').bit_count()
+
+    def setAll(self):
+
+        """Add all indexes to the set"""
+
+        self.bits[:] = b"\xff" * len(self.bits)
+
+        self._trim_()
+
+    def clear(self):
+
+        """Remove all indexes from the set"""
+
+        self.bits[:] = bytes(len(self.bits))
+
+        self.count = 0
+
+    def invert(self):
+
+        """Add indexes not in the set, remove the others"""
+
+        self.bits[:] = self.bits.translate(INVERT)
+
+        self._trim_()
+
+    def setRange(self, start, end, value=True):
+
+        """Add indexes from `start` to `end`(excluded) to the set, remove
+        them if not `value`"""
+
+        start = max(0, start)
+        end = min(self.size, end)
+
+        if start >= end:
+            return
+
+        # Bits of whole bytes in between are assigned at once.
+        first = (start + 7) >> 3
+        last = end >> 3
+
+        if first < last:
+            self.bits[first:last] = (b"\xff" if value else b"\x00") * (
+                last - first)
+
+        # Remaining bits at both ends, if any.
+        for index in range(start, min(end, first << 3)):
+            self._assign_(index, value)
+
+        for index in range(max(start, last << 3, first << 3), end):
+            self._assign_(index, value)
+
+        self.count = int.from_bytes(self.bits, 'little').bit_count()
+
+    def _assign_(self, index, value):
+
+        """Set bit of `index` to `value`, leaving `count` as it is"""
+
+        if value:
+            self.bits[index >> 3] |= 1 << (index & 7)
+        else:
+            self.bits[index >> 3] &= ~(1 << (index & 7)) & 0xff
+
+    def setIndexes(self, indexes, value=True):
+
+        """Add `indexes`(an iterable) to the set, remove them if not
+        `value`"""
+
+        for index in indexes:
+            self._assign_(index, value)
+
+        self.count = int.from_bytes(self.bits, 'little').bit_count()
+
+    def indexes(self):
+
+        """Return list of indexes in the set, in ascending order"""
+
+        indexes = []
+
+        bits = self.bits
+
+        for match in NONZERO.finditer(bits):
+
+            start = match.start()
+            byte = bits[start]
+
+            indexes.extend((start << 3) + bit for bit in range(8)
+                           if byte & (1 << bit))
+
+        return indexes
+
+    def _resize_(self, size, bits=0):
+
+        """Make set hold `size` contents, bits of `bits`(an int, bit i set
+        if index i is in the set)"""
+
+        self.size = size
+
+        self.bits = bytearray(bits.to_bytes((size + 7) // 8, 'little'))
+
+        self.count = bits.bit_count()
+
+    def _shifts_(self, indexes):
+
+        """Return whether following contents inserted or removed at
+        `indexes` costs less by shifting bits past each of them than by
+        moving indexes in the set one by one"""
+
+        # Shifting costs about a nanosecond per 9000 bits, moving an
+        # index about 0.7 microseconds.
+        return len(indexes) * self.size < 6000 * self.count
+
+    def insert(self, indexes):
+
+        """Make room for contents inserted at `indexes`(ascending indexes
+        once inserted), not in the set"""
+
+        if not indexes:
+            return
+
+        size = self.size + len(indexes)
+
+        # Nothing to shift.
+        if not self.count:
+            self._resize_(size)
+            return
+
+        if not self._shifts_(indexes):
+
+            # Number of contents inserted before each index in the set.
+            moved = []
+            inserted = 0
+
+            for index in self.indexes():
+
+                while (inserted < len(indexes) and
+                       indexes[inserted] <= index + inserted):
+                    inserted += 1
+
+                moved.append(index + inserted)
+
+            self._resize_(size)
+            self.setIndexes(moved)
+
+            return
+
+        bits = int.from_bytes(self.bits, 'little')
+
+        for index in indexes:
+
+            # Bits from `index` on move up by one.
+            low = bits & ((1 << index) - 1)
+            bits = ((bits >> index) << (index + 1)) | low
+
+        self._resize_(size, bits)
+
+    def delete(self, indexes):
+
+        """Remove contents at `indexes`(ascending indexes before removal)"""
+
+        if not indexes:
+            return
+
+        size = self.size - len(indexes)
+
+        # Nothing to shift.
+        if not self.count:
+            self._resize_(size)
+            return
+
+        if not self._shifts_(indexes):
+
+            removed = set(indexes)
+
+            moved = [index - bisect_left(indexes, index)
+                     for index in self.indexes() if index not in removed]
+
+            self._resize_(size)
+            self.setIndexes(moved)
+
+            return
+
+        bits = int.from_bytes(self.bits, 'little')
+
+        # Last ones first, indexes before them stay valid.
+        for index in reversed(indexes):
+
+            # Bits past `index` move down by one.
+            low = bits & ((1 << index) - 1)
+            bits = ((bits >> (index + 1)) << index) | low
+
+        self._resize_(size, bits)
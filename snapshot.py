@@ -0,0 +1,206 @@
+# Copyright (c) 2015 ICRL
+# See the file LICENSE for copying permission.
+
+"""Contains SnapshotStore class, saving views of directories to be painted
+right away at next start"""
+
+import json
+import os
+import sys
+
+from os import environ
+from os.path import expanduser, join
+from zlib import adler32, crc32
+
+from constants import SNAPSHOT_MAX_ENTRIES
+from dtypes import ContentStore
+from sorting import SortKeys
+
+
+# Version of snapshot files, others are ignored.
+SNAPSHOT_VERSION = 1
+
+
+def snapshotsPath():
+
+    """Return path of the snapshots' directory, under the user's cache
+    directory"""
+
+    cacheDir = environ.get("XDG_CACHE_HOME") or expanduser("~/.cache")
+
+    return join(cacheDir, "dex", "snapshots")
+
+
+class Snapshot(object):
+
+    """View of a directory, as saved by SnapshotStore"""
+
+    __slots__ = ("path", "stamp", "contents", "selectIndex", "scrollIndex",
+                 "complete")
+
+    def __init__(self, path, pathStamp, contents, selectIndex, scrollIndex,
+                 complete):
+
+        self.path = path
+
+        # cache.stamp() of directory when listed.
+        self.stamp = pathStamp
+
+        # ContentStore of contents saved, sorted by their sortKeys.
+        self.contents = contents
+
+        # Selection and scrolling, within contents saved.
+        self.selectIndex = selectIndex
+        self.scrollIndex = scrollIndex
+
+        # Whether all contents got saved, rather than those around the
+        # selection only.
+        self.complete = complete
+
+
+class SnapshotStore(object):
+
+    """Saves views of directories to files in directory at `path`
+    (snapshotsPath() if None), a file per directory.
+
+    01) save() method saves a directory's contents, their sort order, and
+        the selection and scrolling. Contents are saved as their
+        ContentStore holds them: names in a single buffer and arrays, so
+        that loading them costs reading a file, whatever their number.
+
+    02) Directories with more than SNAPSHOT_MAX_ENTRIES contents get
+        SNAPSHOT_MAX_ENTRIES contents around the selection saved only.
+
+    03) load() method returns the Snapshot of a directory, None if there is
+        none or it can't be read. It is not checked against the directory,
+        compare its `stamp` with cache.stamp() of the directory.
+
+    04) Files are replaced atomically, a dex quitting never leaves a
+        partial snapshot behind.
+    """
+
+    def __init__(self, path=None):
+
+        if path is None:
+            path = snapshotsPath()
+
+        self.path = path
+
+    def _file_(self, path):
+
+        """Return path of snapshot file of directory at `path`"""
+
+        path = path.encode('utf-8', 'surrogateescape')
+
+        # Cheaper to import than hashlib. Files hold their directory's
+        # path, directories with the same checksums can't be mistaken.
+        return join(self.path, "%08x%08x" % (crc32(path), adler32(path)))
+
+    def load(self, path):
+
+        """Return Snapshot of directory at `path`(an absolute path), None if
+        there is none"""
+
+        try:
+            with open(self._file_(path), 'rb') as fileobj:
+                header = json.loads(fileobj.readline())
+                data = fileobj.read()
+
+            # Another directory with the same hash, or another format.
+            if (header["version"] != SNAPSHOT_VERSION or
+                    header["path"] != path or
+                    header["byteorder"] != sys.byteorder):
+                return None
+
+            contents = ContentStore()
+
+            # Buffer, then starts, lengths and types arrays.
+            sizes = [header["buffer"]] + [
+                header["count"] * array.itemsize for array in (
+                    contents.starts, contents.lengths, contents.types)]
+
+            if sum(sizes) != len(data):
+                return None
+
+            view = memoryview(data)
+
+            contents.buffer = bytearray(view[:sizes[0]])
+            offset = sizes[0]
+
+            for array, size in zip((contents.starts, contents.lengths,
+                                    contents.types), sizes[1:]):
+                array.frombytes(view[offset:offset + size])
+                offset += size
+
+            contents.sortKeys = SortKeys(path, header["order"])
+
+            return Snapshot(path, tuple(header["stamp"]), contents,
+                            header["selectIndex"], header["scrollIndex"],
+                            header["complete"])
+
+        # Missing, unreadable or corrupted.
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, path, pathStamp, contents, selectIndex, scrollIndex):
+
+        """Save `contents`(a ContentStore with sortKeys) of directory at
+        `path`(an absolute path) listed at `pathStamp`, with selection and
+        scrolling. Return whether saved."""
+
+        complete = len(contents) <= SNAPSHOT_MAX_ENTRIES
+
+        order = contents.sortKeys.order
+
+        # Contents around selection, as many before as after it.
+        start = 0
+
+        if not complete:
+
+            start = max(0, min(len(contents) - SNAPSHOT_MAX_ENTRIES,
+                               selectIndex - 1 - SNAPSHOT_MAX_ENTRIES // 2))
+
+            contents = ContentStore(contents[start:
+                                             start + SNAPSHOT_MAX_ENTRIES])
+
+        # Names of contents deleted are not saved.
+        elif contents.garbage:
+            contents = ContentStore(contents)
+
+        header = {"version": SNAPSHOT_VERSION, "path": path,
+                  "stamp": list(pathStamp),
+                  "order": order,
+                  "selectIndex": max(1, selectIndex - start),
+                  "scrollIndex": max(0, scrollIndex - start),
+                  "complete": complete, "count": len(contents),
+                  "buffer": len(contents.buffer),
+                  "byteorder": sys.byteorder}
+
+        target = self._file_(path)
+        temporary = "%s.%d" % (target, os.getpid())
+
+        try:
+            os.makedirs(self.path, exist_ok=True)
+
+            with open(temporary, 'wb') as fileobj:
+
+                fileobj.write(json.dumps(header).encode('utf-8') + b"\n")
+                fileobj.write(contents.buffer)
+
+                for array in (contents.starts, contents.lengths,
+                              contents.types):
+                    fileobj.write(array.tobytes())
+
+            os.replace(temporary, target)
+
+        except OSError:
+
+            # Partially written, if at all.
+            try:
+                os.unlink(temporary)
+            except OSError:
+                pass
+
+            return False
+
+        return True
@@ -0,0 +1,159 @@
+# Copyright (c) 2015 ICRL
+# See the file LICENSE for copying permission.
+
+"""Contains SortKeys class, sorting contents of a directory in one of
+several orders"""
+
+import re
+
+from os import lstat
+from os.path import join, splitext
+
+from constants import METADATA_ORDERS, PRINT_ORDER, SORT_ORDERS
+
+
+# Splits a name into text and numbers, numbers at odd indexes.
+NUMBERS = re.compile(r"(\d+)")
+
+
+def naturalKey(name):
+
+    """Return key ordering names as humans do: case insensitive, numbers
+    by their value(e.g. "file2" before "file10")"""
+
+    parts = NUMBERS.split(name.casefold())
+
+    # Numbers and texts alternate, compared with their likes only.
+    parts[1::2] = [int(number) for number in parts[1::2]]
+
+    return tuple(parts)
+
+
+class SortKeys(object):
+
+    """Sort keys of the contents of directory at `path`.
+
+    01) key() method returns the sort key of a Content in current `order`,
+        one of SORT_ORDERS. Contents are ordered by type first, as in
+        PRINT_ORDER, then by order, then by name.
+
+    02) A key is computed once per content, and cached for current order
+        ("name" order keys cost nothing to compute and are not cached).
+        Orders needing file metadata("size", "mtime") lstat() each content
+        once, those results are cached for all orders: switching order with
+        setOrder() never stats a content again.
+
+    03) `stats` member counts lstat() calls made.
+    """
+
+    def __init__(self, path, order=SORT_ORDERS[0]):
+
+        self.path = path
+        self.order = order
+
+        # (type, name) -> key in current order
+        self.keys = {}
+
+        # name -> lstat() result, None if it failed.
+        self.statResults = {}
+
+        self.stats = 0
+
+    def setOrder(self, order):
+
+        """Sort by `order` from now on"""
+
+        if order != self.order:
+            self.keys = {}
+
+        self.order = order
+
+    def _stat_(self, name):
+
+        """Return cached lstat() result of content named `name`"""
+
+        try:
+            return self.statResults[name]
+        except KeyError:
+            pass
+
+        self.stats += 1
+
+        try:
+            result = lstat(join(self.path, name))
+        except OSError:
+            result = None
+
+        self.statResults[name] = result
+
+        return result
+
+    def _orderKey_(self, name):
+
+        """Return key of content named `name` in current order"""
+
+        order = self.order
+
+        if order == 'casefold':
+            return name.casefold()
+
+        if order == 'natural':
+            return naturalKey(name)
+
+        if order == 'extension':
+            return (splitext(name)[1].casefold(), name.casefold())
+
+        if order in METADATA_ORDERS:
+
+            result = self._stat_(name)
+
+            # Contents which vanished come last.
+            if result is None:
+                return (1, 0)
+
+            # Biggest and newest first, as ls does.
+            if order == 'size':
+                return (0, -result.st_size)
+
+            return (0, -result.st_mtime_ns)
+
+    def nameKey(self, type, name):
+
+        """Return sort key of a content of type `type` named `name`"""
+
+        # Ordered by name only.
+        if self.order == SORT_ORDERS[0]:
+            return (PRINT_ORDER.index(type), '', name)
+
+        try:
+            return self.keys[type, name]
+
+        except KeyError:
+
+            key = (PRINT_ORDER.index(type), self._orderKey_(name), name)
+
+            self.keys[type, name] = key
+
+            return key
+
+    def forget(self, type, name):
+
+        """Forget cached key and lstat() result of a content of type `type`
+        named `name`, e.g. because it got deleted"""
+
+        self.keys.pop((type, name), None)
+        self.statResults.pop(name, None)
+
+    def forgetMetadata(self, name):
+
+        """Forget cached lstat() result of content named `name`, e.g.
+        because it got modified. Its key stays, unless in one of
+        METADATA_ORDERS(see forget())."""
+
+        self.statResults.pop(name, None)
+
+    def key(self, content):
+
+        """Return sort key of `content`"""
+
+        return self.nameKey(content.type, content.name)
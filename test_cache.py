@@ -0,0 +1,116 @@
+# Copyright (c) 2015 ICRL
+# See the file LICENSE for copying permission.
+
+"""Tests of ListingCache"""
+
+import os
+import unittest
+
+from os.path import join
+from tempfile import TemporaryDirectory
+
+from cache import ListingCache, stamp
+from dtypes import Content, ContentStore
+
+
+class ListingCacheTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmp = TemporaryDirectory()
+        self.path = self.tmp.name
+
+        self.cache = ListingCache(2, 1024 * 1024)
+
+        self.contents = ContentStore([Content("a", "file")])
+
+    def tearDown(self):
+
+        self.tmp.cleanup()
+
+    def touch(self, name):
+
+        """Create an entry named `name`, changing the directory's stamp"""
+
+        open(join(self.path, name), "w").close()
+
+        # Stamps are compared by nanoseconds, which may not have changed.
+        st = os.stat(self.path)
+        os.utime(self.path, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+
+    def test_hit(self):
+
+        """A listing is returned while its directory's stamp stays the
+        same"""
+
+        self.cache.put(self.path, self.contents, stamp(self.path))
+
+        self.assertIs(self.cache.get(self.path), self.contents)
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_stale(self):
+
+        """A listing of a directory changed since is dropped"""
+
+        self.cache.put(self.path, self.contents, stamp(self.path))
+
+        self.touch("b")
+
+        self.assertIsNone(self.cache.get(self.path))
+        self.assertEqual(self.cache.invalidations, 1)
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    def test_restamp(self):
+
+        """A listing updated in place is valid for the new stamp"""
+
+        self.cache.put(self.path, self.contents, stamp(self.path))
+
+        self.touch("b")
+        self.contents.append("b", "file")
+
+        self.cache.restamp(self.path, self.contents, stamp(self.path))
+
+        self.assertIs(self.cache.get(self.path), self.contents)
+
+        # Only the listing cached gets restamped.
+        self.touch("c")
+        self.cache.restamp(self.path, ContentStore(), stamp(self.path))
+
+        self.assertIsNone(self.cache.get(self.path))
+
+    def test_evict(self):
+
+        """Least recently used listings are evicted first"""
+
+        paths = [join(self.path, name) for name in "xyz"]
+
+        for path in paths:
+            os.mkdir(path)
+
+        self.cache.put(paths[0], ContentStore(), stamp(paths[0]))
+        self.cache.put(paths[1], ContentStore(), stamp(paths[1]))
+
+        self.cache.get(paths[0])
+
+        self.cache.put(paths[2], ContentStore(), stamp(paths[2]))
+
+        self.assertIsNone(self.cache.get(paths[1]))
+        self.assertIsNotNone(self.cache.get(paths[0]))
+        self.assertEqual(self.cache.evictions, 1)
+
+    def test_bytes(self):
+
+        """Memory used is accounted for, and released"""
+
+        self.cache.put(self.path, self.contents, stamp(self.path))
+
+        self.assertGreater(self.cache.bytes, 0)
+
+        self.cache.discard(self.path)
+
+        self.assertEqual(self.cache.bytes, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
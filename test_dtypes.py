@@ -0,0 +1,125 @@
+# Copyright (c) 2015 ICRL
+# See the file LICENSE for copying permission.
+
+"""Tests of ContentStore and mergeContents()"""
+
+import unittest
+
+from dtypes import Content, ContentStore, mergeContents
+
+
+def listed(contents):
+
+    """Return (name, type) pairs of `contents`"""
+
+    return [(content.name, content.type) for content in contents]
+
+
+class ContentStoreTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.store = ContentStore([Content("a", "dir"), Content("b", "file"),
+                                   Content("c", "file")])
+
+    def test_insert(self):
+
+        """Contents are inserted before an index, as in lists"""
+
+        self.store.insert(0, Content("é", "file"))
+        self.store.insert(2, Content("x", "dir"))
+        self.store.insert(len(self.store), Content("z", "file"))
+
+        self.assertEqual(listed(self.store),
+                         [("é", "file"), ("a", "dir"), ("x", "dir"),
+                          ("b", "file"), ("c", "file"), ("z", "file")])
+
+    def test_delete(self):
+
+        """Contents are deleted by index or by slice"""
+
+        del self.store[1]
+
+        self.assertEqual(listed(self.store), [("a", "dir"), ("c", "file")])
+
+        self.store.append("d", "file")
+
+        del self.store[:2]
+
+        self.assertEqual(listed(self.store), [("d", "file")])
+
+    def test_compact(self):
+
+        """Names of deleted contents are reclaimed, others stay"""
+
+        for index in range(100):
+            self.store.append("name%d" % index, "file")
+
+        del self.store[1:90]
+
+        # Compacted once mostly unused.
+        self.assertEqual(self.store.garbage, 0)
+        self.assertEqual(len(self.store.buffer),
+                         sum(self.store.lengths))
+
+        self.assertEqual([self.store.name(index) for index in range(3)],
+                         ["a", "name87", "name88"])
+
+    def test_undecodable_names(self):
+
+        """Names with lone surrogates are stored as they were listed"""
+
+        name = b"\xff".decode("utf-8", "surrogateescape")
+
+        self.store.insert(0, Content(name, "file"))
+
+        self.assertEqual(self.store[0].name, name)
+
+    def test_adopt(self):
+
+        """Contents of another store are taken over"""
+
+        other = ContentStore([Content("x", "file")])
+
+        self.store.adopt(other)
+
+        self.assertEqual(listed(self.store), [("x", "file")])
+
+
+class MergeContentsTest(unittest.TestCase):
+
+    def test_merge(self):
+
+        """Sorted contents and batch are merged, indexes of batch's contents
+        are returned"""
+
+        contents = ContentStore([Content(name, "file")
+                                 for name in ("b", "d", "f")])
+        batch = [Content(name, "file") for name in ("a", "c", "g")]
+
+        store, indexes = mergeContents(contents, batch,
+                                       lambda content: content.name)
+
+        self.assertEqual([content.name for content in store],
+                         ["a", "b", "c", "d", "f", "g"])
+        self.assertEqual(indexes, [0, 2, 5])
+
+        # Merged into a store of their own.
+        self.assertEqual(len(contents), 3)
+
+    def test_equal_names(self):
+
+        """Contents of batch equal to others are told apart"""
+
+        contents = [Content("a", "file")]
+        batch = [Content("a", "file")]
+
+        store, indexes = mergeContents(contents, batch,
+                                       lambda content: content.name)
+
+        self.assertEqual(len(store), 2)
+        self.assertEqual(len(indexes), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
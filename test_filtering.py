@@ -0,0 +1,94 @@
+# Copyright (c) 2015 ICRL
+# See the file LICENSE for copying permission.
+
+"""Tests of NameIndex, NameFilter and globIndexes()"""
+
+import unittest
+
+from dtypes import Content, ContentStore
+from filtering import NameFilter, NameIndex, globIndexes
+
+
+NAMES = ["Makefile", "README.md", "main.py", "mainloop.py", "setup.cfg",
+         "Ämter.txt"]
+
+
+class NameFilterTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.contents = ContentStore([Content(name, "file")
+                                      for name in NAMES])
+        self.filter = NameFilter(NameIndex(self.contents))
+
+    def names(self):
+
+        """Return names matching current query"""
+
+        return [NAMES[index] for index in self.filter.results]
+
+    def test_prefix(self):
+
+        """Names starting with query match, case insensitively"""
+
+        self.filter.setQuery("MA")
+
+        self.assertEqual(self.names(), ["Makefile", "main.py",
+                                        "mainloop.py"])
+
+        self.filter.setQuery("ä")
+
+        self.assertEqual(self.names(), ["Ämter.txt"])
+
+    def test_refine(self):
+
+        """Longer queries refine results, erased ones are reused"""
+
+        self.filter.setQuery("mai")
+        results = self.filter.results
+
+        self.filter.setQuery("mainl")
+
+        self.assertEqual(self.names(), ["mainloop.py"])
+
+        self.filter.setQuery("mai")
+
+        self.assertIs(self.filter.results, results)
+
+        self.filter.setQuery("")
+
+        self.assertIsNone(self.filter.results)
+
+    def test_modes(self):
+
+        """Substring and fuzzy modes match anywhere in names"""
+
+        self.filter.setMode("substring")
+        self.filter.setQuery(".py")
+
+        self.assertEqual(self.names(), ["main.py", "mainloop.py"])
+
+        self.filter.setQuery("p")
+
+        self.assertEqual(self.names(), ["main.py", "mainloop.py",
+                                        "setup.cfg"])
+
+        self.filter.setMode("fuzzy")
+        self.filter.setQuery("mlp")
+
+        self.assertEqual(self.names(), ["mainloop.py"])
+
+    def test_glob(self):
+
+        """Names matching a glob are found in a store's buffer, or by name
+        if some are not ASCII"""
+
+        self.assertEqual(globIndexes(self.contents, "*.PY"), [2, 3])
+
+        ascii = ContentStore([Content(name, "file") for name in NAMES[:-1]])
+
+        self.assertEqual(globIndexes(ascii, "m*"), [0, 2, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
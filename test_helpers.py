@@ -0,0 +1,60 @@
+# Copyright (c) 2015 ICRL
+# See the file LICENSE for copying permission.
+
+"""Tests of displayWidth() and fitText()"""
+
+import unittest
+
+from helpers import LineCache, displayWidth, fitText
+
+
+class DisplayWidthTest(unittest.TestCase):
+
+    def test_widths(self):
+
+        """Wide characters take two cells, combining ones none"""
+
+        self.assertEqual(displayWidth("plain"), 5)
+        self.assertEqual(displayWidth("漢字"), 4)
+        self.assertEqual(displayWidth("école"), 5)
+        self.assertEqual(displayWidth(""), 0)
+
+    def test_cached(self):
+
+        """Widths are computed once per name"""
+
+        cache = LineCache()
+
+        self.assertEqual(cache.nameWidth("日本"), 4)
+        self.assertEqual(cache.widths, {"日本": 4})
+
+
+class FitTextTest(unittest.TestCase):
+
+    def test_pad(self):
+
+        """Short texts are padded to width"""
+
+        self.assertEqual(fitText("ab", 4), "ab  ")
+        self.assertEqual(fitText("漢", 4), "漢  ")
+        self.assertEqual(fitText("ab", -1), "")
+
+    def test_truncate(self):
+
+        """Long texts are truncated, never cutting a wide character in
+        half"""
+
+        self.assertEqual(fitText("abcdef", 4), "abcd")
+        self.assertEqual(fitText("漢字テキスト", 5), "漢字 ")
+        self.assertEqual(displayWidth(fitText("a漢字テ", 6)), 6)
+
+    def test_combining(self):
+
+        """Combining characters stay with the character they follow"""
+
+        self.assertEqual(fitText("école", 1), "é")
+        self.assertEqual(fitText("aé", 2), "aé")
+
+
+if __name__ == "__main__":
+    unittest.main()
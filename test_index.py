@@ -0,0 +1,74 @@
+# Copyright (c) 2015 ICRL
+# See the file LICENSE for copying permission.
+
+"""Tests of SubtreeIndex"""
+
+import os
+import unittest
+
+from os.path import join
+from tempfile import TemporaryDirectory
+
+from index import SubtreeIndex
+
+
+class SubtreeIndexTest(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmp = TemporaryDirectory()
+        self.root = join(self.tmp.name, "tree")
+
+        self.index = SubtreeIndex(join(self.tmp.name, "index.sqlite"))
+
+    def tearDown(self):
+
+        self.index.close()
+        self.tmp.cleanup()
+
+    def test_undecodable_names(self):
+
+        """Names which are not UTF-8 are indexed and found as listed"""
+
+        # b"\xff" decodes to a lone surrogate, which SQLite can't store as
+        # text.
+        name = os.fsdecode(b"report\xff")
+
+        os.makedirs(join(self.root, name))
+        open(join(self.root, name, "notes.txt"), "w").close()
+
+        stats = self.index.update(self.root)
+
+        self.assertEqual(stats["entries"], 2)
+
+        self.assertEqual(self.index.find(self.root, "report", "prefix", 10),
+                         [(self.root, name, "dir")])
+        self.assertEqual(self.index.find(self.root, "notes", "substring",
+                                         10),
+                         [(join(self.root, name), "notes.txt", "file")])
+
+        # Indexed again, without listing unchanged directories.
+        stats = self.index.update(self.root)
+
+        self.assertEqual(stats["walked"], 2)
+        self.assertEqual(stats["listed"], 0)
+
+    def test_previous_version(self):
+
+        """Indexes of another version are built again"""
+
+        self.index.db.execute("INSERT INTO dirs (path, mtime) "
+                              "VALUES ('/gone', 0)")
+        self.index.db.execute("PRAGMA user_version = 0")
+        self.index.db.commit()
+        self.index.close()
+
+        self.index = SubtreeIndex(self.index.path)
+
+        self.assertEqual(
+            self.index.db.execute("SELECT count(*) FROM dirs").fetchone(),
+            (0,))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+# Copyright (c) 2015 ICRL
+# See the file LICENSE for copying permission.
+
+"""Tests of Selection"""
+
+import random
+import unittest
+
+from selection import Selection
+
+
+def inserted(marked, size, indexes):
+
+    """Return `marked` indexes once contents got inserted at `indexes`,
+    as a list would move them"""
+
+    contents = [index in marked for index in range(size)]
+
+    for index in indexes:
+        contents.insert(index, False)
+
+    return [index for index, mark in enumerate(contents) if mark]
+
+
+def deleted(marked, size, indexes):
+
+    """Return `marked` indexes once contents at `indexes` got deleted, as
+    a list would move them"""
+
+    return [index - sum(1 for removed in indexes if removed < index)
+            for index in sorted(marked) if index not in indexes]
+
+
+class SelectionTest(unittest.TestCase):
+
+    def selection(self, size, marked):
+
+        """Return Selection of `size` contents, `marked` ones in it"""
+
+        selection = Selection(size)
+        selection.setIndexes(marked)
+
+        return selection
+
+    def test_bits(self):
+
+        """Indexes are added, removed and counted"""
+
+        selection = Selection(20)
+
+        selection.toggle(3)
+        selection.set(17)
+        selection.setRange(5, 12)
+        selection.set(8, False)
+
+        self.assertEqual(selection.indexes(),
+                         [3, 5, 6, 7, 9, 10, 11, 17])
+        self.assertEqual(len(selection), 8)
+
+        selection.invert()
+
+        self.assertEqual(len(selection), 12)
+        self.assertFalse(selection.get(17))
+
+        with self.assertRaises(IndexError):
+            selection.toggle(20)
+
+    def test_insert(self):
+
+        """Indexes past contents inserted move up"""
+
+        selection = self.selection(10, [0, 4, 9])
+
+        selection.insert([0, 5, 12])
+
+        self.assertEqual(selection.indexes(), [1, 6, 11])
+        self.assertEqual(selection.size, 13)
+        self.assertEqual(len(selection), 3)
+
+    def test_delete(self):
+
+        """Indexes past contents deleted move down, deleted ones are
+        removed"""
+
+        selection = self.selection(10, [0, 4, 9])
+
+        selection.delete([0, 2, 5])
+
+        self.assertEqual(selection.indexes(), [2, 6])
+        self.assertEqual(selection.size, 7)
+        self.assertEqual(len(selection), 2)
+
+    def test_shifts_and_moves(self):
+
+        """Shifting bits and moving indexes agree with lists"""
+
+        rng = random.Random(0)
+
+        for _ in range(200):
+
+            size = rng.randrange(1, 300)
+            marked = set(rng.sample(range(size), rng.randrange(size + 1)))
+
+            # Few contents shift bits, many move indexes.
+            count = rng.choice((1, 3, size))
+
+            indexes = sorted(rng.sample(range(size + count), count))
+            selection = self.selection(size, marked)
+            selection.insert(indexes)
+
+            self.assertEqual(selection.indexes(),
+                             inserted(marked, size, indexes))
+
+            indexes = sorted(rng.sample(range(size), min(size, count)))
+            selection = self.selection(size, marked)
+            selection.delete(indexes)
+
+            self.assertEqual(selection.indexes(),
+                             deleted(marked, size, indexes))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,7 +3,14 @@
 
 from os.path import isdir, isfile, islink, ismount
 from os.path import join
-from os import listdir
+from os import listdir, scandir, stat
+
+from stat import S_ISDIR
+
+from itertools import islice
+from time import perf_counter
+
+from profiler import PROFILER
 
 
 # Supported filetypes functions and their identifier strings.
@@ -86,15 +93,250 @@ class listLocals(object):
         return self.split_file_types(listdir(self.path))
 
 
+class Listing(dict):
+
+    """Dict returned by scanLocals.lsdir(). Same key:value pairs as returned
+    by listLocals.lsdir(), plus a `syscalls` member holding the number of
+    system calls issued to produce it."""
+
+    def __init__(self, *args, **kwargs):
+
+        dict.__init__(self, *args, **kwargs)
+
+        # system calls made while listing.
+        self.syscalls = 0
+
+
+class scanLocals(object):
+
+    """Lists contents of a directory in the same organized fashion as
+    listLocals, but built on os.scandir().
+
+    Filetypes are read from the directory entries themselves(d_type), so
+    files and others cost no extra system call. Directories are lstat()-ed,
+    to tell mountpoints apart by comparing their device ID with the one of
+    the listed directory. Links are stat()-ed, links to directories are
+    reported as directories unless `followLinks` is False.
+
+    Each Listing reports the system calls issued to produce it: one for
+    stat()-ing the listed directory, one for scandir() and one per lstat()
+    or stat() of a directory entry. Filesystems that do not report d_type make
+    os.DirEntry fall back to lstat() internally, those are not counted.
+    """
+
+    def __init__(self, path, followLinks=True):
+
+        # Whether links to directories are reported as directories, walks
+        # of directory trees report them as links not to be followed.
+        self.followLinks = followLinks
+
+        # device ID of the listed directory, used to detect mountpoints.
+        self.device = None
+
+        # system calls made and not yet reported by a Listing.
+        self.syscalls = 0
+
+        self._set_path_(path)
+
+    def _set_path_(self, path):
+
+        """stat() `path` and make it the listed directory.
+        Raise ValueError if it is not a directory."""
+
+        try:
+            st = stat(path)
+        except OSError:
+            raise ValueError(path)
+
+        self.syscalls += 1
+
+        # if path to directory
+        if S_ISDIR(st.st_mode):
+            self.path = path
+            self.device = st.st_dev
+
+        # else raise error
+        else:
+            raise ValueError(path)
+
+    def fileType(self, entry):
+
+        """Return a string containing filetype of `entry`(an os.DirEntry) if
+        known, return "other" otherwise.
+
+        Known Filetypes : "file", "dir", "link", "mountpoint".
+        """
+
+        # Links to directories are browsed as directories, as by listLocals.
+        # Links to anything else, and dangling ones, are reported as links.
+        if entry.is_symlink():
+
+            if not self.followLinks:
+                return "link"
+
+            # stat() of the link's target.
+            self.syscalls += 1
+
+            try:
+                if entry.is_dir():
+                    return "dir"
+
+            # Target can't be reached, e.g. link removed meanwhile.
+            except OSError:
+                pass
+
+            return "link"
+
+        if entry.is_dir(follow_symlinks=False):
+
+            self.syscalls += 1
+
+            try:
+                device = entry.stat(follow_symlinks=False).st_dev
+
+            # Removed meanwhile, listed as it was read.
+            except OSError:
+                return "dir"
+
+            # A directory on a device other than its parent is mounted.
+            if device != self.device:
+                return "mountpoint"
+
+            return "dir"
+
+        if entry.is_file(follow_symlinks=False):
+            return "file"
+
+        # If file is of type not listed in TYPES
+        return "other"
+
+    def split_file_types(self, entries):
+
+        """entries -> An iterable of os.DirEntry objects.
+
+        return a Listing with the same keys as listLocals.split_file_types()
+        """
+
+        contentDict = Listing((v, []) for v in list(TYPES.values()) +
+                              ['other'])
+
+        # Entries get timed one by one, see _split_profiled_().
+        if PROFILER.enabled:
+            return self._split_profiled_(entries, contentDict)
+
+        for entry in entries:
+
+            contentDict[self.fileType(entry)].append(entry.name)
+
+        return contentDict
+
+    def _split_profiled_(self, entries, contentDict):
+
+        """Add `entries` to `contentDict`, as split_file_types() does,
+        recording time taken by each fileType() call and phases: reading
+        entries(list) and telling their filetypes(classify)"""
+
+        start = perf_counter()
+
+        # System calls listing, made before reading entries.
+        syscalls = self.syscalls
+
+        # seconds taken by each fileType() call.
+        times = []
+
+        for entry in entries:
+
+            before = perf_counter()
+            contentDict[self.fileType(entry)].append(entry.name)
+            times.append(perf_counter() - before)
+
+        elapsed = perf_counter() - start
+        classifying = sum(times)
+
+        PROFILER.recordCalls("fileType", times, self.syscalls - syscalls)
+
+        PROFILER.record("list", start, syscalls, phase=True,
+                        elapsed=elapsed - classifying)
+        PROFILER.record("classify", start, self.syscalls - syscalls,
+                        phase=True, elapsed=classifying)
+
+        return contentDict
+
+    def lsdir(self, path=None):
+
+        """Return a Listing containing items in given `path`.
+
+        See docstring -> listLocals.lsdir method for more on return value.
+        """
+
+        start = PROFILER.start()
+
+        # If new path is given
+        if path:
+            # change current path
+            self._set_path_(path)
+
+        # scandir() itself.
+        self.syscalls += 1
+
+        with scandir(self.path) as entries:
+            contents = self.split_file_types(entries)
+
+        # report and restart counting.
+        contents.syscalls, self.syscalls = self.syscalls, 0
+
+        if start is not None:
+            PROFILER.record("lsdir", start, contents.syscalls)
+
+        return contents
+
+    def lsdirBatches(self, batchSize, maxBatchSize, path=None):
+
+        """Yield Listings of consecutive batches of items in given `path`,
+        as they are read.
+
+        First batch holds `batchSize` items, each following one twice as
+        many as the previous one, up to `maxBatchSize` items.
+        """
+
+        # If new path is given
+        if path:
+            # change current path
+            self._set_path_(path)
+
+        # scandir() itself.
+        self.syscalls += 1
+
+        with scandir(self.path) as entries:
+
+            while True:
+
+                contents = self.split_file_types(islice(entries, batchSize))
+
+                # number of items in this batch.
+                count = sum(len(names) for names in contents.values())
+
+                if not count:
+                    break
+
+                # report and restart counting.
+                contents.syscalls, self.syscalls = self.syscalls, 0
+
+                yield contents
+
+                batchSize = min(batchSize * 2, maxBatchSize)
+
+
 def lsdir(path, extraPaths=False):
 
-    """Instantiate listLocals to return contents of a directory(at location
-    `path` as a dictionary) in a organized fashion.
+    """Instantiate scanLocals to return contents of a directory(at location
+    `path` as a Listing) in a organized fashion.
 
-    See docstring -> listLocals.lsdir method for more on return value.
+    See docstring -> listLocals.lsdir method for more on return value and
+    Listing for the reported system calls.
     """
 
-    contents = listLocals(path).lsdir()
+    contents = scanLocals(path).lsdir()
 
     if extraPaths:
         contents['dir'].extend(['.', '..'])
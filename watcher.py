@@ -0,0 +1,227 @@
+# Copyright (c) 2015 ICRL
+# See the file LICENSE for copying permission.
+
+"""Contains DirWatcher class, watching a directory for changes through
+Linux inotify(7) by means of ctypes."""
+
+import ctypes
+import os
+import struct
+from errno import EAGAIN, EINTR
+
+
+# inotify event masks. See inotify(7).
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+# Events watched for.
+WATCH_MASK = (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_DELETE_SELF |
+              IN_MOVE_SELF | IN_ONLYDIR)
+
+# Events changing an entry's metadata only.
+MODIFY_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE
+
+# struct inotify_event without its trailing name.
+EVENT = struct.Struct("iIII")
+
+
+def _libc_():
+
+    """Return libc if it provides inotify, None otherwise."""
+
+    try:
+        # Symbols python is linked with, libc's included: saves importing
+        # ctypes.util, which slows dex's startup down.
+        libc = ctypes.CDLL(None, use_errno=True)
+        libc.inotify_init1
+    except (OSError, AttributeError):
+        return None
+
+    return libc
+
+
+libc = _libc_()
+
+
+class Change(object):
+
+    """A single change of a watched directory's entries.
+
+    `action` is one of "create", "delete", "modify"(its size, times or
+    permissions changed) or "rename"(then `cookie` pairs the "delete" of
+    the old name with the "create" of the new one).
+    `isdir` tells whether the entry is a directory."""
+
+    __slots__ = ("action", "name", "isdir", "cookie")
+
+    def __init__(self, action, name, isdir, cookie=0):
+
+        self.action = action
+        self.name = name
+        self.isdir = isdir
+        self.cookie = cookie
+
+
+class DirWatcher(object):
+
+    """Watches a single directory at a time for created, deleted, modified
+    and renamed entries.
+
+    01) watch() method switches the watched directory.
+
+    02) changes() method returns a list of Change-objects read so far,
+        without blocking. It returns None if changes were lost(the kernel
+        event queue overflowed or the directory itself was moved or
+        deleted), then the directory has to be listed again.
+
+    03) fileno() method returns a file descriptor which becomes readable
+        when changes are available.
+
+    Raises OSError if inotify is not available.
+    """
+
+    def __init__(self):
+
+        if libc is None:
+            raise OSError("inotify is not available")
+
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+        # watch descriptor and path of watched directory.
+        self.wd = None
+        self.path = None
+
+    def fileno(self):
+
+        """Return inotify file descriptor"""
+
+        return self.fd
+
+    def watch(self, path):
+
+        """Stop watching previous directory and start watching `path`.
+        Return whether `path` is being watched."""
+
+        if self.wd is not None:
+            libc.inotify_rm_watch(self.fd, self.wd)
+
+        self.wd = libc.inotify_add_watch(self.fd, os.fsencode(path),
+                                         WATCH_MASK)
+        self.path = path
+
+        # e.g. permission denied or out of inotify watches.
+        if self.wd < 0:
+            self.wd = None
+
+        return self.wd is not None
+
+    def _read_(self):
+
+        """Return all bytes available on inotify file descriptor"""
+
+        chunks = []
+
+        while True:
+
+            try:
+                chunk = os.read(self.fd, 64 * 1024)
+            except OSError as error:
+                if error.errno == EINTR:
+                    continue
+                if error.errno == EAGAIN:
+                    break
+                raise
+
+            if not chunk:
+                break
+
+            chunks.append(chunk)
+
+        return b"".join(chunks)
+
+    def changes(self):
+
+        """Return list of Changes of watched directory since last call, or
+        None if changes were lost."""
+
+        data = self._read_()
+
+        changes = []
+
+        # Changes were lost.
+        lost = False
+
+        # Moved-from changes not yet paired with a moved-to one.
+        movedFrom = {}
+
+        offset = 0
+
+        while offset < len(data):
+
+            wd, mask, cookie, length = EVENT.unpack_from(data, offset)
+            offset += EVENT.size
+
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                lost = True
+
+            # Events of previously watched directories.
+            if wd != self.wd:
+                continue
+
+            isdir = bool(mask & IN_ISDIR)
+
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                lost = True
+
+            elif mask & IN_CREATE:
+                changes.append(Change("create", name, isdir))
+
+            elif mask & IN_DELETE:
+                changes.append(Change("delete", name, isdir))
+
+            elif mask & IN_MOVED_FROM:
+                change = Change("delete", name, isdir, cookie)
+                movedFrom[cookie] = change
+                changes.append(change)
+
+            elif mask & IN_MOVED_TO:
+
+                # Renamed within the watched directory.
+                if cookie in movedFrom:
+                    movedFrom.pop(cookie).action = "rename"
+                    changes.append(Change("rename", name, isdir, cookie))
+
+                # Moved in from elsewhere.
+                else:
+                    changes.append(Change("create", name, isdir))
+
+            # The watched directory's own attributes have no name.
+            elif mask & MODIFY_MASK and name:
+                changes.append(Change("modify", name, isdir))
+
+        return None if lost else changes
+
+    def close(self):
+
+        """Release inotify file descriptor"""
+
+        os.close(self.fd)